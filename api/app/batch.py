@@ -0,0 +1,141 @@
+# app/batch.py
+import os
+import time
+import asyncio
+import logging
+import posixpath
+from typing import Dict, List, Optional
+from urllib.parse import quote, unquote, urlsplit
+from app.dependencies import get_sql_gateway
+from app.codec import loads
+
+logger = logging.getLogger(__name__)
+
+# Largest number of paths one batch may ask for, and how many of them run
+# at the same time
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", "100"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+# Deadline for each sub-request, a slow one is reported as timed out
+BATCH_REQUEST_TIMEOUT = float(os.environ.get("BATCH_REQUEST_TIMEOUT", "15"))
+
+# Marks sub-requests in the ASGI scope, e.g. so they share the loaders of
+# the batch request
+BATCH_SCOPE_KEY = "goal_archive.batch"
+
+_FORBIDDEN_PREFIXES = ("/v1/batch", "/v1/admin")
+# left as they are when percent-encoding what clients sent unencoded
+# (Modrić), existing escapes included
+_PATH_SAFE = "/%:@!$&'()*+,;=-._~"
+_QUERY_SAFE = _PATH_SAFE + "?"
+
+
+def check_path(path: str) -> Optional[str]:
+    """
+    Why `path` can't be part of a batch, or None when it can. Only relative
+    GET routes of the public API are allowed.
+    """
+    parts = urlsplit(path)
+    route = unquote(parts.path)
+    if parts.scheme or parts.netloc or not route.startswith("/v1/"):
+        return "Only relative /v1/ paths can be batched"
+    # checked as it is routed, decoded; dot or empty segments would make
+    # it read differently from where it goes
+    if posixpath.normpath(route) != (route[:-1] if route.endswith("/") else route):
+        return "Path can't be batched"
+    if route.startswith(_FORBIDDEN_PREFIXES):
+        return "Path can't be batched"
+    return None
+
+
+def _decode(headers: Dict[str, str], body: bytes):
+    if "json" in headers.get("content-type", ""):
+        try:
+            return loads(body)
+        except ValueError:
+            pass
+    return body.decode("utf-8", "replace")
+
+
+async def _dispatch(app, parent_scope: dict, path: str) -> dict:
+    """
+    Run one GET through the whole application in process, middleware and
+    caches included, and capture its response.
+    """
+    parts = urlsplit(path)
+    scope = {
+        "type": "http",
+        "asgi": parent_scope.get("asgi", {"version": "3.0"}),
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": parent_scope.get("scheme", "http"),
+        "server": parent_scope.get("server"),
+        "client": parent_scope.get("client"),
+        "root_path": parent_scope.get("root_path", ""),
+        "path": unquote(parts.path),
+        "raw_path": quote(parts.path, safe=_PATH_SAFE).encode("ascii"),
+        "query_string": quote(parts.query, safe=_QUERY_SAFE).encode("ascii"),
+        "headers": [(b"accept", b"application/json")],
+        BATCH_SCOPE_KEY: True,
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.disconnect"}
+
+    start = {}
+    chunks = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in start.get("headers", [])}
+    return {"status": start.get("status", 500), "body": _decode(headers, b"".join(chunks))}
+
+
+async def _run_one(app, parent_scope: dict, path: str, semaphore: asyncio.Semaphore, timeout: float) -> dict:
+    error = check_path(path)
+    if error:
+        return {"path": path, "status": 400, "body": {"detail": error}, "ms": 0.0}
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            outcome = await asyncio.wait_for(_dispatch(app, parent_scope, path), timeout)
+        except asyncio.TimeoutError:
+            outcome = {"status": 504, "body": {"detail": "Request timed out"}}
+        except Exception:
+            logger.exception("Batched request %s failed", path)
+            outcome = {"status": 500, "body": {"detail": "Internal Server Error"}}
+        return {"path": path, **outcome, "ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+async def run_batch(app, parent_scope: dict, paths: List[str], concurrency: int = BATCH_CONCURRENCY, timeout: float = BATCH_REQUEST_TIMEOUT) -> dict:
+    """
+    Run GET `paths` through `app`, at most `concurrency` at a time, and
+    return their responses in order, each with its own status. Repeated
+    paths are only run once. Queries issued together by the sub-requests
+    share execute_sql round trips.
+    """
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, min(concurrency, BATCH_CONCURRENCY)))
+    unique = list(dict.fromkeys(paths))
+    with get_sql_gateway().bundle():
+        results = await asyncio.gather(*(_run_one(app, parent_scope, path, semaphore, timeout) for path in unique))
+    by_path = dict(zip(unique, results))
+
+    responses = [by_path[path] for path in paths]
+    return {
+        "data": responses,
+        "meta": {
+            "count": len(responses),
+            "failed": sum(1 for r in responses if not 200 <= r["status"] < 300),
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        },
+    }
@@ -0,0 +1,273 @@
+# app/cache.py
+import os
+import time
+import inspect
+import asyncio
+import logging
+import functools
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Hashable, Optional
+from app.constants import GLOBAL_YEAR
+from app import cache_backends
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "4096"))
+# None means the entry only leaves the cache through LRU eviction or a purge
+PAST_SEASON_TTL: Optional[float] = None
+CURRENT_SEASON_TTL = float(os.environ.get("CACHE_CURRENT_SEASON_TTL", "60"))
+# Stale-while-revalidate: how long past expiry a value may still be served
+# while it is refreshed in the background. Per endpoint overrides look like
+# "LeagueService.most_stats_league=300,StatsService.get_no_losses=600".
+CACHE_STALE_FOR = float(os.environ.get("CACHE_STALE_FOR", "0"))
+CACHE_STALE_OVERRIDES = {
+    name.strip(): float(seconds)
+    for name, seconds in (
+        item.split("=") for item in os.environ.get("CACHE_STALE_OVERRIDES", "").split(",") if "=" in item
+    )
+}
+# Shared second tier: redis://..., file:///dir or memory://, disabled when unset
+CACHE_L2_URL = os.environ.get("CACHE_L2_URL")
+# Bump to invalidate every shared entry after a change in result shapes
+CACHE_L2_NAMESPACE = os.environ.get("CACHE_L2_NAMESPACE", "ga:v1")
+
+_MISSING = object()
+
+
+def season_of(value: Any) -> Optional[int]:
+    """
+    Season a parameter refers to. Seasons start in July, so 2025-03-01
+    belongs to the 2024 season.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            value = date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    if isinstance(value, date):
+        return value.year if value.month >= 7 else value.year - 1
+    return None
+
+
+def season_ttl(season: Optional[int]) -> Optional[float]:
+    """
+    Completed seasons never change, everything else expires quickly.
+    """
+    if season is not None and season < GLOBAL_YEAR:
+        return PAST_SEASON_TTL
+    return CURRENT_SEASON_TTL
+
+
+class ResultCache:
+    """
+    Size-bounded LRU of service results with a per-entry TTL and hit/miss
+    counters per endpoint. An entry can outlive its TTL by `stale_for`
+    seconds, during which it is handed out as stale.
+    """
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.counters: dict = {}
+
+    def _count(self, endpoint: str, field: str):
+        counts = self.counters.setdefault(endpoint, {"hits": 0, "misses": 0, "stale": 0})
+        counts[field] += 1
+
+    def get(self, endpoint: str, key: Hashable) -> Any:
+        value, stale = self.lookup(endpoint, key)
+        return _MISSING if stale else value
+
+    def lookup(self, endpoint: str, key: Hashable) -> tuple:
+        """
+        (value, stale). Fresh entries come back with stale=False, entries in
+        their stale window with stale=True, anything else as _MISSING.
+        """
+        entry = self._entries.get((endpoint, key))
+        if entry is not None:
+            value, expires_at, stale_until = entry
+            now = time.monotonic()
+            if expires_at is None or expires_at > now:
+                self._entries.move_to_end((endpoint, key))
+                self._count(endpoint, "hits")
+                return value, False
+            if stale_until > now:
+                self._entries.move_to_end((endpoint, key))
+                self._count(endpoint, "stale")
+                return value, True
+            del self._entries[(endpoint, key)]
+        self._count(endpoint, "misses")
+        return _MISSING, False
+
+    def set(self, endpoint: str, key: Hashable, value: Any, ttl: Optional[float], stale_for: float = 0):
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        stale_until = 0 if ttl is None else expires_at + stale_for
+        self._entries[(endpoint, key)] = (value, expires_at, stale_until)
+        self._entries.move_to_end((endpoint, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def purge(self, endpoint: Optional[str] = None) -> int:
+        """
+        Drop every entry, or only the entries of one endpoint.
+        """
+        if endpoint is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        stale = [k for k in self._entries if k[0] == endpoint]
+        for k in stale:
+            del self._entries[k]
+        return len(stale)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "refreshing": len(_refreshing),
+            "endpoints": self.counters,
+        }
+
+
+class SharedCache:
+    """
+    Second cache tier shared by every worker. Values are stored compressed
+    under keys built from the endpoint and its arguments. Backend errors are
+    counted and otherwise ignored, the database is always the fallback.
+    """
+    def __init__(self, namespace: str = CACHE_L2_NAMESPACE):
+        self.namespace = namespace
+        self.backend = None
+        self.counters = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def configure(self, url: Optional[str]):
+        self.backend = cache_backends.backend_from_url(url) if url else None
+
+    async def close(self):
+        backend, self.backend = self.backend, None
+        if backend is not None:
+            await backend.close()
+
+    async def get(self, endpoint: str, params: tuple) -> Any:
+        try:
+            blob = await self.backend.get(cache_backends.make_key(self.namespace, endpoint, params))
+            value = _MISSING if blob is None else cache_backends.decode(blob)
+        except Exception:
+            logger.warning("L2 cache read failed for %s", endpoint, exc_info=True)
+            self.counters["errors"] += 1
+            return _MISSING
+        self.counters["misses" if value is _MISSING else "hits"] += 1
+        return value
+
+    async def set(self, endpoint: str, params: tuple, value: Any, ttl: Optional[float]):
+        try:
+            blob = cache_backends.encode(value)
+            await self.backend.set(cache_backends.make_key(self.namespace, endpoint, params), blob, ttl)
+            self.counters["writes"] += 1
+        except Exception:
+            logger.warning("L2 cache write failed for %s", endpoint, exc_info=True)
+            self.counters["errors"] += 1
+
+    async def purge(self, endpoint: Optional[str] = None) -> int:
+        prefix = f"{self.namespace}:{endpoint}:" if endpoint else f"{self.namespace}:"
+        try:
+            return await self.backend.delete_prefix(prefix)
+        except Exception:
+            logger.warning("L2 cache purge failed", exc_info=True)
+            self.counters["errors"] += 1
+            return 0
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__ if self.backend else None,
+            **self.counters,
+        }
+
+
+result_cache = ResultCache()
+shared_cache = SharedCache()
+# background refreshes in progress, one per (endpoint, params)
+_refreshing: dict = {}
+
+
+def _refresh(endpoint: str, params: tuple, compute, entry_ttl: Optional[float], stale_for: float):
+    """
+    Recompute a stale entry in the background unless a refresh for the same
+    key is already running. Failures leave the stale value in place.
+    """
+    key = (endpoint, params)
+    if key in _refreshing:
+        return
+
+    async def run():
+        try:
+            value = await compute()
+        except Exception:
+            logger.warning("Background refresh of %s failed", endpoint, exc_info=True)
+            return
+        result_cache.set(endpoint, params, value, entry_ttl, stale_for)
+        if shared_cache.enabled:
+            await shared_cache.set(endpoint, params, value, entry_ttl)
+
+    task = asyncio.ensure_future(run())
+    _refreshing[key] = task
+    task.add_done_callback(lambda done: _refreshing.pop(key, None))
+
+
+def cached(season_arg: Optional[str] = "season", ttl: Any = _MISSING, stale_for: Optional[float] = None):
+    """
+    Cache an async service method on its arguments, in process first and
+    then in the shared tier when one is configured. The TTL comes from the
+    season named by `season_arg` unless a fixed `ttl` is given.
+    With `stale_for` (or CACHE_STALE_FOR / CACHE_STALE_OVERRIDES) an expired
+    value keeps being served for that many seconds while a single
+    background task refreshes it.
+    Cached values are shared between requests, treat them as read-only.
+    """
+    def decorator(fn):
+        endpoint = fn.__qualname__
+        signature = inspect.signature(fn)
+        stale_window = CACHE_STALE_OVERRIDES.get(endpoint, CACHE_STALE_FOR if stale_for is None else stale_for)
+
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            params = tuple((k, v) for k, v in bound.arguments.items() if k != "self")
+
+            if ttl is _MISSING:
+                entry_ttl = season_ttl(season_of(bound.arguments.get(season_arg)) if season_arg else None)
+            else:
+                entry_ttl = ttl
+
+            value, stale = result_cache.lookup(endpoint, params)
+            if stale:
+                _refresh(endpoint, params, lambda: fn(self, *args, **kwargs), entry_ttl, stale_window)
+            if value is not _MISSING:
+                return value
+
+            if shared_cache.enabled:
+                value = await shared_cache.get(endpoint, params)
+                if value is not _MISSING:
+                    result_cache.set(endpoint, params, value, entry_ttl, stale_window)
+                    return value
+
+            value = await fn(self, *args, **kwargs)
+            result_cache.set(endpoint, params, value, entry_ttl, stale_window)
+            if shared_cache.enabled:
+                await shared_cache.set(endpoint, params, value, entry_ttl)
+            return value
+
+        wrapper.stale_for = stale_window
+
+        return wrapper
+    return decorator
@@ -0,0 +1,210 @@
+# app/cache_backends.py
+import os
+import json
+import time
+import zlib
+import asyncio
+import hashlib
+import importlib
+from typing import Any, Optional
+from pydantic import BaseModel
+from app.codec import encode_default
+
+try:
+    import msgpack
+except ImportError:  # optional, falls back to JSON
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional, falls back to zlib
+    zstandard = None
+
+# 2-byte header: serializer (M=msgpack, J=json) and compressor (Z=zstd, z=zlib),
+# so workers with different optional packages can still read each other.
+_ZSTD_LEVEL = 3
+
+
+def _to_plain(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        cls = type(value)
+        return {"__model__": f"{cls.__module__}:{cls.__qualname__}", "value": value.model_dump(mode="json")}
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(v) for v in value]
+    return value
+
+
+def _from_plain(value: Any) -> Any:
+    if isinstance(value, dict) and "__model__" in value:
+        module, name = value["__model__"].split(":")
+        # only rebuild our own response models
+        if not module.startswith("app."):
+            raise ValueError(f"Refusing to load model {value['__model__']}")
+        return getattr(importlib.import_module(module), name).model_validate(value["value"])
+    if isinstance(value, list):
+        return [_from_plain(v) for v in value]
+    return value
+
+
+def _default(value: Any) -> Any:
+    # dates as the responses write them, anything else as its str()
+    try:
+        return encode_default(value)
+    except TypeError:
+        return str(value)
+
+
+def encode(value: Any) -> bytes:
+    plain = _to_plain(value)
+    if msgpack is not None:
+        fmt, raw = b"M", msgpack.packb(plain, use_bin_type=True, default=_default)
+    else:
+        fmt, raw = b"J", json.dumps(plain, default=_default, separators=(",", ":")).encode()
+    if zstandard is not None:
+        return fmt + b"Z" + zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(raw)
+    return fmt + b"z" + zlib.compress(raw)
+
+
+def decode(blob: bytes) -> Any:
+    fmt, comp, body = blob[:1], blob[1:2], blob[2:]
+    if comp == b"Z":
+        raw = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        raw = zlib.decompress(body)
+    plain = msgpack.unpackb(raw, raw=False) if fmt == b"M" else json.loads(raw)
+    return _from_plain(plain)
+
+
+def make_key(namespace: str, endpoint: str, params: tuple) -> str:
+    """
+    Stable key for a service call: same endpoint and arguments give the same
+    key in every worker.
+    """
+    args = json.dumps({k: v for k, v in params}, default=str, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha1(args.encode()).hexdigest()
+    return f"{namespace}:{endpoint}:{digest}"
+
+
+class MemoryBackend:
+    """
+    In-process stand-in for tests and single-worker runs.
+    """
+    def __init__(self):
+        self._data = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        blob, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return blob
+
+    async def set(self, key: str, blob: bytes, ttl: Optional[float]):
+        self._data[key] = (blob, None if ttl is None else time.time() + ttl)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        stale = [k for k in self._data if k.startswith(prefix)]
+        for k in stale:
+            del self._data[k]
+        return len(stale)
+
+    async def close(self):
+        pass
+
+
+class FileBackend:
+    """
+    One file per key in a shared directory, so several local workers share a
+    warm cache without running Redis. Each file starts with its expiry time.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key.replace("/", "_"))
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                expires_at = float(f.readline())
+                blob = f.read()
+        except (OSError, ValueError):
+            return None
+        if expires_at and expires_at <= time.time():
+            return None
+        return blob
+
+    def _write(self, key: str, blob: bytes, ttl: Optional[float]):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(f"{0 if ttl is None else time.time() + ttl}\n".encode())
+            f.write(blob)
+        os.replace(tmp, path)
+
+    def _delete_prefix(self, prefix: str) -> int:
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix.replace("/", "_")) and not name.endswith(".tmp"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, blob: bytes, ttl: Optional[float]):
+        await asyncio.to_thread(self._write, key, blob, ttl)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        return await asyncio.to_thread(self._delete_prefix, prefix)
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    """
+    Any server speaking the Redis protocol (Redis, Valkey, KeyDB, Dragonfly).
+    """
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self.client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, blob: bytes, ttl: Optional[float]):
+        if ttl is None:
+            await self.client.set(key, blob)
+        else:
+            await self.client.set(key, blob, px=max(1, int(ttl * 1000)))
+
+    async def delete_prefix(self, prefix: str) -> int:
+        removed = 0
+        async for key in self.client.scan_iter(match=f"{prefix}*", count=500):
+            removed += await self.client.delete(key)
+        return removed
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def backend_from_url(url: str):
+    """
+    memory://, file:///some/dir or redis://host:6379/0 (rediss:// for TLS).
+    """
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith("file://"):
+        return FileBackend(url[len("file://"):] or ".cache")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported cache backend: {url}")
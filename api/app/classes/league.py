@@ -1,36 +1,32 @@
 from fastapi import HTTPException
-from datetime import date, datetime
 #from typing import List
-from pydantic import BaseModel
-from supabase import Client
-import requests, json
+from supabase import AsyncClient
+from app.cache import cached
 from typing import Optional
 #from ..models.league import TeamRank, LeagueRanking, TopLeaguesResponse
-from app.models.response import LeagueDataResponse, LeagueStatsResponse
-from app.models.player import PlayerBasicInfo
-from app.models.team import Team
+from app.dependencies import get_sql_gateway
+from app.queries import sql_template
+from app.loaders import request_loaders
+from app.constants import GLOBAL_YEAR, PLAYER_STATS
+from app.models.response import LeagueStatsResponse
 from app.models.response import WinTeam, TopCompsWinners, LeagueWinnersResponse, LeagueWinnersData, LeagueTeamStatResponse, LeagueTeamStatData, TeamLeagueStats
 from app.models.league import LeagueInfo, TeamRank
 
 
 class LeagueService:
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_client: AsyncClient):
         self.supabase = supabase_client
-        self.key = supabase_client.supabase_key
-        self.url = f"{supabase_client.rest_url}/rpc/execute_sql"
-        self.headers = {
-            "Authorization": f"Bearer {self.key}",
-            "apikey": self.key,
-            "Content-Type": "application/json"
-        }
+        self.gateway = get_sql_gateway()
+        self.loaders = request_loaders()
 
     # /leagues/:id/infos
-    def get_league_info(self, comp_id: int, season: int):
-        query = f"""
+    @cached(season_arg=None)
+    async def get_league_info(self, comp_id: int, season: int):
+        query = sql_template("league.info", """
         WITH league_check AS (
             SELECT l.type 
             FROM leagues l 
-            WHERE l.league_id = {comp_id}
+            WHERE l.league_id = :comp_id
         ),
         past_matches AS (
             SELECT 
@@ -81,7 +77,7 @@ class LeagueService:
             JOIN teams ht ON m.home_id = ht.team_id
             JOIN teams at ON m.away_id = at.team_id
             JOIN leagues l ON m.comp_id = l.league_id
-            WHERE m.comp_id = {comp_id}
+            WHERE m.comp_id = :comp_id
             AND m.match_date <= CURRENT_DATE
             ORDER BY m.match_date DESC, m.match_time DESC
             LIMIT 6
@@ -135,7 +131,7 @@ class LeagueService:
             JOIN teams ht ON m.home_id = ht.team_id
             JOIN teams at ON m.away_id = at.team_id
             JOIN leagues l ON m.comp_id = l.league_id
-            WHERE m.comp_id = {comp_id}
+            WHERE m.comp_id = :comp_id
             AND m.match_date > CURRENT_DATE
             ORDER BY m.match_date ASC, m.match_time ASC
             LIMIT 6
@@ -177,8 +173,8 @@ class LeagueService:
                                         ) as subq
                                     FROM league_ranks lr
                                     JOIN teams t2 ON lr.team_id = t2.team_id
-                                    WHERE lr.comp_id = {comp_id}
-                                    AND lr.season_year = {season}
+                                    WHERE lr.comp_id = :comp_id
+                                    AND lr.season_year = :season
                                     ORDER BY lr.rank::integer ASC
                                     LIMIT 20
                                 ) as subq
@@ -198,34 +194,18 @@ class LeagueService:
             END AS result
         FROM leagues l
         LEFT JOIN teams t ON l.country_id = t.team_id
-        WHERE l.league_id = {comp_id}
+        WHERE l.league_id = :comp_id
         GROUP BY l.league_id, l.league_name, l.country_id, l.type, t.logo_url
-    """
+    """, comp_id="bigint", season="integer").bind(comp_id=comp_id, season=season)
 
         
-        try:    
-            response = requests.post(self.url, headers=self.headers, json={"sql_query": query})
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response status: {response.status_code}")
-            #print(f"Supabase raw response text: {response.text}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for league {comp_id}"
-                )
-
-            return LeagueDataResponse(data=result["data"])
-            
-        except requests.exceptions.HTTPError as http_err:
-            error_detail = response.text if hasattr(response, 'text') else str(http_err)
-            raise HTTPException(status_code=500, detail=f"HTTP error occurred: {error_detail}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for league {comp_id}")
+        return result
         
     # /leagues/{league_id}/stats get highest stats of a league by year and stat
-    def most_stats_league(self, league_id: int, season: int, stat: str, age: int):
-        query = f"""
+    @cached(stale_for=300)
+    async def most_stats_league(self, league_id: int, season: int, stat: str, age: int):
+        query = sql_template("league.most_stats", """
             WITH team_stats AS (
             SELECT
                 ps.season_year,
@@ -281,8 +261,8 @@ class LeagueService:
             LEFT JOIN teams t ON ps.team_id = t.team_id
             LEFT JOIN teams n1 ON pl.nation1_id = n1.team_id
             LEFT JOIN teams n2 ON pl.nation2_id = n2.team_id
-            WHERE ps.season_year = {season} AND ps.comp_id = {league_id} AND ps.age <= {age}
-            ORDER BY ps.{stat} DESC
+            WHERE ps.season_year = :season AND ps.comp_id = :league_id AND ps.age <= :age
+            ORDER BY ps.:stat DESC
             LIMIT 15
         )
         SELECT json_build_object(
@@ -290,34 +270,14 @@ class LeagueService:
                 'stats', (SELECT coalesce(json_agg(row_to_json(team_stats)), '[]'::json) FROM team_stats)
             )
         ) as result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response text: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for league {league_id}"
-                )
-            # Parse the response according to the actual structure
-            #return LeagueStatsResponse(data=result["data"])
-            return result
-        
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, league_id="bigint", season="integer", age="integer", stat=PLAYER_STATS).bind(league_id=league_id, season=season, age=age, stat=stat)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for league {league_id}")
+        return result
 
     # /leagues/{league_id}/allstats get highest stats of a league by year and stat
-    def most_alltime_stats_league(self, league_id: int, stat: str, age: int):
-        query = f"""
+    @cached(season_arg=None)
+    async def most_alltime_stats_league(self, league_id: int, stat: str, age: int):
+        query = sql_template("league.most_alltime_stats", """
             WITH team_stats AS (
             SELECT
                 ps.season_year,
@@ -373,8 +333,8 @@ class LeagueService:
             LEFT JOIN teams t ON ps.team_id = t.team_id
             LEFT JOIN teams n1 ON pl.nation1_id = n1.team_id
             LEFT JOIN teams n2 ON pl.nation2_id = n2.team_id
-            WHERE ps.comp_id = {league_id} AND ps.age <= {age}
-            ORDER BY ps.{stat} DESC
+            WHERE ps.comp_id = :league_id AND ps.age <= :age
+            ORDER BY ps.:stat DESC
             LIMIT 15
         )
         SELECT json_build_object(
@@ -382,34 +342,14 @@ class LeagueService:
                 'stats', (SELECT coalesce(json_agg(row_to_json(team_stats)), '[]'::json) FROM team_stats)
             )
         ) as result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response text: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for league {league_id}"
-                )
-            # Parse the response according to the actual structure
-            #return LeagueStatsResponse(data=result["data"])
-            return result
-        
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, league_id="bigint", age="integer", stat=PLAYER_STATS).bind(league_id=league_id, age=age, stat=stat)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for league {league_id}")
+        return result
 
     # /leagues/{league_id}/past-stats get #1 highest stats of a league for past 10 years
-    def top_ga_stats_past10(self, league_id: int, stat: str, age: int):
-        query = f"""
+    @cached(season_arg=None)
+    async def top_ga_stats_past10(self, league_id: int, stat: str, age: int):
+        query = sql_template("league.top_ga_past10", """
             WITH yearly_top_scorers AS (
                 SELECT 
                     ps.season_year,
@@ -430,7 +370,7 @@ class LeagueService:
                     ps.stats_id,
                     RANK() OVER (PARTITION BY ps.season_year ORDER BY (ps.goals + ps.assists) DESC) AS ga_rank
                 FROM player_stats ps
-                WHERE ps.comp_id = {league_id}
+                WHERE ps.comp_id = :league_id
                 AND ps.season_year BETWEEN 2014 AND 2024
             ),
             top_players AS (
@@ -514,35 +454,15 @@ class LeagueService:
                     )
                 )
             ) as result;
-        """
+        """, league_id="bigint").bind(league_id=league_id)
 
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response text: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for league {league_id}"
-                )
-            # Parse the response according to the actual structure
-            #return LeagueStatsResponse(data=result["data"])
-            return result
-        
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for league {league_id}")
+        return result
 
     # /leagues/{league_id}/past-stats get #1 highest stats BY STAT
-    def top_stats_past10_by_stat(self, league_id: int, stat: str, age: int):
-        query = f"""
+    @cached(season_arg=None)
+    async def top_stats_past10_by_stat(self, league_id: int, stat: str, age: int):
+        query = sql_template("league.top_stats_past10_by_stat", """
             WITH league_info AS (
                 SELECT 
                     l.league_id as comp_id,
@@ -554,7 +474,7 @@ class LeagueService:
                     ct.logo_url as country_url
                 FROM leagues l
                 LEFT JOIN teams ct ON ct.team_id = l.country_id
-                WHERE l.league_id = {league_id}
+                WHERE l.league_id = :league_id
             ),
             yearly_top_scorers AS (
                 SELECT 
@@ -577,11 +497,11 @@ class LeagueService:
                     ps.stats_id,
                     DENSE_RANK() OVER (
                         PARTITION BY ps.season_year 
-                        ORDER BY ps.{stat} DESC
+                        ORDER BY ps.:stat DESC
                     ) AS stat_rank
                 FROM player_stats ps
-                WHERE ps.comp_id = {league_id} 
-                AND ps.age <= {age} 
+                WHERE ps.comp_id = :league_id 
+                AND ps.age <= :age 
                 AND ps.season_year BETWEEN 2000 AND 2024
             ),
             top_players AS (
@@ -680,52 +600,26 @@ class LeagueService:
                     )
                 )
             ) as result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response text: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for league {league_id}"
-                )
-            return result
-        
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, league_id="bigint", age="integer", stat=PLAYER_STATS).bind(league_id=league_id, age=age, stat=stat)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for league {league_id}")
+        return result
 
 
     # next one will use match and date range of a comp to determine highest goal scorer
 
-    # /leagues/:league_id/:team_id/stats get highest stats of a league by year and stat
-    def most_league_stats_by_team(self, team_id: int, league_id: int, season: Optional[int] = None, stat: str = "goals", age: int = 999, all_time: bool = False):
-        # Base WHERE clauses
-        where_clauses = [
-            f"ps.comp_id = {league_id}",
-            f"ps.age <= {age}",
-            f"ps.team_id = {team_id}"
-        ]
-        # Conditionally add season_year to WHERE clause
-        if not all_time and season is not None:
-            where_clauses.append(f"ps.season_year = {season}")
-        elif not all_time and season is None:
-            # Handle case where all_time is False but no season is provided
-            # You might want to raise an error or set a default season here
-            raise ValueError("Season must be provided if 'all_time' is False.")
+    # season filters of most_league_stats_by_team
+    ALL_SEASONS = "TRUE"
+    ONE_SEASON = "ps.season_year = :season"
 
-        # Join all WHERE conditions with ' AND '
-        where_condition = " AND ".join(where_clauses)
+    # /leagues/:league_id/:team_id/stats get highest stats of a league by year and stat
+    @cached(season_arg=None)
+    async def most_league_stats_by_team(self, team_id: int, league_id: int, season: Optional[int] = None, stat: str = "goals", age: int = 999, all_time: bool = False):
+        # Restrict to one season unless all time
+        if not all_time and season is None:
+            raise HTTPException(status_code=400, detail="Season must be provided if 'all_time' is False.")
+        season_filter = self.ALL_SEASONS if all_time else self.ONE_SEASON
 
-        query = f"""
+        query = sql_template("league.most_stats_by_team", """
             WITH team_stats AS (
             SELECT
                 ps.season_year,
@@ -781,8 +675,8 @@ class LeagueService:
             LEFT JOIN teams t ON ps.team_id = t.team_id
             LEFT JOIN teams n1 ON pl.nation1_id = n1.team_id
             LEFT JOIN teams n2 ON pl.nation2_id = n2.team_id
-            WHERE {where_condition}
-            ORDER BY ps.{stat} DESC
+            WHERE ps.comp_id = :league_id AND ps.age <= :age AND ps.team_id = :team_id AND :season_filter
+            ORDER BY ps.:stat DESC
             LIMIT 40
         )
         SELECT json_build_object(
@@ -790,129 +684,88 @@ class LeagueService:
                 'stats', (SELECT coalesce(json_agg(row_to_json(team_stats)), '[]'::json) FROM team_stats)
             )
         ) as result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for team {team_id} in league {league_id}"
-                )
-            
-            return result
-        
-        except requests.exceptions.HTTPError as http_err:
-            error_detail = response.text if hasattr(response, 'text') else str(http_err)
-            raise HTTPException(
-                status_code=500,
-                detail=f"Supabase error: {error_detail}"
-            )
-        except ValueError as ve: # Catch the specific ValueError for missing season
-            raise HTTPException(
-                status_code=400, # Bad request for missing required parameter
-                detail=str(ve)
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, league_id="bigint", age="integer", team_id="bigint", season="integer", season_filter=(self.ALL_SEASONS, self.ONE_SEASON), stat=PLAYER_STATS).bind(league_id=league_id, age=age, team_id=team_id, season=season, season_filter=season_filter, stat=stat)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for team {team_id} in league {league_id}")
+        return result
 
     # GET the rankings of Top Leagues
-    def top_leagues_rankings(self, season: int):
+    @cached()
+    async def top_leagues_rankings(self, season: int):
         # List of competition IDs we want to include
         comp_ids = [1, 2, 3, 4, 5, 7, 8,9, 25, 10, 11, 12, 13, 20, 85, 75, 291, 5179]
         
-        try:
-            # Query to get league info and top 5 rankings for each competition
-            query = f"""
-            SELECT json_agg(league_data ORDER BY league_order)
-            FROM (
-                SELECT 
-                    l.league_id AS comp_id,
-                    l.league_name,
-                    l.country_id,
-                    l.type,
-                    t.logo_url AS country_url,
-                    (
-                        SELECT json_agg(team_ranks)
-                        FROM (
-                            SELECT 
-                                lr.rank::text AS rank,
-                                lr.team_id,
-                                t2.team_name,
-                                t2.logo_url AS team_logo,
-                                COALESCE(lr.info, '') AS info,
-                                lr.points,
-                                lr.gp,
-                                lr.wins,
-                                lr.losses,
-                                lr.draws,
-                                lr.goals_f,
-                                lr.goals_a,
-                                lr.gd
-                            FROM league_ranks lr
-                            JOIN teams t2 ON lr.team_id = t2.team_id
-                            WHERE lr.comp_id = l.league_id
-                            AND lr.season_year = {season}
-                            ORDER BY lr.rank::integer ASC
-                            LIMIT 20
-                        ) team_ranks
-                    ) AS ranks,
-                    CASE l.league_id
-                        WHEN 1 THEN 1
-                        WHEN 2 THEN 2
-                        WHEN 3 THEN 3
-                        WHEN 4 THEN 4
-                        WHEN 5 THEN 5
-                        WHEN 7 THEN 6
-                        WHEN 8 THEN 7
-                        WHEN 9 THEN 8
-                        WHEN 10 THEN 9
-                        WHEN 11 THEN 10
-                        WHEN 12 THEN 11
-                        WHEN 13 THEN 12
-                        WHEN 20 THEN 13
-                        WHEN 291 THEN 14
-                        ELSE 999
-                    END AS league_order
-                FROM leagues l
-                LEFT JOIN teams t ON l.country_id = t.team_id
-                WHERE l.league_id IN ({','.join(map(str, comp_ids))})
-                ORDER BY league_order
-            ) league_data;
-            """
-            response = requests.post(self.url, headers=self.headers, json={"sql_query": query})
-            #response.raise_for_status()
-            
-            results = response.json()
-            
-            if not results or not results[0].get("result"):
-                raise HTTPException(
-                    status_code=404,
-                    detail="No league rankings found for the specified season"
-                )
-            # Parse the response
-            league_data = results[0]["result"]
-            if isinstance(league_data, dict):
-                league_data = [league_data]
-            return {"data": league_data}
-        except requests.exceptions.HTTPError as http_err:
-            error_detail = response.text if hasattr(response, 'text') else str(http_err)
-            raise HTTPException(status_code=500, detail=f"HTTP error occurred: {error_detail}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+        # Query to get league info and top 5 rankings for each competition
+        query = sql_template("league.top_rankings", """
+        SELECT json_agg(league_data ORDER BY league_order)
+        FROM (
+            SELECT 
+                l.league_id AS comp_id,
+                l.league_name,
+                l.country_id,
+                l.type,
+                t.logo_url AS country_url,
+                (
+                    SELECT json_agg(team_ranks)
+                    FROM (
+                        SELECT 
+                            lr.rank::text AS rank,
+                            lr.team_id,
+                            t2.team_name,
+                            t2.logo_url AS team_logo,
+                            COALESCE(lr.info, '') AS info,
+                            lr.points,
+                            lr.gp,
+                            lr.wins,
+                            lr.losses,
+                            lr.draws,
+                            lr.goals_f,
+                            lr.goals_a,
+                            lr.gd
+                        FROM league_ranks lr
+                        JOIN teams t2 ON lr.team_id = t2.team_id
+                        WHERE lr.comp_id = l.league_id
+                        AND lr.season_year = :season
+                        ORDER BY lr.rank::integer ASC
+                        LIMIT 20
+                    ) team_ranks
+                ) AS ranks,
+                CASE l.league_id
+                    WHEN 1 THEN 1
+                    WHEN 2 THEN 2
+                    WHEN 3 THEN 3
+                    WHEN 4 THEN 4
+                    WHEN 5 THEN 5
+                    WHEN 7 THEN 6
+                    WHEN 8 THEN 7
+                    WHEN 9 THEN 8
+                    WHEN 10 THEN 9
+                    WHEN 11 THEN 10
+                    WHEN 12 THEN 11
+                    WHEN 13 THEN 12
+                    WHEN 20 THEN 13
+                    WHEN 291 THEN 14
+                    ELSE 999
+                END AS league_order
+            FROM leagues l
+            LEFT JOIN teams t ON l.country_id = t.team_id
+            WHERE l.league_id = ANY(:comp_ids)
+            ORDER BY league_order
+        ) league_data;
+        """, season="integer", comp_ids="bigint[]").bind(season=season, comp_ids=comp_ids)
+        league_data = await self.gateway.execute(query)
+        if not league_data:
+            raise HTTPException(
+                status_code=404,
+                detail="No league rankings found for the specified season"
+            )
+        if isinstance(league_data, dict):
+            league_data = [league_data]
+        return {"data": league_data}
     
     # /leagues/{league_id}/stats get highest stats of a league by year and stat
-    def get_league_matches(self, league_id: int, season: int):
-        query = f"""
+    @cached()
+    async def get_league_matches(self, league_id: int, season: int):
+        query = sql_template("league.matches", """
         SELECT json_build_object(
             'data', json_build_object(
                 'matches', json_agg(
@@ -991,106 +844,70 @@ class LeagueService:
             LEFT JOIN teams ht ON m.home_id = ht.team_id
             LEFT JOIN teams at ON m.away_id = at.team_id
             LEFT JOIN leagues l ON m.comp_id = l.league_id
-            WHERE m.comp_id = {league_id} AND m.season_year = {season}
+            WHERE m.comp_id = :league_id AND m.season_year = :season
             ORDER BY m.match_date DESC
             LIMIT 300
         ) as match_data;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response text: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for league {league_id}"
-                )
-            # Parse the response according to the actual structure
-            #return LeagueStatsResponse(data=result["data"])
-            return result
-        
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, league_id="bigint", season="integer").bind(league_id=league_id, season=season)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for league {league_id}")
+        return result
 
     # /leagues/:id/ranks?season
-    def get_league_ranks(self, comp_id: int, season: int):
-        try:
-            # Query to get league info and rankings with type check
-            query = f"""
-            WITH league_check AS (
-                SELECT l.type
-                FROM leagues l
-                WHERE l.league_id = {comp_id}
-            ),
-            rank_entries AS (
-                SELECT
-                    json_build_object(
-                        'rank', lr.rank::text,
-                        'team', json_build_object(
-                            'team_id', lr.team_id,
-                            'team_name', t2.team_name,
-                            'logo', t2.logo_url
-                        ),
-                        'info', COALESCE(lr.info, ''),
-                        'points', lr.points,
-                        'gp', lr.gp,
-                        'wins', lr.wins,
-                        'losses', lr.losses,
-                        'draws', lr.draws,
-                        'goals_f', lr.goals_f,
-                        'goals_a', lr.goals_a,
-                        'gd', lr.gd
-                    ) as rank_json
-                FROM league_ranks lr
-                JOIN teams t2 ON lr.team_id = t2.team_id
-                WHERE lr.comp_id = {comp_id}
-                AND lr.season_year = {season}
-                ORDER BY lr.rank::integer ASC
-                LIMIT 40
-            )
+    @cached()
+    async def get_league_ranks(self, comp_id: int, season: int):
+        # Query to get league info and rankings with type check
+        query = sql_template("league.ranks", """
+        WITH league_check AS (
+            SELECT l.type
+            FROM leagues l
+            WHERE l.league_id = :comp_id
+        ),
+        rank_entries AS (
             SELECT
-                CASE WHEN (SELECT type FROM league_check) LIKE '%League%' THEN
-                    json_build_object(
-                        'data', json_build_object( -- <--- Changed from json_agg to json_build_object
-                            'ranks', (SELECT coalesce(json_agg(rank_json), '[]'::json) FROM rank_entries)
-                        )
+                json_build_object(
+                    'rank', lr.rank::text,
+                    'team', json_build_object(
+                        'team_id', lr.team_id,
+                        'team_name', t2.team_name,
+                        'logo', t2.logo_url
+                    ),
+                    'info', COALESCE(lr.info, ''),
+                    'points', lr.points,
+                    'gp', lr.gp,
+                    'wins', lr.wins,
+                    'losses', lr.losses,
+                    'draws', lr.draws,
+                    'goals_f', lr.goals_f,
+                    'goals_a', lr.goals_a,
+                    'gd', lr.gd
+                ) as rank_json
+            FROM league_ranks lr
+            JOIN teams t2 ON lr.team_id = t2.team_id
+            WHERE lr.comp_id = :comp_id
+            AND lr.season_year = :season
+            ORDER BY lr.rank::integer ASC
+            LIMIT 40
+        )
+        SELECT
+            CASE WHEN (SELECT type FROM league_check) LIKE '%League%' THEN
+                json_build_object(
+                    'data', json_build_object( -- <--- Changed from json_agg to json_build_object
+                        'ranks', (SELECT coalesce(json_agg(rank_json), '[]'::json) FROM rank_entries)
                     )
-                ELSE
-                    json_build_object('error', 'wrong competition type, make sure id is for a non-league competition')
-                END AS result
-            FROM leagues l
-            WHERE l.league_id = {comp_id};
-            """
-            response = requests.post(self.url, headers=self.headers, json={"sql_query": query})
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response status: {response.status_code}")
-            #print(f"Supabase raw response text: {response.text}")
-            
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for league {comp_id}"
                 )
-            return result
-            
-        except requests.exceptions.HTTPError as http_err:
-            error_detail = response.text if hasattr(response, 'text') else str(http_err)
-            raise HTTPException(status_code=500, detail=f"HTTP error occurred: {error_detail}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+            ELSE
+                json_build_object('error', 'wrong competition type, make sure id is for a non-league competition')
+            END AS result
+        FROM leagues l
+        WHERE l.league_id = :comp_id;
+        """, comp_id="bigint", season="integer").bind(comp_id=comp_id, season=season)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for league {comp_id}")
+        return result
       
     # /leagues/{league_id}/form-recent 
-    def get_league_form_by_year(self, league_id: int, season: int):
-        query = f"""
+    @cached()
+    async def get_league_form_by_year(self, league_id: int, season: int):
+        query = sql_template("league.form_by_year", """
         WITH team_matches AS (
             -- Get all matches for each team (both home and away)
             SELECT 
@@ -1134,10 +951,10 @@ class LeagueService:
             FROM league_ranks lr
             JOIN teams t ON lr.team_id = t.team_id
             JOIN matches m ON (lr.team_id = m.home_id OR lr.team_id = m.away_id)
-            WHERE m.comp_id = {league_id}  -- Replace with your desired competition ID
-            AND m.season_year = {season}  -- Replace with your desired season
-            AND lr.comp_id = {league_id}  -- Ensure we're getting teams from the same competition
-            AND lr.season_year = {season}
+            WHERE m.comp_id = :league_id  -- Replace with your desired competition ID
+            AND m.season_year = :season  -- Replace with your desired season
+            AND lr.comp_id = :league_id  -- Ensure we're getting teams from the same competition
+            AND lr.season_year = :season
         ),
 
         last_6_matches AS (
@@ -1211,35 +1028,15 @@ class LeagueService:
                 )
             ) as result
         FROM ranked_form;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response text: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for league {league_id}"
-                )
-            # Parse the response according to the actual structure
-            #return LeagueStatsResponse(data=result["data"])
-            return result
-        
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, league_id="bigint", season="integer").bind(league_id=league_id, season=season)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for league {league_id}")
+        return result
 
 
     # /leagues/{league_id}/form-dates 
-    def get_league_form_by_dates(self, league_id: int, start_date: str, end_date: str):
-        query = f"""
+    @cached(season_arg='end_date')
+    async def get_league_form_by_dates(self, league_id: int, start_date: str, end_date: str):
+        query = sql_template("league.form_by_dates", """
         WITH team_matches AS (
             -- Get ONLY matches within the date range for each team
             SELECT 
@@ -1277,8 +1074,8 @@ class LeagueService:
                 END as losses
             FROM matches m
             JOIN teams t ON (t.team_id = m.home_id OR t.team_id = m.away_id)
-            WHERE m.comp_id = {league_id}
-            AND m.match_date BETWEEN '{start_date}' AND '{end_date}'  -- Strict date range
+            WHERE m.comp_id = :league_id
+            AND m.match_date BETWEEN :start_date AND :end_date  -- Strict date range
         ),
 
         form_stats AS (
@@ -1345,35 +1142,15 @@ class LeagueService:
                 )
             ) as result
         FROM ranked_form;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response text: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for league {league_id}"
-                )
-            # Parse the response according to the actual structure
-            #return LeagueStatsResponse(data=result["data"])
-            return result
-        
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, league_id="bigint", start_date="date", end_date="date").bind(league_id=league_id, start_date=start_date, end_date=end_date)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for league {league_id}")
+        return result
 
 
     # /leagues/winners
-    def get_recent_winners(self):
-        query = f"""
+    @cached(season_arg=None, stale_for=300)
+    async def get_recent_winners(self):
+        query = sql_template("league.recent_winners", """
         WITH target_comps AS (
             SELECT unnest(ARRAY[1,2,3,4,5,7,8,10,11,9900,9901,98373,7292,25,20,2839,201,482,12,301,101,202]) AS comp_id
         ),
@@ -1453,293 +1230,180 @@ class LeagueService:
                 )
             )
         ) as result
+        """).bind()
+        result = await self.gateway.fetch_data(query, not_found="No data found for recent winners")
+        return result
+
+    async def _league_info(self, league_id: int) -> LeagueInfo:
         """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response text: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for recent winners"
-                )
-            # Parse the response according to the actual structure
-            #return LeagueStatsResponse(data=result["data"])
-            return result
-        
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        League header (name, logo, country) through the request's loaders.
+        """
+        league = await self.loaders.leagues.load(int(league_id))
+        if league is None:
+            raise HTTPException(status_code=404, detail=f"League {league_id} not found")
+        country = await self.loaders.teams.load(league.country_id) if league.country_id else None
+        return LeagueInfo(
+            comp_id=league.league_id,
+            league_name=league.league_name,
+            country_id=league.country_id,
+            country=country.team_name if country else None,
+            league_logo=league.logo_url,
+            type=league.type,
+            country_url=country.logo_url if country else None
+        )
 
     # /leagues/{league_id}/last_winners 
-    def get_league_winners(self, league_id: int):
-        try:
-            # First get league info
-            league = self.supabase.table('leagues').select('*').eq('league_id', league_id).single().execute()
-            
-            # Get country info if exists
-            country = None
-            if league.data.get('country_id'):
-                country = self.supabase.table('teams').select('*').eq('team_id', league.data['country_id']).single().execute()
-            
-            # Define the specific seasons we want
-            target_seasons = [2024, 2023, 2022, 2021, 2020, 2019, 2018, 2017, 2016, 2015, 2014, 2013, 2012, 2011, 2010]
-            
-            # Get winners for the specific seasons
-            winners = self.supabase.table('league_ranks') \
-                .select('*') \
-                .eq('comp_id', league_id) \
-                .in_('season_year', target_seasons) \
-                .or_('rank.eq.1,round.eq.Winners,round.eq.Winner') \
-                .execute()
-            
-            # Get team details for each winner
-            win_teams = []
-            for winner in winners.data:
-                team = self.supabase.table('teams').select('*').eq('team_id', winner['team_id']).single().execute()
-                
-                win_teams.append(WinTeam(
-                    team=Team(
-                        team_id=team.data['team_id'],
-                        team_name=team.data['team_name'],
-                        logo=team.data.get('logo_url')
-                    ),
-                    rank=winner.get('rank'),
-                    round=winner.get('round'),
-                    points=winner.get('points'),
-                    season=winner['season_year'],
-                    rank_id=winner['rank_id']
-                ))
-            
-            # Sort by season descending
-            win_teams.sort(key=lambda x: x.season, reverse=True)
-            
-            # Build the response
-            comp = LeagueInfo(
-                comp_id=league.data['league_id'],
-                league_name=league.data['league_name'],
-                country_id=league.data.get('country_id'),
-                country=country.data['team_name'] if country else None,
-                league_logo=league.data.get('logo_url'),
-                type=league.data.get('type'),
-                country_url=country.data.get('logo_url') if country else None
-            )
-            
-            stats = TopCompsWinners(
-                comp=comp,
-                win_teams=win_teams
-            )
-            
-            return LeagueWinnersResponse(
-                data=LeagueWinnersData(stats=stats)
-            )
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+    @cached(season_arg='end_year')
+    async def get_league_winners(self, league_id: int, start_year: int = 2010, end_year: int = GLOBAL_YEAR):
+        return await self._league_winners(league_id, start_year, end_year, ('Winners', 'Winner'))
         
     # Same above
-    def get_league_winners_by_years(self, league_id: int, start_year: int, end_year: int):
-        try:
-            # Validate year inputs
-            if start_year > end_year:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Start year must be less than or equal to end year"
-                )
-            
-            # First get league info
-            league = self.supabase.table('leagues').select('*').eq('league_id', league_id).single().execute()
-            
-            # Get country info if exists
-            country = None
-            if league.data.get('country_id'):
-                country = self.supabase.table('teams').select('*').eq('team_id', league.data['country_id']).single().execute()
-            
-            # Generate the range of seasons we want (inclusive)
-            target_seasons = list(range(start_year, end_year + 1))
-            
-            # Get winners for the specified seasons
-            winners = self.supabase.table('league_ranks') \
-                .select('*') \
-                .eq('comp_id', league_id) \
-                .in_('season_year', target_seasons) \
-                .or_('rank.eq.1,round.eq.Winners') \
-                .execute()
-            
-            # Get team details for each winner
-            win_teams = []
-            for winner in winners.data:
-                team = self.supabase.table('teams').select('*').eq('team_id', winner['team_id']).single().execute()
-                
-                win_teams.append(WinTeam(
-                    team=Team(
-                        team_id=team.data['team_id'],
-                        team_name=team.data['team_name'],
-                        logo=team.data.get('logo_url')
-                    ),
-                    rank=winner.get('rank'),
-                    round=winner.get('round'),
-                    points=winner.get('points'),
-                    season=winner['season_year']
-                ))
-            
-            # Sort by season descending
-            win_teams.sort(key=lambda x: x.season, reverse=True)
-            
-            # Build the response
-            comp = LeagueInfo(
-                comp_id=league.data['league_id'],
-                league_name=league.data['league_name'],
-                country_id=league.data.get('country_id'),
-                country=country.data['team_name'] if country else None,
-                league_logo=league.data.get('logo_url'),
-                type=league.data.get('type'),
-                country_url=country.data.get('logo_url') if country else None
-            )
-            
-            stats = TopCompsWinners(
-                comp=comp,
-                win_teams=win_teams
-            )
-            
-            return LeagueWinnersResponse(
-                data=LeagueWinnersData(stats=stats)
-            )
-            
-        except Exception as e:
-            if isinstance(e, HTTPException):
-                raise e
+    @cached(season_arg='end_year')
+    async def get_league_winners_by_years(self, league_id: int, start_year: int, end_year: int):
+        return await self._league_winners(league_id, start_year, end_year, ('Winners',))
+
+    async def _league_winners(self, league_id: int, start_year: int, end_year: int, rounds: tuple) -> LeagueWinnersResponse:
+        """
+        Winners (rank 1 or a winning cup round) of a competition for a range
+        of seasons, newest first. One joined query, the league header comes
+        from the dimension store.
+        """
+        if start_year > end_year:
             raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
+                status_code=400,
+                detail="Start year must be less than or equal to end year"
             )
 
-
-    # /leagues/:id/highest_stat
-    def get_highest_league_stat2(self, league_id: int, stat: str, start_year: int, end_year: int, desc: bool):
-        try:
-            # Validate year inputs
-            if start_year > end_year:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Start year must be less than or equal to end year"
-                )
-            
-            # Validate stat field
-            valid_stats = {
-                'rank', 'info', 'points', 'gp', 'gd', 'wins', 
-                'losses', 'draws', 'goals_f', 'goals_a'
-            }
-            if stat not in valid_stats:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid stat field. Must be one of: {', '.join(valid_stats)}"
-                )
-            
-            # First get league info
-            league = self.supabase.table('leagues').select('*').eq('league_id', league_id).single().execute()
-            
-            # Get country info if exists
-            country = None
-            if league.data.get('country_id'):
-                country = self.supabase.table('teams').select('*').eq('team_id', league.data['country_id']).single().execute()
-            
-            # Generate the range of seasons we want (inclusive)
-            target_seasons = list(range(start_year, end_year + 1))
-            
-            # Initialize the response structure
-            years_data = {}
-            
-            for season in target_seasons:
-                # Get teams for this season ordered by the specified stat
-                # Correct order syntax for Python supabase client
-                query = self.supabase.table('league_ranks') \
-                    .select('*') \
-                    .eq('comp_id', league_id) \
-                    .eq('season_year', season)
-                
-                # Apply ordering based on the stat and direction
-                if desc:
-                    query = query.order(stat, desc=True)
-                else:
-                    query = query.order(stat)
-                
-                # Execute the query with limit
-                teams = query.limit(3).execute()
-                
-                # Process teams for this season
-                season_teams = []
-                for team_data in teams.data:
-                    team = self.supabase.table('teams').select('*').eq('team_id', team_data['team_id']).single().execute()
-                    
-                    season_teams.append(TeamRank(
-                        team=Team(
-                            team_id=team.data['team_id'],
-                            team_name=team.data['team_name'],
-                            logo=team.data.get('logo_url')
+        comp = await self._league_info(league_id)
+        query = sql_template("league.winners", """
+        SELECT json_build_object(
+            'data', COALESCE(
+                (SELECT json_agg(
+                    json_build_object(
+                        'team', json_build_object(
+                            'team_id', t.team_id,
+                            'team_name', t.team_name,
+                            'logo', t.logo_url
                         ),
-                        rank=str(team_data.get('rank')),
-                        info=team_data.get('info'),
-                        points=team_data.get('points'),
-                        gp=team_data.get('gp'),
-                        gd=team_data.get('gd'),
-                        wins=team_data.get('wins'),
-                        losses=team_data.get('losses'),
-                        draws=team_data.get('draws'),
-                        goals_f=team_data.get('goals_f'),
-                        goals_a=team_data.get('goals_a')
-                    ))
-                
-                # Add to years data
-                years_data[str(season)] = season_teams
-            
-            # Build the response
-            comp = LeagueInfo(
-                comp_id=league.data['league_id'],
-                league_name=league.data['league_name'],
-                country_id=league.data.get('country_id'),
-                country=country.data['team_name'] if country else None,
-                league_logo=league.data.get('logo_url'),
-                type=league.data.get('type'),
-                country_url=country.data.get('logo_url') if country else None
-            )
-            
-            stats = TeamLeagueStats(
-                comp=comp,
-                years=years_data
+                        'rank', lr.rank,
+                        'round', lr.round,
+                        'points', lr.points,
+                        'season', lr.season_year,
+                        'rank_id', lr.rank_id
+                    ) ORDER BY lr.season_year DESC
+                )
+                FROM league_ranks lr
+                JOIN teams t ON t.team_id = lr.team_id
+                WHERE lr.comp_id = :league_id
+                  AND lr.season_year BETWEEN :start_year AND :end_year
+                  AND (lr.rank::text = '1' OR lr.round = ANY(:rounds))),
+                '[]'::json
             )
-            
-            return LeagueTeamStatResponse(
-                data=LeagueTeamStatData(stats=stats)
+        ) as result
+        """, league_id="bigint", start_year="integer", end_year="integer", rounds="text[]").bind(league_id=league_id, start_year=start_year, end_year=end_year, rounds=list(rounds))
+        result = await self.gateway.execute(query)
+        win_teams = [WinTeam.model_validate(w) for w in (result or {}).get("data") or []]
+
+        return LeagueWinnersResponse(
+            data=LeagueWinnersData(stats=TopCompsWinners(comp=comp, win_teams=win_teams))
+        )
+
+
+    # league_ranks columns a ranking can be ordered by
+    RANK_STATS = ('rank', 'info', 'points', 'gp', 'gd', 'wins', 'losses', 'draws', 'goals_f', 'goals_a')
+
+    def _check_rank_stat(self, stat: str):
+        if stat not in self.RANK_STATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid stat field. Must be one of: {', '.join(self.RANK_STATS)}"
             )
-            
-        except Exception as e:
-            if isinstance(e, HTTPException):
-                raise e
+
+    # /leagues/:id/teams_topbystat
+    @cached(season_arg='end_year')
+    async def get_highest_league_stat2(self, league_id: int, stat: str, start_year: int, end_year: int, desc: bool, top: int = 3):
+        """
+        Top `top` teams of every season in the range by a league_ranks
+        column, in one pass: ROW_NUMBER() partitioned by season, joined to
+        teams. Seasons without rows come back as empty lists.
+        """
+        if start_year > end_year:
             raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
+                status_code=400,
+                detail="Start year must be less than or equal to end year"
             )
-   
+        self._check_rank_stat(stat)
+        if top < 1:
+            raise HTTPException(status_code=400, detail="top must be at least 1")
+
+        comp = await self._league_info(league_id)
+        direction = "DESC" if desc else "ASC"
+
+        query = sql_template("league.highest_stat_windowed", """
+        WITH ranked AS (
+            SELECT
+                lr.season_year,
+                ROW_NUMBER() OVER (
+                    PARTITION BY lr.season_year
+                    ORDER BY lr.:stat :direction NULLS LAST, lr.team_id
+                ) as row_num,
+                json_build_object(
+                    'team', json_build_object(
+                        'team_id', t.team_id,
+                        'team_name', t.team_name,
+                        'logo', t.logo_url
+                    ),
+                    'rank', lr.rank::text,
+                    'info', lr.info,
+                    'points', lr.points,
+                    'gp', lr.gp,
+                    'gd', lr.gd,
+                    'wins', lr.wins,
+                    'losses', lr.losses,
+                    'draws', lr.draws,
+                    'goals_f', lr.goals_f,
+                    'goals_a', lr.goals_a
+                ) as team_data
+            FROM league_ranks lr
+            JOIN teams t ON t.team_id = lr.team_id
+            WHERE lr.comp_id = :league_id
+              AND lr.season_year BETWEEN :start_year AND :end_year
+        ),
+        seasons AS (
+            SELECT
+                ss.season_year,
+                COALESCE(
+                    json_agg(r.team_data ORDER BY r.row_num) FILTER (WHERE r.row_num IS NOT NULL),
+                    '[]'::json
+                ) as teams
+            FROM generate_series(:start_year, :end_year) as ss(season_year)
+            LEFT JOIN ranked r ON r.season_year = ss.season_year AND r.row_num <= :top
+            GROUP BY ss.season_year
+        )
+        SELECT json_build_object(
+            'data', (SELECT json_object_agg(season_year::text, teams ORDER BY season_year) FROM seasons)
+        ) as result
+        """, league_id="bigint", start_year="integer", end_year="integer", top="integer", stat=self.RANK_STATS, direction=("ASC", "DESC")).bind(league_id=league_id, start_year=start_year, end_year=end_year, top=top, stat=stat, direction=direction)
+        result = await self.gateway.execute(query)
+        years = (result or {}).get("data") or {}
+
+        return LeagueTeamStatResponse(
+            data=LeagueTeamStatData(stats=TeamLeagueStats(
+                comp=comp,
+                years={season: [TeamRank.model_validate(t) for t in teams] for season, teams in years.items()}
+            ))
+        )
 
     # /leagues/:id/highest_stat
-    def get_highest_league_stat(self, league_id: int, stat: str, start_year: int, end_year: int, desc: bool):
+    @cached(season_arg='end_year')
+    async def get_highest_league_stat(self, league_id: int, stat: str, start_year: int, end_year: int, desc: bool):
+        self._check_rank_stat(stat)
         if desc:
             order_direction = "DESC"
         else:
             order_direction = "ASC"
 
-        query = f"""
+        query = sql_template("league.highest_stat", """
         WITH league_info AS (
         SELECT 
             l.league_id as comp_id,
@@ -1751,10 +1415,10 @@ class LeagueService:
             ct.logo_url as country_url
         FROM leagues l
         LEFT JOIN teams ct ON ct.team_id = l.country_id
-        WHERE l.league_id = {league_id}
+        WHERE l.league_id = :league_id
     ),
     season_series AS (
-        SELECT generate_series({start_year}, {end_year}) as season_year
+        SELECT generate_series(:start_year, :end_year) as season_year
     ),
     ranked_teams AS (
         SELECT 
@@ -1763,8 +1427,8 @@ class LeagueService:
             ROW_NUMBER() OVER (
                 PARTITION BY ss.season_year 
                 ORDER BY 
-                    CASE WHEN '{order_direction}' = 'DESC' THEN lr.{stat} END DESC,
-                    CASE WHEN '{order_direction}' = 'ASC' THEN lr.{stat} END ASC
+                    CASE WHEN :order_direction = 'DESC' THEN lr.:stat END DESC,
+                    CASE WHEN :order_direction = 'ASC' THEN lr.:stat END ASC
             ) as row_num,
             json_build_object(
                 'team', json_build_object(
@@ -1784,7 +1448,7 @@ class LeagueService:
                 'goals_a', lr.goals_a
             ) as team_data
         FROM season_series ss
-        JOIN league_ranks lr ON lr.comp_id = {league_id} AND lr.season_year = ss.season_year
+        JOIN league_ranks lr ON lr.comp_id = :league_id AND lr.season_year = ss.season_year
         JOIN teams t ON t.team_id = lr.team_id
     ),
     top_teams AS (
@@ -1821,39 +1485,20 @@ class LeagueService:
             )
         )
     ) as result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response text: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for recent winners"
-                )
-            # Parse the response according to the actual structure
-            #return LeagueStatsResponse(data=result["data"])
-            return result
-        
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, league_id="bigint", start_year="integer", end_year="integer", order_direction="text", stat=self.RANK_STATS).bind(league_id=league_id, start_year=start_year, end_year=end_year, order_direction=order_direction, stat=stat)
+        result = await self.gateway.fetch_data(query, not_found="No data found for recent winners")
+        return result
    
     # /leagues/:id/highest_stat_by_year
-    def get_highest_league_stat_by_year(self, league_id: int, stat: str, season: int, desc: bool):
+    @cached()
+    async def get_highest_league_stat_by_year(self, league_id: int, stat: str, season: int, desc: bool):
+        self._check_rank_stat(stat)
         if desc:
             order_direction = "DESC"
         else:
             order_direction = "ASC"
 
-        query = f"""
+        query = sql_template("league.highest_stat_by_year", """
         WITH league_info AS (
             SELECT 
                 l.league_id as comp_id,
@@ -1865,7 +1510,7 @@ class LeagueService:
                 ct.logo_url as country_url
             FROM leagues l
             LEFT JOIN teams ct ON ct.team_id = l.country_id
-            WHERE l.league_id = {league_id}
+            WHERE l.league_id = :league_id
         ),
         ranked_teams AS (
             SELECT 
@@ -1888,10 +1533,10 @@ class LeagueService:
                 ) as team_data
             FROM league_ranks lr
             JOIN teams t ON t.team_id = lr.team_id
-            WHERE lr.comp_id = {league_id} AND lr.season_year = {season}
+            WHERE lr.comp_id = :league_id AND lr.season_year = :season
             ORDER BY
-                CASE WHEN '{order_direction}' = 'DESC' THEN lr.{stat} END DESC,
-                CASE WHEN '{order_direction}' = 'ASC' THEN lr.{stat} END ASC
+                CASE WHEN :order_direction = 'DESC' THEN lr.:stat END DESC,
+                CASE WHEN :order_direction = 'ASC' THEN lr.:stat END ASC
             LIMIT 3
         ),
         teams_array AS (
@@ -1905,7 +1550,7 @@ class LeagueService:
         years_data AS (
             SELECT 
                 json_build_object(
-                    '{season}', (SELECT teams_data FROM teams_array)
+                    :season, (SELECT teams_data FROM teams_array)
                 ) as years
         )
         SELECT json_build_object(
@@ -1916,30 +1561,9 @@ class LeagueService:
                 )
             )
         ) as result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response text: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for recent winners"
-                )
-            # Parse the response according to the actual structure
-            #return LeagueStatsResponse(data=result["data"])
-            return result
-        
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, league_id="bigint", season="integer", order_direction="text", stat=self.RANK_STATS).bind(league_id=league_id, season=season, order_direction=order_direction, stat=stat)
+        result = await self.gateway.fetch_data(query, not_found="No data found for recent winners")
+        return result
    
 
 
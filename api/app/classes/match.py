@@ -1,25 +1,23 @@
 from fastapi import HTTPException
 from typing import List
 from pydantic import BaseModel
-from app.models.response import MatchInfoResponse
-from supabase import Client
-import requests
+from app.dependencies import get_sql_gateway
+from app.queries import sql_template
+from app.loaders import request_loaders
+from supabase import AsyncClient
+from app.cache import cached
 from typing import Optional
 
 
 class MatchService:
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_client: AsyncClient):
         self.supabase = supabase_client
-        self.key = supabase_client.supabase_key
-        self.url = f"{supabase_client.rest_url}/rpc/execute_sql"
-        self.headers = {
-            "Authorization": f"Bearer {self.key}",
-            "apikey": self.key,
-            "Content-Type": "application/json"
-        }
+        self.gateway = get_sql_gateway()
+        self.loaders = request_loaders()
     
-    def get_match_data(self, match_id: int):
-        query = f"""
+    @cached(season_arg=None)
+    async def get_match_data(self, match_id: int):
+        query = sql_template("match.data", """
         WITH events AS (
             SELECT
                 id,
@@ -65,7 +63,7 @@ class MatchService:
             LEFT JOIN teams a_n2 ON active_p.nation2_id = a_n2.team_id
             LEFT JOIN teams p_n1 ON passive_p.nation1_id = p_n1.team_id
             LEFT JOIN teams p_n2 ON passive_p.nation2_id = p_n2.team_id
-            WHERE match_events.match_id = {match_id}
+            WHERE match_events.match_id = :match_id
             ORDER BY (minute + add_minute) ASC
         ),
         teams AS (
@@ -208,7 +206,7 @@ class MatchService:
             LEFT JOIN teams at ON m.away_id = at.team_id
             LEFT JOIN people h_manager ON m.home_manager_id = h_manager.id
             LEFT JOIN people a_manager ON m.away_manager_id = a_manager.id
-            WHERE m.match_id = {match_id}
+            WHERE m.match_id = :match_id
         )
         SELECT json_build_object(
             'data', json_build_object(
@@ -230,44 +228,11 @@ class MatchService:
                         l.logo_url as comp_logo
                     FROM matches
                     LEFT JOIN leagues l ON matches.comp_id = l.league_id
-                    WHERE matches.match_id = {match_id}
+                    WHERE matches.match_id = :match_id
                 ) m)
             )
         ) as result;
-        """
+        """, function="ga_match_data_v1", match_id="bigint").bind(match_id=match_id)
 
-        try:
-            # Use "query" instead of "sql_query" for the parameter name
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}  # Changed from "sql_query" to "query"
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-            # Debug prints (keep these for troubleshooting)
-            #print(f"Supabase raw response status: {response.status_code}")
-            #print(f"Supabase raw response text: {response.text}")
-            
-            # The response structure is {"data": {...}} not a list with result[0]
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for match {match_id}"
-                )
-                
-            # Parse the response according to the actual structure
-            return MatchInfoResponse(data=result["data"])
-            
-        except requests.exceptions.HTTPError as http_err:
-            error_detail = response.text if hasattr(response, 'text') else str(http_err)
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Supabase error: {error_detail}"
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
\ No newline at end of file
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for match {match_id}")
+        return result
\ No newline at end of file
@@ -1,69 +1,107 @@
 from fastapi import HTTPException
+from datetime import date
 from typing import List
 from pydantic import BaseModel
+from app.dependencies import get_sql_gateway
+from app.queries import sql_template, like_pattern
+from app.loaders import request_loaders
+from app.search import player_search_index
+from app.transfers import random_transfer
 from app.models.response import StatsDist, TeamDist, Pens, PlayerGADistResponse, PlayerGADistData, TotalGA, GoalDist, Comp2
 from app.models.league import Comp
 from app.models.team import Team
 
-from supabase import Client
-import requests
+from supabase import AsyncClient
+from app.cache import cached
 from typing import Optional
 
 class PlayerService:
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_client: AsyncClient):
         self.supabase = supabase_client
-        self.key = supabase_client.supabase_key
-        self.url = f"{supabase_client.rest_url}/rpc/execute_sql"
-        self.headers = {
-            "Authorization": f"Bearer {self.key}",
-            "apikey": self.key,
-            "Content-Type": "application/json"
-        }
+        self.gateway = get_sql_gateway()
+        self.loaders = request_loaders()
 
-    def player_search(self, player_name: str):
+    async def _indexed_search(self, player_name: str) -> list:
+        """
+        Search rows from the in-memory index, with the team and nation
+        objects the SQL search joins in taken from the dimension store.
+        """
+        rows = player_search_index.search(player_name)
+        team_ids = {row.get(col) for row in rows for col in ("curr_team_id", "parent_team_id", "nation1_id", "nation2_id")}
+        team_dims = await self.loaders.teams.load_many(t for t in team_ids if t is not None)
+
+        def team(team_id):
+            dim = team_dims.get(team_id)
+            return {"team_name": dim.team_name, "logo_url": dim.logo_url} if dim else None
+
+        return [{
+            **row,
+            "curr_team": team(row.get("curr_team_id")),
+            "parent_team": team(row.get("parent_team_id")),
+            "nation1_team": team(row.get("nation1_id")),
+            "nation2_team": team(row.get("nation2_id")),
+        } for row in rows]
+
+    async def _sql_search(self, player_name: str) -> list:
+        query = sql_template("player.search", """
+        SELECT json_build_object(
+            'data', COALESCE((
+                SELECT json_agg(found) FROM (
+                    SELECT
+                        p.player_id,
+                        p.player_name,
+                        p.full_name,
+                        p.pic_url,
+                        p."isRetired",
+                        p.curr_team_id,
+                        p.curr_number,
+                        p."onLoan",
+                        p.instagram,
+                        p.parent_team_id,
+                        p.position,
+                        p.dob,
+                        p.age,
+                        p.pob,
+                        p.nation1,
+                        p.nation2,
+                        p.nation1_id,
+                        p.nation2_id,
+                        p.market_value,
+                        p.height,
+                        p.foot,
+                        p.date_joined,
+                        p.contract_end,
+                        p.last_extension,
+                        p.parent_club_exp,
+                        p."noClub",
+                        CASE WHEN ct.team_id IS NOT NULL THEN json_build_object('team_name', ct.team_name, 'logo_url', ct.logo_url) END as curr_team,
+                        CASE WHEN pt.team_id IS NOT NULL THEN json_build_object('team_name', pt.team_name, 'logo_url', pt.logo_url) END as parent_team,
+                        CASE WHEN n1.team_id IS NOT NULL THEN json_build_object('team_name', n1.team_name, 'logo_url', n1.logo_url) END as nation1_team,
+                        CASE WHEN n2.team_id IS NOT NULL THEN json_build_object('team_name', n2.team_name, 'logo_url', n2.logo_url) END as nation2_team
+                    FROM players p
+                    LEFT JOIN teams ct ON p.curr_team_id = ct.team_id
+                    LEFT JOIN teams pt ON p.parent_team_id = pt.team_id
+                    LEFT JOIN teams n1 ON p.nation1_id = n1.team_id
+                    LEFT JOIN teams n2 ON p.nation2_id = n2.team_id
+                    WHERE p.player_name ILIKE '%' || :pattern || '%'
+                       OR p.player_slug ILIKE '%' || :pattern || '%'
+                    ORDER BY p."isRetired" ASC, p.market_value DESC, p.player_name
+                    LIMIT 15
+                ) found
+            ), '[]'::json)
+        ) as result
+        """, pattern="text").bind(pattern=like_pattern(player_name))
+        result = await self.gateway.execute(query)
+        return (result or {}).get("data") or []
+
+    async def player_search(self, player_name: str):
         try:
-            # Search players with related team data
-            result = self.supabase.table('players') \
-                .select('''
-                    player_id,
-                    player_name,
-                    full_name,
-                    pic_url,
-                    isRetired,
-                    curr_team_id,
-                    curr_number,
-                    onLoan,
-                    instagram,
-                    parent_team_id,
-                    position,
-                    dob,
-                    age,
-                    pob,
-                    nation1,
-                    nation2,
-                    nation1_id,
-                    nation2_id,
-                    market_value,
-                    height,
-                    foot,
-                    date_joined,
-                    contract_end,
-                    last_extension,
-                    parent_club_exp,
-                    noClub,
-                    curr_team:teams!curr_team_id(team_name, logo_url),
-                    parent_team:teams!parent_team_id(team_name, logo_url),
-                    nation1_team:teams!nation1_id(team_name, logo_url),
-                    nation2_team:teams!nation2_id(team_name, logo_url)
-                ''') \
-                .or_(f'player_name.ilike.%{player_name}%,player_slug.ilike.%{player_name}%') \
-                .order('isRetired', desc=False) \
-                .order('market_value', desc=True) \
-                .order('player_name') \
-                .limit(15) \
-                .execute()
+            if player_search_index.ready:
+                rows = await self._indexed_search(player_name)
+            else:
+                rows = await self._sql_search(player_name)
 
-            if not result.data:
+            if not rows:
                 # Return empty search results in the correct format
                 return {
                     "data": {
@@ -73,7 +111,7 @@ class PlayerService:
 
             # Transform the result to match PlayerSearchResponse format
             players_data = []
-            for row in result.data:
+            for row in rows:
                 # Extract team information from nested objects
                 curr_team = row.get("curr_team")
                 parent_team = row.get("parent_team")
@@ -144,430 +182,358 @@ class PlayerService:
             )
 
     # basic player data for player page
-    def get_player_page_data(self, player_id: int):
-        try:
-            query = f"""
-            WITH player_info AS (
-                SELECT
-                    p.player_id,
-                    p.player_name,
-                    p.full_name,
-                    p.pic_url,
-                    p."isRetired",
-                    p.curr_team_id,
-                    t.team_name AS curr_team_name,
-                    t.logo_url AS curr_team_logo,
-                    p.curr_number,
-                    p."onLoan",
-                    p.instagram,
-                    p.parent_team_id,
-                    t2.team_name AS parent_team_name,
-                    t2.logo_url AS parent_team_logo,
-                    p.position,
-                    p.dob,
-                    p.age,
-                    p.pob,
-                    json_build_object(
-                        'nation1_id', p.nation1_id,
-                        'nation2_id', p.nation2_id,
-                        'nation1', n1.team_name,
-                        'nation2', n2.team_name,
-                        'nation1_url', n1.logo_url,
-                        'nation2_url', n2.logo_url
-                    ) as nations,
-                    p.market_value,
-                    p.height,
-                    p.foot,
-                    p.date_joined,
-                    p.contract_end,
-                    p.last_extension,
-                    p.parent_club_exp,
-                    p."noClub"
-                FROM players p
-                LEFT JOIN teams t ON p.curr_team_id = t.team_id
-                LEFT JOIN teams t2 ON p.parent_team_id = t2.team_id
-                LEFT JOIN teams n1 ON p.nation1_id = n1.team_id
-                LEFT JOIN teams n2 ON p.nation2_id = n2.team_id
-                
+    @cached(season_arg=None)
+    async def get_player_page_data(self, player_id: int):
+        query = sql_template("player.page_data", """
+        WITH player_info AS (
+            SELECT
+                p.player_id,
+                p.player_name,
+                p.full_name,
+                p.pic_url,
+                p."isRetired",
+                p.curr_team_id,
+                t.team_name AS curr_team_name,
+                t.logo_url AS curr_team_logo,
+                p.curr_number,
+                p."onLoan",
+                p.instagram,
+                p.parent_team_id,
+                t2.team_name AS parent_team_name,
+                t2.logo_url AS parent_team_logo,
+                p.position,
+                p.dob,
+                p.age,
+                p.pob,
+                json_build_object(
+                    'nation1_id', p.nation1_id,
+                    'nation2_id', p.nation2_id,
+                    'nation1', n1.team_name,
+                    'nation2', n2.team_name,
+                    'nation1_url', n1.logo_url,
+                    'nation2_url', n2.logo_url
+                ) as nations,
+                p.market_value,
+                p.height,
+                p.foot,
+                p.date_joined,
+                p.contract_end,
+                p.last_extension,
+                p.parent_club_exp,
+                p."noClub"
+            FROM players p
+            LEFT JOIN teams t ON p.curr_team_id = t.team_id
+            LEFT JOIN teams t2 ON p.parent_team_id = t2.team_id
+            LEFT JOIN teams n1 ON p.nation1_id = n1.team_id
+            LEFT JOIN teams n2 ON p.nation2_id = n2.team_id
+            
 
-                WHERE p.player_id = {player_id}
-            ),
-            player_transfers AS (
-                SELECT
-                    tr.transfer_id,
-                    tr.player_id,
-                    p.player_name,
-                    json_build_object(
-                        'team_id', ft.team_id,
-                        'team_name', ft.team_name,
-                        'team_url', ft.logo_url,
-                        'nation', fn.team_name,
-                        'nation_url', fn.logo_url
-                    ) as from_team,
-                    json_build_object(
-                        'team_id', tt.team_id,
-                        'team_name', tt.team_name,
-                        'team_url', tt.logo_url,
-                        'nation', tn.team_name,
-                        'nation_url', tn.logo_url
-                    ) as to_team,
-                    tr."isLoan",
-                    tr.fee,
-                    tr.value,
-                    tr.date,
-                    tr.season
-                FROM transfers tr
-                LEFT JOIN players p ON tr.player_id = p.player_id
-                LEFT JOIN teams ft ON tr.from_team_id = ft.team_id
-                LEFT JOIN teams tt ON tr.to_team_id = tt.team_id
-                LEFT JOIN leagues fl ON ft.league_id = fl.league_id
-                LEFT JOIN leagues tl ON tt.league_id = tl.league_id
-                LEFT JOIN teams fn ON fl.country_id = fn.team_id
-                LEFT JOIN teams tn ON tl.country_id = tn.team_id
-                WHERE tr.player_id = {player_id}
-                ORDER BY tr.date DESC
-            ),
+            WHERE p.player_id = :player_id
+        ),
+        player_transfers AS (
+            SELECT
+                tr.transfer_id,
+                tr.player_id,
+                p.player_name,
+                json_build_object(
+                    'team_id', ft.team_id,
+                    'team_name', ft.team_name,
+                    'team_url', ft.logo_url,
+                    'nation', fn.team_name,
+                    'nation_url', fn.logo_url
+                ) as from_team,
+                json_build_object(
+                    'team_id', tt.team_id,
+                    'team_name', tt.team_name,
+                    'team_url', tt.logo_url,
+                    'nation', tn.team_name,
+                    'nation_url', tn.logo_url
+                ) as to_team,
+                tr."isLoan",
+                tr.fee,
+                tr.value,
+                tr.date,
+                tr.season
+            FROM transfers tr
+            LEFT JOIN players p ON tr.player_id = p.player_id
+            LEFT JOIN teams ft ON tr.from_team_id = ft.team_id
+            LEFT JOIN teams tt ON tr.to_team_id = tt.team_id
+            LEFT JOIN leagues fl ON ft.league_id = fl.league_id
+            LEFT JOIN leagues tl ON tt.league_id = tl.league_id
+            LEFT JOIN teams fn ON fl.country_id = fn.team_id
+            LEFT JOIN teams tn ON tl.country_id = tn.team_id
+            WHERE tr.player_id = :player_id
+            ORDER BY tr.date DESC
+        ),
 
-            player_stats AS (
-                SELECT
-                    json_build_object(
-                        'player_id', ps.player_id,
-                        'player_name', p.player_name,
-                        'img', p.pic_url
-                    ) as player,
-                    json_build_object(
-                        'comp_id', ps.comp_id,
-                        'comp_name', l.league_name,
-                        'comp_url', l.logo_url
-                    ) as comp,
-                    json_build_object(
-                        'team_id', ps.team_id,
-                        'team_name', t.team_name,
-                        'logo', t.logo_url
-                    ) as team,
-                    ps.season_year,
-                    ps.age,
-                    ps.ga,
-                    ps.ga_pg,
-                    ps.goals,
-                    ps.goals_pg,
-                    ps.assists,
-                    ps.assists_pg,
-                    ps.penalty_goals,
-                    ps.gp,
-                    ps.minutes,
-                    ps.minutes_pg,
-                    ps.cs,
-                    ps.pass_compl_pg,
-                    ps.passes_pg,
-                    ps.errors_pg,
-                    ps.shots_pg,
-                    ps.shots_on_target_pg,
-                    ps.sca_pg,
-                    ps.gca_pg,
-                    ps.take_ons_pg,
-                    ps.take_ons_won_pg,
-                    ps.goals_concede,
-                    ps.yellows,
-                    ps.yellows2,
-                    ps.reds,
-                    ps.own_goals,
-                    ps.stats_id
-                    
-                FROM player_stats ps
-                JOIN players p ON ps.player_id = p.player_id
-                JOIN teams t ON ps.team_id = t.team_id
-                JOIN leagues l ON ps.comp_id = l.league_id
+        player_stats AS (
+            SELECT
+                json_build_object(
+                    'player_id', ps.player_id,
+                    'player_name', p.player_name,
+                    'img', p.pic_url
+                ) as player,
+                json_build_object(
+                    'comp_id', ps.comp_id,
+                    'comp_name', l.league_name,
+                    'comp_url', l.logo_url
+                ) as comp,
+                json_build_object(
+                    'team_id', ps.team_id,
+                    'team_name', t.team_name,
+                    'logo', t.logo_url
+                ) as team,
+                ps.season_year,
+                ps.age,
+                ps.ga,
+                ps.ga_pg,
+                ps.goals,
+                ps.goals_pg,
+                ps.assists,
+                ps.assists_pg,
+                ps.penalty_goals,
+                ps.gp,
+                ps.minutes,
+                ps.minutes_pg,
+                ps.cs,
+                ps.pass_compl_pg,
+                ps.passes_pg,
+                ps.errors_pg,
+                ps.shots_pg,
+                ps.shots_on_target_pg,
+                ps.sca_pg,
+                ps.gca_pg,
+                ps.take_ons_pg,
+                ps.take_ons_won_pg,
+                ps.goals_concede,
+                ps.yellows,
+                ps.yellows2,
+                ps.reds,
+                ps.own_goals,
+                ps.stats_id
+                
+            FROM player_stats ps
+            JOIN players p ON ps.player_id = p.player_id
+            JOIN teams t ON ps.team_id = t.team_id
+            JOIN leagues l ON ps.comp_id = l.league_id
 
-                WHERE ps.player_id = {player_id}
-                and ps.season_year = 2024
-                ORDER BY ps.ga DESC
-            )
-            SELECT json_build_object(
-                'data', json_build_object(
-                    'info', (SELECT row_to_json(player_info) FROM player_info),
-                    'transfers', (SELECT coalesce(json_agg(row_to_json(player_transfers)), '[]'::json) FROM player_transfers),
-                    'stats', (SELECT coalesce(json_agg(row_to_json(player_stats)), '[]'::json) FROM player_stats)
-                )
-            ) as result;
-            """
-            
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json() 
-            #print(f"Supabase raw response status: {response.status_code}")
-            #print(f"Supabase response: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for"
-                )
-            return result
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
+            WHERE ps.player_id = :player_id
+            and ps.season_year = 2024
+            ORDER BY ps.ga DESC
+        )
+        SELECT json_build_object(
+            'data', json_build_object(
+                'info', (SELECT row_to_json(player_info) FROM player_info),
+                'transfers', (SELECT coalesce(json_agg(row_to_json(player_transfers)), '[]'::json) FROM player_transfers),
+                'stats', (SELECT coalesce(json_agg(row_to_json(player_stats)), '[]'::json) FROM player_stats)
             )
+        ) as result;
+        """, player_id="bigint").bind(player_id=player_id)
+        result = await self.gateway.fetch_data(query, not_found="No data found for")
+        return result
 
     # random player transfer
-    def get_random_transfer(self, start_date: str, end_date: str):
-        try:
-            query = f"""
-            WITH transfer_data AS (
-                SELECT
-                    tr.transfer_id,
-                    tr.player_id,
-                    p.player_name,
-                    json_build_object(
-                        'team_id', ft.team_id,
-                        'team_name', ft.team_name,
-                        'team_url', ft.logo_url,
-                        'nation', fn.team_name,
-                        'nation_url', fn.logo_url
-                    ) as from_team,
-                    json_build_object(
-                        'team_id', tt.team_id,
-                        'team_name', tt.team_name,
-                        'team_url', tt.logo_url,
-                        'nation', tn.team_name,
-                        'nation_url', tn.logo_url
-                    ) as to_team,
-                    tr."isLoan",
-                    tr.fee,
-                    tr.value,
-                    tr.date,
-                    tr.season
-                FROM transfers tr
-                LEFT JOIN players p ON tr.player_id = p.player_id
-                LEFT JOIN teams ft ON tr.from_team_id = ft.team_id
-                LEFT JOIN teams tt ON tr.to_team_id = tt.team_id
-                LEFT JOIN leagues fl ON ft.league_id = fl.league_id
-                LEFT JOIN leagues tl ON tt.league_id = tl.league_id
-                LEFT JOIN teams fn ON fl.country_id = fn.team_id
-                LEFT JOIN teams tn ON tl.country_id = tn.team_id
-                WHERE tr.date >= '{start_date}'
-                    AND tr.date <= '{end_date}'
-                    AND tr.fee is NOT null
-                    AND tr.fee >= 20000000
-                    AND tr."isLoan" is false
-                ORDER BY RANDOM()
-                LIMIT 1
-                )
-            SELECT json_build_object(
-            'data', json_build_object(
-                'transfer', (SELECT row_to_json(transfer_data) FROM transfer_data)
-            )
-            ) as result
-            """
-            
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json() 
-            #print(f"Supabase raw response status: {response.status_code}")
-            #print(f"Supabase response: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for"
-                )
+    async def get_random_transfer(self, start_date: date, end_date: date, seed: Optional[int] = None, session: Optional[str] = None):
+        # drawn from the in-memory pool, the query below is the fallback
+        result = await random_transfer(start_date, end_date, seed=seed, session=session)
+        if result is not None:
             return result
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
+        query = sql_template("player.random_transfer", """
+        WITH transfer_data AS (
+            SELECT
+                tr.transfer_id,
+                tr.player_id,
+                p.player_name,
+                json_build_object(
+                    'team_id', ft.team_id,
+                    'team_name', ft.team_name,
+                    'team_url', ft.logo_url,
+                    'nation', fn.team_name,
+                    'nation_url', fn.logo_url
+                ) as from_team,
+                json_build_object(
+                    'team_id', tt.team_id,
+                    'team_name', tt.team_name,
+                    'team_url', tt.logo_url,
+                    'nation', tn.team_name,
+                    'nation_url', tn.logo_url
+                ) as to_team,
+                tr."isLoan",
+                tr.fee,
+                tr.value,
+                tr.date,
+                tr.season
+            FROM transfers tr
+            LEFT JOIN players p ON tr.player_id = p.player_id
+            LEFT JOIN teams ft ON tr.from_team_id = ft.team_id
+            LEFT JOIN teams tt ON tr.to_team_id = tt.team_id
+            LEFT JOIN leagues fl ON ft.league_id = fl.league_id
+            LEFT JOIN leagues tl ON tt.league_id = tl.league_id
+            LEFT JOIN teams fn ON fl.country_id = fn.team_id
+            LEFT JOIN teams tn ON tl.country_id = tn.team_id
+            WHERE tr.date >= :start_date
+                AND tr.date <= :end_date
+                AND tr.fee is NOT null
+                AND tr.fee >= 20000000
+                AND tr."isLoan" is false
+            ORDER BY RANDOM()
+            LIMIT 1
             )
+        SELECT json_build_object(
+        'data', json_build_object(
+            'transfer', (SELECT row_to_json(transfer_data) FROM transfer_data)
+        )
+        ) as result
+        """, start_date="date", end_date="date").bind(start_date=start_date, end_date=end_date)
+        result = await self.gateway.fetch_data(query, not_found="No data found for")
+        return result
 
 
     # player teams in career
-    def get_player_career_teams(self, player_id: int):
-        try:
-            query = f"""
-            WITH player_teams AS (
-                -- Get all unique teams the player has played for
-                SELECT DISTINCT 
-                    t.player_id,
-                    t.from_team_id as team_id
-                FROM transfers t
-                WHERE t.player_id = {player_id}
-                    AND t.from_team_id IS NOT NULL
-                
-                UNION
-                
-                SELECT DISTINCT 
-                    t.player_id,
-                    t.to_team_id as team_id
-                FROM transfers t
-                WHERE t.player_id = {player_id}
-                    AND t.to_team_id IS NOT NULL
-            ),
+    @cached(season_arg=None)
+    async def get_player_career_teams(self, player_id: int):
+        query = sql_template("player.career_teams", """
+        WITH player_teams AS (
+            -- Get all unique teams the player has played for
+            SELECT DISTINCT 
+                t.player_id,
+                t.from_team_id as team_id
+            FROM transfers t
+            WHERE t.player_id = :player_id
+                AND t.from_team_id IS NOT NULL
             
-            player_info AS (
-                SELECT 
-                    p.player_id,
-                    p.player_name,
-                    p.age,
-                    p.pic_url,
-                    p.nation1_id,
-                    n1.team_name as nation1,
-                    n1.logo_url as nation1_logo,
-                    p.nation2_id,
-                    n2.team_name as nation2,
-                    n2.logo_url as nation2_logo
-                FROM players p
-                LEFT JOIN teams n1 ON p.nation1_id = n1.team_id
-                LEFT JOIN teams n2 ON p.nation2_id = n2.team_id
-                WHERE p.player_id = {player_id}
-            ),
-            
-            team_info AS (
-                SELECT 
-                    t.team_id,
-                    t.team_name,
-                    t.logo_url as team_url,
-                    nt.team_name as nation,
-                    nt.logo_url as nation_url
-                FROM player_teams pt
-                LEFT JOIN teams t ON pt.team_id = t.team_id
-                LEFT JOIN teams nt ON t.nation_id = nt.team_id
-                ORDER BY t.team_name
-            )
+            UNION
             
-            SELECT json_build_object(
-                'data', json_build_object(
-                    'player', (SELECT row_to_json(player_info) FROM player_info LIMIT 1),
-                    'teams', (SELECT coalesce(json_agg(row_to_json(team_info)), '[]'::json) FROM team_info)
-                )
-            ) as result
-            """
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query},
-                timeout=20,
-            )
-            response.raise_for_status()
-            result = response.json() 
-            #print(f"Supabase raw response status: {response.status_code}")
-            #print(f"Supabase response: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail="No data found for"
-                )
-            return result
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
+            SELECT DISTINCT 
+                t.player_id,
+                t.to_team_id as team_id
+            FROM transfers t
+            WHERE t.player_id = :player_id
+                AND t.to_team_id IS NOT NULL
+        ),
+        
+        player_info AS (
+            SELECT 
+                p.player_id,
+                p.player_name,
+                p.age,
+                p.pic_url,
+                p.nation1_id,
+                n1.team_name as nation1,
+                n1.logo_url as nation1_logo,
+                p.nation2_id,
+                n2.team_name as nation2,
+                n2.logo_url as nation2_logo
+            FROM players p
+            LEFT JOIN teams n1 ON p.nation1_id = n1.team_id
+            LEFT JOIN teams n2 ON p.nation2_id = n2.team_id
+            WHERE p.player_id = :player_id
+        ),
+        
+        team_info AS (
+            SELECT 
+                t.team_id,
+                t.team_name,
+                t.logo_url as team_url,
+                nt.team_name as nation,
+                nt.logo_url as nation_url
+            FROM player_teams pt
+            LEFT JOIN teams t ON pt.team_id = t.team_id
+            LEFT JOIN teams nt ON t.nation_id = nt.team_id
+            ORDER BY t.team_name
+        )
+        
+        SELECT json_build_object(
+            'data', json_build_object(
+                'player', (SELECT row_to_json(player_info) FROM player_info LIMIT 1),
+                'teams', (SELECT coalesce(json_agg(row_to_json(team_info)), '[]'::json) FROM team_info)
             )
+        ) as result
+        """, player_id="bigint").bind(player_id=player_id)
+        result = await self.gateway.fetch_data(query, not_found="No data found for", timeout=20)
+        return result
 
     # player teams in career2
-    def get_player_career_teams2(self, player_id: int):
-        try:
-            query = f"""
-            WITH all_player_teams AS (
-                -- Get all team associations with dates
-                SELECT 
-                    t.player_id,
-                    t.from_team_id as team_id,
-                    t.date
-                FROM transfers t
-                WHERE t.player_id = {player_id}
-                    AND t.from_team_id IS NOT NULL
-                
-                UNION ALL
-                
-                SELECT 
-                    t.player_id,
-                    t.to_team_id as team_id,
-                    t.date
-                FROM transfers t
-                WHERE t.player_id = {player_id}
-                    AND t.to_team_id IS NOT NULL
-            ),
-            
-            player_teams AS (
-                -- Get unique teams with their earliest date
-                SELECT 
-                    player_id,
-                    team_id,
-                    MIN(date) as earliest_date
-                FROM all_player_teams
-                GROUP BY player_id, team_id
-            ),
-            
-            player_info AS (
-                SELECT 
-                    p.player_id,
-                    p.player_name,
-                    p.age,
-                    p.pic_url,
-                    p.nation1_id,
-                    n1.team_name as nation1,
-                    n1.logo_url as nation1_logo,
-                    p.nation2_id,
-                    n2.team_name as nation2,
-                    n2.logo_url as nation2_logo
-                FROM players p
-                LEFT JOIN teams n1 ON p.nation1_id = n1.team_id
-                LEFT JOIN teams n2 ON p.nation2_id = n2.team_id
-                WHERE p.player_id = {player_id}
-            ),
+    @cached(season_arg=None)
+    async def get_player_career_teams2(self, player_id: int):
+        query = sql_template("player.career_teams2", """
+        WITH all_player_teams AS (
+            -- Get all team associations with dates
+            SELECT 
+                t.player_id,
+                t.from_team_id as team_id,
+                t.date
+            FROM transfers t
+            WHERE t.player_id = :player_id
+                AND t.from_team_id IS NOT NULL
             
-            team_info AS (
-                SELECT 
-                    t.team_id,
-                    t.team_name,
-                    t.logo_url as team_url,
-                    nt.team_name as nation,
-                    nt.logo_url as nation_url,
-                    pt.earliest_date
-                FROM player_teams pt
-                LEFT JOIN teams t ON pt.team_id = t.team_id
-                LEFT JOIN teams nt ON t.nation_id = nt.team_id
-                ORDER BY pt.earliest_date ASC, t.team_name
-            )
+            UNION ALL
             
-            SELECT json_build_object(
-                'data', json_build_object(
-                    'player', (SELECT row_to_json(player_info) FROM player_info LIMIT 1),
-                    'teams', (SELECT coalesce(json_agg(row_to_json(team_info)), '[]'::json) FROM team_info)
-                )
-            ) as result
-            """
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query},
-                timeout=20,
-            )
-            response.raise_for_status()
-            result = response.json() 
-            #print(f"Supabase raw response status: {response.status_code}")
-            #print(f"Supabase response: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail="No data found for"
-                )
-            return result
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
+            SELECT 
+                t.player_id,
+                t.to_team_id as team_id,
+                t.date
+            FROM transfers t
+            WHERE t.player_id = :player_id
+                AND t.to_team_id IS NOT NULL
+        ),
+        
+        player_teams AS (
+            -- Get unique teams with their earliest date
+            SELECT 
+                player_id,
+                team_id,
+                MIN(date) as earliest_date
+            FROM all_player_teams
+            GROUP BY player_id, team_id
+        ),
+        
+        player_info AS (
+            SELECT 
+                p.player_id,
+                p.player_name,
+                p.age,
+                p.pic_url,
+                p.nation1_id,
+                n1.team_name as nation1,
+                n1.logo_url as nation1_logo,
+                p.nation2_id,
+                n2.team_name as nation2,
+                n2.logo_url as nation2_logo
+            FROM players p
+            LEFT JOIN teams n1 ON p.nation1_id = n1.team_id
+            LEFT JOIN teams n2 ON p.nation2_id = n2.team_id
+            WHERE p.player_id = :player_id
+        ),
+        
+        team_info AS (
+            SELECT 
+                t.team_id,
+                t.team_name,
+                t.logo_url as team_url,
+                nt.team_name as nation,
+                nt.logo_url as nation_url,
+                pt.earliest_date
+            FROM player_teams pt
+            LEFT JOIN teams t ON pt.team_id = t.team_id
+            LEFT JOIN teams nt ON t.nation_id = nt.team_id
+            ORDER BY pt.earliest_date ASC, t.team_name
+        )
+        
+        SELECT json_build_object(
+            'data', json_build_object(
+                'player', (SELECT row_to_json(player_info) FROM player_info LIMIT 1),
+                'teams', (SELECT coalesce(json_agg(row_to_json(team_info)), '[]'::json) FROM team_info)
             )
+        ) as result
+        """, player_id="bigint").bind(player_id=player_id)
+        result = await self.gateway.fetch_data(query, not_found="No data found for", timeout=20)
+        return result
 
 
-    def get_player_stats_all_seasons(self, player_id: int, season: int):
-        query = f"""
+    @cached()
+    async def get_player_stats_all_seasons(self, player_id: int, season: int):
+        query = sql_template("player.stats_by_season", """
         WITH all_stats AS (
             SELECT
                 json_agg(
@@ -621,7 +587,7 @@ class PlayerService:
             JOIN players p ON ps.player_id = p.player_id
             JOIN leagues l ON ps.comp_id = l.league_id
             JOIN teams t ON ps.team_id = t.team_id
-            WHERE ps.player_id = {player_id} AND ps.season_year = {season}
+            WHERE ps.player_id = :player_id AND ps.season_year = :season
         )
         SELECT 
             json_build_object(
@@ -630,33 +596,14 @@ class PlayerService:
                 )
             ) AS result
         FROM all_stats;    
-        """
+        """, player_id="bigint", season="integer").bind(player_id=player_id, season=season)
 
-        try:
-            # Use "query" instead of "sql_query" for the parameter name
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}  # Changed from "sql_query" to "query"
-            )
-            response.raise_for_status()
-            result = response.json()
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for player {player_id}"
-                )
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for player {player_id}")
+        return result
 
-    def get_career_stats(self, player_id: int):
-        query = f"""
+    @cached(season_arg=None)
+    async def get_career_stats(self, player_id: int):
+        query = sql_template("player.career_stats", """
         WITH all_stats AS (
             SELECT
                 json_agg(
@@ -710,7 +657,7 @@ class PlayerService:
             JOIN players p ON ps.player_id = p.player_id
             JOIN leagues l ON ps.comp_id = l.league_id
             JOIN teams t ON ps.team_id = t.team_id
-            WHERE ps.player_id = {player_id}
+            WHERE ps.player_id = :player_id
         )
         SELECT 
             json_build_object(
@@ -719,34 +666,15 @@ class PlayerService:
                 )
             ) AS result
         FROM all_stats;    
-        """
+        """, player_id="bigint").bind(player_id=player_id)
 
-        try:
-            # Use "query" instead of "sql_query" for the parameter name
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}  # Changed from "sql_query" to "query"
-            )
-            response.raise_for_status()
-            result = response.json()
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for player {player_id}"
-                )
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for player {player_id}")
+        return result
 
 
-    def get_matches_by_season(self, player_id: int, season: int):
-        query = f"""
+    @cached()
+    async def get_matches_by_season(self, player_id: int, season: int):
+        query = sql_template("player.matches_by_season", """
         WITH match_data AS (
             SELECT 
                 l.xi,
@@ -883,8 +811,8 @@ class PlayerService:
             JOIN teams ht ON m.home_id = ht.team_id
             JOIN teams at ON m.away_id = at.team_id
             JOIN leagues lg ON m.comp_id = lg.league_id
-            WHERE l.player_id = {player_id}
-            AND m.season_year = {season}
+            WHERE l.player_id = :player_id
+            AND m.season_year = :season
             ORDER BY m.match_date DESC
         )
         SELECT 
@@ -925,31 +853,13 @@ class PlayerService:
                 )
             ) AS result
         FROM match_data md;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for player {player_id}"
-                )
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, function="ga_player_matches_by_season_v1", player_id="bigint", season="integer").bind(player_id=player_id, season=season)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for player {player_id}")
+        return result
 
-    def get_matches_by_dates(self, player_id: int, start_date: str, end_date: str):
-        query = f"""
+    @cached(season_arg='end_date')
+    async def get_matches_by_dates(self, player_id: int, start_date: str, end_date: str):
+        query = sql_template("player.matches_by_dates", """
         WITH match_data AS (
             SELECT 
                 l.xi,
@@ -1086,8 +996,8 @@ class PlayerService:
             JOIN teams ht ON m.home_id = ht.team_id
             JOIN teams at ON m.away_id = at.team_id
             JOIN leagues lg ON m.comp_id = lg.league_id
-            WHERE l.player_id = {player_id}
-            AND m.match_date BETWEEN '{start_date}' AND '{end_date}'
+            WHERE l.player_id = :player_id
+            AND m.match_date BETWEEN :start_date AND :end_date
             ORDER BY m.match_date DESC
         )
         SELECT 
@@ -1128,31 +1038,13 @@ class PlayerService:
                 )
             ) AS result
         FROM match_data md;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for player {player_id}"
-                )
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, player_id="bigint", start_date="date", end_date="date").bind(player_id=player_id, start_date=start_date, end_date=end_date)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for player {player_id}")
+        return result
 
-    def get_recent_ga(self, player_id: int):
-        query = f"""
+    @cached(season_arg=None)
+    async def get_recent_ga(self, player_id: int):
+        query = sql_template("player.recent_ga", """
         WITH goal_contributions AS (
             SELECT 
                 l.match_id,
@@ -1166,7 +1058,7 @@ class PlayerService:
                 pms.player_id = l.player_id AND 
                 pms.match_id = l.match_id AND 
                 pms.team_id = l.team_id
-            WHERE l.player_id = {player_id}
+            WHERE l.player_id = :player_id
             AND (pms.goals > 0 OR pms.assists > 0)
             ORDER BY m.match_date DESC
             LIMIT 25
@@ -1241,7 +1133,7 @@ class PlayerService:
             JOIN teams at ON m.away_id = at.team_id
             JOIN leagues lg ON m.comp_id = lg.league_id
             LEFT JOIN player_match_stats pms ON 
-                pms.player_id = {player_id} AND
+                pms.player_id = :player_id AND
                 pms.match_id = gc.match_id AND
                 pms.team_id = gc.team_id
             ORDER BY m.match_date DESC
@@ -1255,31 +1147,13 @@ class PlayerService:
                     )
                 )
             ) AS result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for player {player_id}"
-                )
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, player_id="bigint").bind(player_id=player_id)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for player {player_id}")
+        return result
 
-    def get_recent_apps_bydate(self, player_id: int, start_date: str, end_date: str):
-        query = f"""
+    @cached(season_arg='end_date')
+    async def get_recent_apps_bydate(self, player_id: int, start_date: str, end_date: str):
+        query = sql_template("player.recent_apps_bydate", """
         WITH goal_contributions AS (
             SELECT 
                 l.match_id,
@@ -1293,10 +1167,10 @@ class PlayerService:
                 pms.player_id = l.player_id AND 
                 pms.match_id = l.match_id AND 
                 pms.team_id = l.team_id
-            WHERE l.player_id = {player_id}
+            WHERE l.player_id = :player_id
             -- AND (pms.goals > 0 OR pms.assists > 0)
             AND (pms.minutes is NOT NULL)
-            AND m.match_date BETWEEN '{start_date}' AND '{end_date}'
+            AND m.match_date BETWEEN :start_date AND :end_date
             ORDER BY m.match_date DESC
             LIMIT 100
         ),
@@ -1370,7 +1244,7 @@ class PlayerService:
             JOIN teams at ON m.away_id = at.team_id
             JOIN leagues lg ON m.comp_id = lg.league_id
             LEFT JOIN player_match_stats pms ON 
-                pms.player_id = {player_id} AND
+                pms.player_id = :player_id AND
                 pms.match_id = gc.match_id AND
                 pms.team_id = gc.team_id
             ORDER BY m.match_date DESC
@@ -1384,31 +1258,13 @@ class PlayerService:
                     )
                 )
             ) AS result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for player {player_id}"
-                )
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, player_id="bigint", start_date="date", end_date="date").bind(player_id=player_id, start_date=start_date, end_date=end_date)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for player {player_id}")
+        return result
 
-    def get_recent_ga_bydate(self, player_id: int, start_date: str, end_date: str):
-        query = f"""
+    @cached(season_arg='end_date')
+    async def get_recent_ga_bydate(self, player_id: int, start_date: str, end_date: str):
+        query = sql_template("player.recent_ga_bydate", """
         WITH goal_contributions AS (
             SELECT 
                 l.match_id,
@@ -1422,10 +1278,10 @@ class PlayerService:
                 pms.player_id = l.player_id AND 
                 pms.match_id = l.match_id AND 
                 pms.team_id = l.team_id
-            WHERE l.player_id = {player_id}
+            WHERE l.player_id = :player_id
             AND (pms.goals > 0 OR pms.assists > 0)
             -- AND (pms.minutes is NOT NULL)
-            AND m.match_date BETWEEN '{start_date}' AND '{end_date}'
+            AND m.match_date BETWEEN :start_date AND :end_date
             ORDER BY m.match_date DESC
             LIMIT 100
         ),
@@ -1499,7 +1355,7 @@ class PlayerService:
             JOIN teams at ON m.away_id = at.team_id
             JOIN leagues lg ON m.comp_id = lg.league_id
             LEFT JOIN player_match_stats pms ON 
-                pms.player_id = {player_id} AND
+                pms.player_id = :player_id AND
                 pms.match_id = gc.match_id AND
                 pms.team_id = gc.team_id
             ORDER BY m.match_date DESC
@@ -1513,32 +1369,14 @@ class PlayerService:
                     )
                 )
             ) AS result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for player {player_id}"
-                )
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, player_id="bigint", start_date="date", end_date="date").bind(player_id=player_id, start_date=start_date, end_date=end_date)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for player {player_id}")
+        return result
 
 
-    def get_recent_ga_against_team(self, player_id: int, opp_team_id: int):
-        query = f"""
+    @cached(season_arg=None)
+    async def get_recent_ga_against_team(self, player_id: int, opp_team_id: int):
+        query = sql_template("player.recent_ga_against_team", """
         WITH goal_contributions AS (
             SELECT 
                 l.match_id,
@@ -1552,11 +1390,11 @@ class PlayerService:
                 pms.player_id = l.player_id AND 
                 pms.match_id = l.match_id AND 
                 pms.team_id = l.team_id
-            WHERE l.player_id = {player_id}
+            WHERE l.player_id = :player_id
             AND (pms.goals > 0 OR pms.assists > 0)
             AND (
-                (l.team_id = m.home_id AND m.away_id = {opp_team_id}) OR
-                (l.team_id = m.away_id AND m.home_id = {opp_team_id})
+                (l.team_id = m.home_id AND m.away_id = :opp_team_id) OR
+                (l.team_id = m.away_id AND m.home_id = :opp_team_id)
             )
             ORDER BY m.match_date DESC
             LIMIT 25
@@ -1631,7 +1469,7 @@ class PlayerService:
             JOIN teams at ON m.away_id = at.team_id
             JOIN leagues lg ON m.comp_id = lg.league_id
             LEFT JOIN player_match_stats pms ON 
-                pms.player_id = {player_id} AND
+                pms.player_id = :player_id AND
                 pms.match_id = gc.match_id AND
                 pms.team_id = gc.team_id
             ORDER BY m.match_date DESC
@@ -1645,31 +1483,13 @@ class PlayerService:
                     )
                 )
             ) AS result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for player {player_id}"
-                )
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, player_id="bigint", opp_team_id="bigint").bind(player_id=player_id, opp_team_id=opp_team_id)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for player {player_id}")
+        return result
 
-    def get_recent_apps_against_team(self, player_id: int, opp_team_id: int):
-        query = f"""
+    @cached(season_arg=None)
+    async def get_recent_apps_against_team(self, player_id: int, opp_team_id: int):
+        query = sql_template("player.recent_apps_against_team", """
         WITH goal_contributions AS (
             SELECT 
                 l.match_id,
@@ -1683,11 +1503,11 @@ class PlayerService:
                 pms.player_id = l.player_id AND 
                 pms.match_id = l.match_id AND 
                 pms.team_id = l.team_id
-            WHERE l.player_id = {player_id}
+            WHERE l.player_id = :player_id
             AND (pms.minutes is NOT NULL)
             AND (
-                (l.team_id = m.home_id AND m.away_id = {opp_team_id}) OR
-                (l.team_id = m.away_id AND m.home_id = {opp_team_id})
+                (l.team_id = m.home_id AND m.away_id = :opp_team_id) OR
+                (l.team_id = m.away_id AND m.home_id = :opp_team_id)
             )
             ORDER BY m.match_date DESC
             LIMIT 100
@@ -1762,7 +1582,7 @@ class PlayerService:
             JOIN teams at ON m.away_id = at.team_id
             JOIN leagues lg ON m.comp_id = lg.league_id
             LEFT JOIN player_match_stats pms ON 
-                pms.player_id = {player_id} AND
+                pms.player_id = :player_id AND
                 pms.match_id = gc.match_id AND
                 pms.team_id = gc.team_id
             ORDER BY m.match_date DESC
@@ -1776,226 +1596,111 @@ class PlayerService:
                     )
                 )
             ) AS result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for player {player_id}"
-                )
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, player_id="bigint", opp_team_id="bigint").bind(player_id=player_id, opp_team_id=opp_team_id)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for player {player_id}")
+        return result
 
 
     
-    def get_player_goal_distribution(self, player_id: int, season: int):
-        # 1. Fetch all goal events (which may include both goals and assists)
-        event_response = self.supabase.table('match_events') \
-            .select('*, matches!inner(season_year)') \
-            .eq('matches.season_year', season) \
-            .eq('event_type', 'goal') \
-            .or_(f'active_player_id.eq.{player_id},passive_player_id.eq.{player_id}') \
-            .execute()
-
-        goal_events = event_response.data
-
-        # Also fetch penalty goals separately (if needed)
-        penalty_response = self.supabase.table('match_events') \
-            .select('*, matches!inner(season_year)') \
-            .eq('matches.season_year', season) \
-            .eq('event_type', 'penalty goal') \
-            .eq('active_player_id', player_id) \
-            .execute()
-
-        penalty_goals = penalty_response.data
-
-        # Combine both event sets
-        all_events = goal_events + penalty_goals
-
-        # 2. Compute totals
-        total_goals = sum(1 for e in goal_events if e['active_player_id'] == player_id)
-        total_assists = sum(1 for e in goal_events if e['passive_player_id'] == player_id)
-        total_ga = total_goals + total_assists
-        total_pens = len(penalty_goals)
-
-        # 3. Build per-team distribution
-        team_contributions = {}
-        for event in all_events:
-            team_id = event['opp_team_id']
-            if not team_id:
-                continue
-
-            if team_id not in team_contributions:
-                team_contributions[team_id] = {
-                    'goals_against': 0,
-                    'assists_against': 0,
-                    'ga_against': 0
-                }
-
-            # Count goal
-            if event['event_type'] in ['goal', 'penalty goal'] and event['active_player_id'] == player_id:
-                team_contributions[team_id]['goals_against'] += 1
-                team_contributions[team_id]['ga_against'] += 1
-
-            # Count assist (only from event_type = 'goal')
-            if event['event_type'] == 'goal' and event['passive_player_id'] == player_id:
-                team_contributions[team_id]['assists_against'] += 1
-                team_contributions[team_id]['ga_against'] += 1
-
-        # 4. Build team response list
-        team_dists = []
-        for team_id, stats in team_contributions.items():
-            team_response = self.supabase.table('teams') \
-                .select('team_id, team_name, logo_url') \
-                .eq('team_id', team_id) \
-                .single() \
-                .execute()
-
-            team_data = team_response.data
-
-            team = Team(
-                team_id=team_data['team_id'],
-                team_name=team_data['team_name'],
-                logo=team_data['logo_url']
-            )
-
-            stats_dist = StatsDist(
-                ga_against=stats['ga_against'],
-                ga_against_pct=round((stats['ga_against'] * 100.0 / total_ga), 1) if total_ga else None,
-                goals_against=stats['goals_against'],
-                goals_against_pct=round((stats['goals_against'] * 100.0 / total_goals), 1) if total_goals else None,
-                assists_against=stats['assists_against'],
-                assists_against_pct=round((stats['assists_against'] * 100.0 / total_assists), 1) if total_assists else None
-            )
-
-            team_dists.append(TeamDist(team=team, stats=stats_dist))
+    @cached()
+    async def get_player_goal_distribution(self, player_id: int, season: int):
+        return await self._goal_distribution(
+            player_id,
+            match_filter=self.SEASON_MATCHES,
+            season_year=season,
+            season=season
+        )
 
-        # Sort by most impactful teams
-        team_dists.sort(key=lambda x: x.stats.ga_against_pct or 0, reverse=True)
 
-        # 5. Build response
-        pens = Pens(
-            pen_pct=round((total_pens * 100.0 / total_goals), 1) if total_goals > 0 else None,
-            pens_scored=total_pens if total_pens > 0 else None
+    @cached(season_arg='end_date')
+    async def get_player_goal_dist_bydate(self, player_id: int, start_date: str, end_date: str):
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+        return await self._goal_distribution(
+            player_id,
+            match_filter=self.DATE_MATCHES,
+            # the season the range starts in
+            season_year=start.year,
+            start_date=start,
+            end_date=end
         )
 
-        goal_dist_list = [GoalDist(teams=td) for td in team_dists]
+    # matches _goal_distribution can count over
+    SEASON_MATCHES = "m.season_year = :season"
+    DATE_MATCHES = "m.match_date BETWEEN :start_date AND :end_date"
 
-        response = PlayerGADistResponse(
-            data=PlayerGADistData(
-                info=Comp2(
-                    comp_id=9999,
-                    comp_name="All Competitions",
-                    comp_url=None,
-                    season_year=season
-                ),
-                total=TotalGA(
-                    goals=total_goals,
-                    assists=total_assists,
-                    ga=total_ga,
-                    pens=total_pens if total_pens > 0 else None
-                ),
-                goal_dist=goal_dist_list,
-                pens=pens
+    async def _goal_distribution(self, player_id: int, match_filter: str, season_year: Optional[int], season: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None) -> PlayerGADistResponse:
+        """
+        Goals, assists and penalties of a player over the matches selected by
+        `match_filter` (SEASON_MATCHES or DATE_MATCHES), split by opponent.
+        Counting happens in the database, only one row per opponent comes
+        back; opponents are decorated from the dimension store.
+        """
+        query = sql_template("player.goal_distribution", """
+        WITH events AS (
+            SELECT e.event_type, e.active_player_id, e.passive_player_id, e.opp_team_id
+            FROM match_events e
+            JOIN matches m ON e.match_id = m.match_id
+            WHERE :match_filter
+              AND (
+                (e.event_type = 'goal' AND (e.active_player_id = :player_id OR e.passive_player_id = :player_id))
+                OR (e.event_type = 'penalty goal' AND e.active_player_id = :player_id)
+              )
+        ),
+        per_team AS (
+            SELECT
+                opp_team_id,
+                COUNT(*) FILTER (WHERE active_player_id = :player_id) as goals_against,
+                COUNT(*) FILTER (WHERE event_type = 'goal' AND passive_player_id = :player_id) as assists_against
+            FROM events
+            WHERE opp_team_id IS NOT NULL
+            GROUP BY opp_team_id
+        )
+        SELECT json_build_object(
+            'data', json_build_object(
+                'goals', (SELECT COUNT(*) FROM events WHERE event_type = 'goal' AND active_player_id = :player_id),
+                'assists', (SELECT COUNT(*) FROM events WHERE event_type = 'goal' AND passive_player_id = :player_id),
+                'pens', (SELECT COUNT(*) FROM events WHERE event_type = 'penalty goal'),
+                'teams', COALESCE(
+                    (SELECT json_agg(json_build_array(opp_team_id, goals_against, assists_against)) FROM per_team),
+                    '[]'::json
+                )
             )
+        ) as result
+        """, player_id="bigint", match_filter=(self.SEASON_MATCHES, self.DATE_MATCHES), season="integer", start_date="date", end_date="date").bind(
+            player_id=player_id, match_filter=match_filter, season=season, start_date=start_date, end_date=end_date
         )
+        result = await self.gateway.execute(query)
+        data = (result or {}).get("data") or {}
 
-        return response
-
-
-    def get_player_goal_dist_bydate(self, player_id: int, start_date: str, end_date: str):
-        # 1. Fetch all goal events (which may include both goals and assists)
-        event_response = self.supabase.table('match_events') \
-            .select('*, matches!inner(match_date)') \
-            .gte('matches.match_date', start_date) \
-            .lte('matches.match_date', end_date) \
-            .eq('event_type', 'goal') \
-            .or_(f'active_player_id.eq.{player_id},passive_player_id.eq.{player_id}') \
-            .execute()
-
-        goal_events = event_response.data
-
-        # Also fetch penalty goals separately (if needed)
-        penalty_response = self.supabase.table('match_events') \
-            .select('*, matches!inner(match_date)') \
-            .gte('matches.match_date', start_date) \
-            .lte('matches.match_date', end_date) \
-            .eq('event_type', 'penalty goal') \
-            .eq('active_player_id', player_id) \
-            .execute()
-
-        penalty_goals = penalty_response.data
-
-        # Combine both event sets
-        all_events = goal_events + penalty_goals
-
-        # 2. Compute totals
-        total_goals = sum(1 for e in goal_events if e['active_player_id'] == player_id)
-        total_assists = sum(1 for e in goal_events if e['passive_player_id'] == player_id)
+        total_goals = data.get("goals") or 0
+        total_assists = data.get("assists") or 0
         total_ga = total_goals + total_assists
-        total_pens = len(penalty_goals)
-
-        # 3. Build per-team distribution
-        team_contributions = {}
-        for event in all_events:
-            team_id = event['opp_team_id']
-            if not team_id:
-                continue
-
-            if team_id not in team_contributions:
-                team_contributions[team_id] = {
-                    'goals_against': 0,
-                    'assists_against': 0,
-                    'ga_against': 0
-                }
+        total_pens = data.get("pens") or 0
+        per_team = data.get("teams") or []
 
-            # Count goal
-            if event['event_type'] in ['goal', 'penalty goal'] and event['active_player_id'] == player_id:
-                team_contributions[team_id]['goals_against'] += 1
-                team_contributions[team_id]['ga_against'] += 1
-
-            # Count assist (only from event_type = 'goal')
-            if event['event_type'] == 'goal' and event['passive_player_id'] == player_id:
-                team_contributions[team_id]['assists_against'] += 1
-                team_contributions[team_id]['ga_against'] += 1
-
-        # 4. Build team response list
+        # Opponent names and logos in one batch
+        team_dims = await self.loaders.teams.load_many(row[0] for row in per_team)
         team_dists = []
-        for team_id, stats in team_contributions.items():
-            team_response = self.supabase.table('teams') \
-                .select('team_id, team_name, logo_url') \
-                .eq('team_id', team_id) \
-                .single() \
-                .execute()
-
-            team_data = team_response.data
+        for team_id, goals_against, assists_against in per_team:
+            team_data = team_dims.get(team_id)
+            if team_data is None:
+                # an opponent the teams table does not know, nothing to show
+                continue
+            ga_against = goals_against + assists_against
 
             team = Team(
-                team_id=team_data['team_id'],
-                team_name=team_data['team_name'],
-                logo=team_data['logo_url']
+                team_id=team_data.team_id,
+                team_name=team_data.team_name,
+                logo=team_data.logo_url
             )
 
             stats_dist = StatsDist(
-                ga_against=stats['ga_against'],
-                ga_against_pct=round((stats['ga_against'] * 100.0 / total_ga), 1) if total_ga else None,
-                goals_against=stats['goals_against'],
-                goals_against_pct=round((stats['goals_against'] * 100.0 / total_goals), 1) if total_goals else None,
-                assists_against=stats['assists_against'],
-                assists_against_pct=round((stats['assists_against'] * 100.0 / total_assists), 1) if total_assists else None
+                ga_against=ga_against,
+                ga_against_pct=round((ga_against * 100.0 / total_ga), 1) if total_ga else None,
+                goals_against=goals_against,
+                goals_against_pct=round((goals_against * 100.0 / total_goals), 1) if total_goals else None,
+                assists_against=assists_against,
+                assists_against_pct=round((assists_against * 100.0 / total_assists), 1) if total_assists else None
             )
 
             team_dists.append(TeamDist(team=team, stats=stats_dist))
@@ -2003,18 +1708,12 @@ class PlayerService:
         # Sort by most impactful teams
         team_dists.sort(key=lambda x: x.stats.ga_against_pct or 0, reverse=True)
 
-        # 5. Build response
         pens = Pens(
             pen_pct=round((total_pens * 100.0 / total_goals), 1) if total_goals > 0 else None,
             pens_scored=total_pens if total_pens > 0 else None
         )
 
-        goal_dist_list = [GoalDist(teams=td) for td in team_dists]
-
-        # Get the season year from the start_date (assuming it's in YYYY-MM-DD format)
-        season_year = int(start_date[:4]) if start_date else None
-
-        response = PlayerGADistResponse(
+        return PlayerGADistResponse(
             data=PlayerGADistData(
                 info=Comp2(
                     comp_id=9999,
@@ -2028,9 +1727,7 @@ class PlayerService:
                     ga=total_ga,
                     pens=total_pens if total_pens > 0 else None
                 ),
-                goal_dist=goal_dist_list,
+                goal_dist=[GoalDist(teams=td) for td in team_dists],
                 pens=pens
             )
-        )
-
-        return response
\ No newline at end of file
+        )
\ No newline at end of file
@@ -1,8 +1,11 @@
 from fastapi import HTTPException
 from typing import List
 from pydantic import BaseModel
-from supabase import Client
-import requests,json
+from supabase import AsyncClient
+from app.cache import cached
+from app.dependencies import get_sql_gateway
+from app.queries import sql_template
+from app.loaders import request_loaders
 from typing import Optional
 import asyncio
 
@@ -60,6 +63,7 @@ class TeamRecentMatches(BaseModel):
     team_name: str
     team_id: int
     comp_id: int
+    recent_matches: List[MatchInfo] = []
 
 class TeamMatches(BaseModel):
     match_id: int
@@ -116,18 +120,14 @@ class TeamFormStats(BaseModel):
 
 
 class StatsService:
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_client: AsyncClient):
         self.supabase = supabase_client
-        self.key = supabase_client.supabase_key
-        self.url = f"{supabase_client.rest_url}/rpc/execute_sql"
-        self.headers = {
-            "Authorization": f"Bearer {self.key}",
-            "apikey": self.key,
-            "Content-Type": "application/json"
-        }
+        self.gateway = get_sql_gateway()
+        self.loaders = request_loaders()
 
-    def get_teams_h2h(self, team1_id: int, team2_id: int, num_matches: int, start_date: str, end_date: str):
-        query = f"""
+    @cached(season_arg='end_date')
+    async def get_teams_h2h(self, team1_id: int, team2_id: int, num_matches: int, start_date: str, end_date: str):
+        query = sql_template("stats.teams_h2h", """
         WITH team_matches AS (
             SELECT 
                 m.match_id,
@@ -157,12 +157,12 @@ class StatsService:
             JOIN teams home_team ON m.home_id = home_team.team_id
             JOIN teams away_team ON m.away_id = away_team.team_id
             WHERE 
-                ((m.home_id = {team1_id} AND m.away_id = {team2_id}) OR 
-                (m.home_id = {team2_id} AND m.away_id = {team1_id}))
+                ((m.home_id = :team1_id AND m.away_id = :team2_id) OR 
+                (m.home_id = :team2_id AND m.away_id = :team1_id))
                 AND m."isPlayed" = true
-                AND m.match_date BETWEEN '{start_date}' AND '{end_date}'
+                AND m.match_date BETWEEN :start_date AND :end_date
             ORDER BY m.match_date DESC
-            LIMIT {num_matches}
+            LIMIT :num_matches
         ),
         match_stats AS (
             SELECT
@@ -203,7 +203,7 @@ class StatsService:
                 SUM(ms.goals_a) as goals_a
             FROM match_stats ms
             JOIN teams t ON ms.team_id = t.team_id
-            WHERE t.team_id IN ({team1_id}, {team2_id})
+            WHERE t.team_id IN (:team1_id, :team2_id)
             GROUP BY t.team_id, t.team_name, t.logo_url
         )
         SELECT json_build_object(
@@ -276,117 +276,101 @@ class StatsService:
                 )
             )
         ) as result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(result)
-            response_data = result.get('data')
-            if not response_data:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No team data found"
-                )
-            return result
-
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
-
-
-    def get_teams_recent_matches(self, comp_id: int, season_year: int) -> List[TeamRecentMatches]:
-        try:
-            # Get all unique team IDs in the competition
-            home_teams = self.supabase.table('matches') \
-                .select('home_id') \
-                .eq('comp_id', comp_id) \
-                .eq('season_year', season_year) \
-                .execute()
-
-            away_teams = self.supabase.table('matches') \
-                .select('away_id') \
-                .eq('comp_id', comp_id) \
-                .eq('season_year', season_year) \
-                .execute()
-
-            team_ids = list({t['home_id'] for t in home_teams.data} | {t['away_id'] for t in away_teams.data})
-
-            if not team_ids:
-                raise HTTPException(status_code=404, detail="No teams found for this competition and season")
-
-            # Get team details
-            teams = self.supabase.table('teams') \
-                .select('team_id,team_name') \
-                .in_('team_id', team_ids) \
-                .execute()
-
-            team_map = {t['team_id']: t for t in teams.data}
-
-            result = []
-            for team_id, team in team_map.items():
-                # Get matches where team was either home or away
-                matches = self.supabase.table('matches') \
-                    .select('*, home_team:teams!home_id(team_name), away_team:teams!away_id(team_name)') \
-                    .or_(f'home_id.eq.{team_id},away_id.eq.{team_id}') \
-                    .eq('comp_id', comp_id) \
-                    .eq('season_year', season_year) \
-                    .order('match_date', desc=True) \
-                    .limit(6) \
-                    .execute()
-
-                recent_matches = []
-                for match in matches.data:
-                    # Handle potential None values
-                    home_team = match.get('home_team', {})
-                    away_team = match.get('away_team', {})
+        """, team1_id="bigint", team2_id="bigint", num_matches="integer", start_date="date", end_date="date").bind(team1_id=team1_id, team2_id=team2_id, num_matches=num_matches, start_date=start_date, end_date=end_date)
+        result = await self.gateway.fetch_data(query, not_found="No team data found")
+        return result
 
-                    recent_matches.append(MatchInfo(
-                        match_id=match.get('match_id', 0),
-                        home_id=match.get('home_id', 0),
-                        home_team_name=home_team.get('team_name'),
-                        away_id=match.get('away_id', 0),
-                        away_team_name=away_team.get('team_name'),
-                        home_goals=match.get('home_goals'),
-                        away_goals=match.get('away_goals'),
-                        match_date=str(match.get('match_date', '')),
-                        result=match.get('result'),
-                        win_team=match.get('win_team'),
-                        loss_team=match.get('loss_team'),
-                        isDraw=match.get('isDraw')
-                    ))
 
-                # This was incorrectly indented before - now properly inside the team loop
-                result.append(TeamRecentMatches(
-                    team_name=team['team_name'],
-                    team_id=team_id,
-                    comp_id=comp_id,
-                    recent_matches=recent_matches
-                ))
-
-            if not result:
-                raise HTTPException(status_code=404, detail="No matches found for teams in this competition and season")
-
-            return result
+    @cached(season_arg='season_year')
+    async def get_teams_recent_matches(self, comp_id: int, season_year: int, n: int = 6) -> List[TeamRecentMatches]:
+        """
+        Every team's last `n` matches in a competition season (a league-wide
+        form grid), in one query: each match is expanded to one row per side
+        and ranked per team with ROW_NUMBER().
+        """
+        if n < 1:
+            raise HTTPException(status_code=400, detail="n must be at least 1")
 
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        query = sql_template("stats.teams_recent_matches", """
+        WITH season_matches AS (
+            SELECT
+                m.match_id,
+                m.home_id,
+                ht.team_name as home_team_name,
+                m.away_id,
+                at.team_name as away_team_name,
+                m.home_goals,
+                m.away_goals,
+                m.match_date,
+                m.result,
+                m.win_team,
+                m.loss_team,
+                m."isDraw"
+            FROM matches m
+            JOIN teams ht ON ht.team_id = m.home_id
+            JOIN teams at ON at.team_id = m.away_id
+            WHERE m.comp_id = :comp_id AND m.season_year = :season_year
+        ),
+        team_matches AS (
+            SELECT home_id as team_id, home_team_name as team_name, sm.* FROM season_matches sm
+            UNION ALL
+            SELECT away_id as team_id, away_team_name as team_name, sm.* FROM season_matches sm
+        ),
+        ranked AS (
+            SELECT
+                tm.*,
+                ROW_NUMBER() OVER (PARTITION BY tm.team_id ORDER BY tm.match_date DESC, tm.match_id DESC) as row_num
+            FROM team_matches tm
+        ),
+        per_team AS (
+            SELECT
+                team_id,
+                MIN(team_name) as team_name,
+                json_agg(
+                    json_build_object(
+                        'match_id', match_id,
+                        'home_id', home_id,
+                        'home_team_name', home_team_name,
+                        'away_id', away_id,
+                        'away_team_name', away_team_name,
+                        'home_goals', home_goals,
+                        'away_goals', away_goals,
+                        'match_date', match_date::text,
+                        'result', result,
+                        'win_team', win_team,
+                        'loss_team', loss_team,
+                        'isDraw', "isDraw"
+                    ) ORDER BY row_num
+                ) as recent_matches
+            FROM ranked
+            WHERE row_num <= :n
+            GROUP BY team_id
+        )
+        SELECT json_build_object(
+            'data', COALESCE(
+                (SELECT json_agg(
+                    json_build_object(
+                        'team_name', team_name,
+                        'team_id', team_id,
+                        'comp_id', :comp_id,
+                        'recent_matches', recent_matches
+                    ) ORDER BY team_name
+                ) FROM per_team),
+                '[]'::json
+            )
+        ) as result
+        """, comp_id="bigint", season_year="integer", n="integer").bind(comp_id=comp_id, season_year=season_year, n=n)
+        result = await self.gateway.fetch_data(query, not_found="No teams found for this competition and season")
+        return [TeamRecentMatches.model_validate(team) for team in result["data"]]
 
-    def get_team_recent(
+    @cached(season_arg='season_year')
+    async def get_team_recent(
         self,
         comp_id: int,
         season_year: int,
         team_id: int
     ) -> List[TeamMatches]:
-        query = f"""
+        query = sql_template("stats.team_recent", """
         SELECT json_agg(recent_matches)
         FROM (
             SELECT
@@ -406,47 +390,30 @@ class StatsService:
             FROM matches m
             JOIN teams ht ON m.home_id = ht.team_id
             JOIN teams at ON m.away_id = at.team_id
-            WHERE m.comp_id = {comp_id}
-              AND m.season_year = {season_year}
-              AND (m.home_id = {team_id} OR m.away_id = {team_id})
+            WHERE m.comp_id = :comp_id
+              AND m.season_year = :season_year
+              AND (m.home_id = :team_id OR m.away_id = :team_id)
               AND m.home_goals IS NOT NULL
               AND m.away_goals IS NOT NULL
             ORDER BY m.match_date DESC
             LIMIT 10
         ) recent_matches;
-        """
-
-        try:
-            response = requests.post(self.url, headers=self.headers, json={"query": query})
-            if response.status_code == 200:
-                results = response.json()
-
-                if results and len(results) > 0:
-                    # Handle both string and direct JSON responses
-                    if isinstance(results[0].get("result"), str):
-                        match_data = json.loads(results[0]["result"])
-                    else:
-                        match_data = results[0].get("result", [])
+        """, comp_id="bigint", season_year="integer", team_id="bigint").bind(comp_id=comp_id, season_year=season_year, team_id=team_id)
 
-                    if isinstance(match_data, list):
-                        return [TeamMatches(**match) for match in match_data]
-                    elif isinstance(match_data, dict):
-                        return [TeamMatches(**match_data)]
-
-                raise HTTPException(
-                    status_code=404,
-                    detail="No matches found for this team in the specified competition and season"
-                )
-            else:
-                raise HTTPException(status_code=response.status_code, detail=response.text)
-        except json.JSONDecodeError as e:
-            raise HTTPException(status_code=500, detail=f"JSON decode error: {str(e)}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+        rows = await self.gateway.execute(query)
+        if not rows:
+            raise HTTPException(
+                status_code=404,
+                detail="No matches found for this team in the specified competition and season"
+            )
+        if isinstance(rows, dict):
+            rows = [rows]
+        return [TeamMatches(**row) for row in rows]
 
    
-    def get_no_losses(self):
-        query = f"""
+    @cached(season_arg=None, stale_for=300)
+    async def get_no_losses(self):
+        query = sql_template("stats.no_losses", """
         SELECT json_agg(top_teams)
         FROM (
             SELECT
@@ -474,40 +441,18 @@ class StatsService:
             JOIN teams t ON lr.team_id = t.team_id
             ORDER BY lr.points DESC
         ) top_teams;
-        """
-
-        try:
-            response = requests.post(self.url, headers=self.headers, json={"query": query})
-            if response.status_code == 200:
-                results = response.json()
-
-                # Debug print to see the raw response structure
-                #print("Raw response:", results)
-
-                if results and len(results) > 0:
-                    # The result might be a JSON string that needs parsing
-                    if isinstance(results[0].get("result"), str):
-                        # Parse the JSON string if needed
-                        team_data = json.loads(results[0]["result"])
-                    else:
-                        team_data = results[0].get("result", [])
-
-                    # Ensure we have a list of dictionaries
-                    if isinstance(team_data, list):
-                        return [LeagueStats(**entry) for entry in team_data]
-                    elif isinstance(team_data, dict):
-                        return [LeagueStats(**team_data)]
-
-                return []
-            else:
-                raise HTTPException(status_code=response.status_code, detail=response.text)
-        except json.JSONDecodeError as e:
-            raise HTTPException(status_code=500, detail=f"JSON decode error: {str(e)}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-
-    def get_worst_winners(self):
-        query = f"""
+        """).bind()
+
+        rows = await self.gateway.execute(query)
+        if not rows:
+            return []
+        if isinstance(rows, dict):
+            rows = [rows]
+        return [LeagueStats(**row) for row in rows]
+
+    @cached(season_arg=None)
+    async def get_worst_winners(self):
+        query = sql_template("stats.worst_winners", """
         SELECT json_agg(top_teams)
         FROM (
             SELECT
@@ -535,34 +480,11 @@ class StatsService:
             JOIN teams t ON lr.team_id = t.team_id
             ORDER BY lr.goals_a ASC
         ) top_teams;
-        """
-
-        try:
-            response = requests.post(self.url, headers=self.headers, json={"sql_query": query})
-            if response.status_code == 200:
-                results = response.json()
-
-                # Debug print to see the raw response structure
-                #print("Raw response:", results)
-
-                if results and len(results) > 0:
-                    # The result might be a JSON string that needs parsing
-                    if isinstance(results[0].get("result"), str):
-                        # Parse the JSON string if needed
-                        team_data = json.loads(results[0]["result"])
-                    else:
-                        team_data = results[0].get("result", [])
-
-                    # Ensure we have a list of dictionaries
-                    if isinstance(team_data, list):
-                        return [LeagueStats(**entry) for entry in team_data]
-                    elif isinstance(team_data, dict):
-                        return [LeagueStats(**team_data)]
-
-                return []
-            else:
-                raise HTTPException(status_code=response.status_code, detail=response.text)
-        except json.JSONDecodeError as e:
-            raise HTTPException(status_code=500, detail=f"JSON decode error: {str(e)}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+        """).bind()
+
+        rows = await self.gateway.execute(query)
+        if not rows:
+            return []
+        if isinstance(rows, dict):
+            rows = [rows]
+        return [LeagueStats(**row) for row in rows]
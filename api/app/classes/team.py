@@ -1,12 +1,15 @@
 from fastapi import HTTPException
 from typing import List
 from pydantic import BaseModel
-from supabase import Client
+from supabase import AsyncClient
+from app.cache import cached
+from app.dependencies import get_sql_gateway
+from app.queries import sql_template
+from app.loaders import request_loaders
 from typing import Optional
-import requests
 from ..models.team import Transfer, PlayerNations, TeamBasicInfo
 #from ..models.player import PlayerBasicInfo
-from app.constants import GLOBAL_YEAR
+from app.constants import GLOBAL_YEAR, PLAYER_STATS
 
 
 # Define a Pydantic model
@@ -31,18 +34,14 @@ class TeamPlayersStatsResponse(BaseModel):
     data: TeamPlayersStatsData
 
 class TeamService:
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_client: AsyncClient):
         self.supabase = supabase_client
-        self.key = supabase_client.supabase_key
-        self.url = f"{supabase_client.rest_url}/rpc/execute_sql"
-        self.headers = {
-            "Authorization": f"Bearer {self.key}",
-            "apikey": self.key,
-            "Content-Type": "application/json"
-        }
+        self.gateway = get_sql_gateway()
+        self.loaders = request_loaders()
 
-    def most_stats_by_team(self, team_id: int, season: int, stat: str, age: int):
-        query = f"""
+    @cached()
+    async def most_stats_by_team(self, team_id: int, season: int, stat: str, age: int):
+        query = sql_template("team.most_stats", """
         WITH team_stats AS (
             SELECT
                 json_build_object(
@@ -82,11 +81,11 @@ class TeamService:
             LEFT JOIN teams t ON ps.team_id = t.team_id
             LEFT JOIN teams n1 ON pl.nation1_id = n1.team_id
             LEFT JOIN teams n2 ON pl.nation2_id = n2.team_id
-            WHERE ps.season_year = {season} 
-                AND ps.team_id = {team_id} 
+            WHERE ps.season_year = :season 
+                AND ps.team_id = :team_id 
                 AND ps.comp_id = 9999
-                AND ps.age <= {age}
-            ORDER BY ps.{stat} DESC
+                AND ps.age <= :age
+            ORDER BY ps.:stat DESC
             LIMIT 10
         )
         SELECT json_build_object(
@@ -94,34 +93,13 @@ class TeamService:
                 'stats', (SELECT coalesce(json_agg(stats), '[]'::json) FROM team_stats)
             )
         ) as result;
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            
-            result = response.json() 
-            # Debug prints (keep these for troubleshooting)
-            #print(f"Supabase raw response status: {response.status_code}")
-            #print(f"Supabase raw response text: {response.text}")
-            #print(f"Supabase response: {result}")
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for"
-                )
-            return TeamPlayersStatsResponse(data=result["data"])
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, team_id="bigint", season="integer", age="integer", stat=PLAYER_STATS).bind(team_id=team_id, season=season, age=age, stat=stat)
+        result = await self.gateway.fetch_data(query, not_found="No data found for")
+        return result
 
-    def get_team_squads_per_year(self, team_id: int, season: int):
-        query = f"""
+    @cached()
+    async def get_team_squads_per_year(self, team_id: int, season: int):
+        query = sql_template("team.squads_per_year", """
         WITH team_squad AS (
             SELECT
                 sq.id as squad_id,
@@ -158,47 +136,27 @@ class TeamService:
             FROM squads sq
             LEFT JOIN players p ON sq.player_id = p.player_id
             LEFT JOIN player_stats ps ON sq.player_id = ps.player_id
-                AND ps.season_year = {season}
+                AND ps.season_year = :season
                 AND ps.comp_id = 9999
             LEFT JOIN teams n1 ON p.nation1_id = n1.team_id
             LEFT JOIN teams n2 ON p.nation2_id = n2.team_id
-            WHERE sq.team_id = {team_id} 
-            AND sq.season_year = {season}
+            WHERE sq.team_id = :team_id 
+            AND sq.season_year = :season
         )
         SELECT json_build_object(
             'data', json_build_object(
                 'squad', (SELECT coalesce(json_agg(row_to_json(team_squad)), '[]'::json) FROM team_squad)
             )
         ) as result;
-        """
+        """, team_id="bigint", season="integer").bind(team_id=team_id, season=season)
 
-        try:
-            # Use "query" instead of "sql_query" for the parameter name
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}  # Changed from "sql_query" to "query"
-            )
-            response.raise_for_status()
-            result = response.json()
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for match "
-                )
-                
-            # Parse the response according to the actual structure
-            return result
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        result = await self.gateway.fetch_data(query, not_found="No data found for match ")
+        return result
 
 
-    def get_team_info(self, team_id: str):
-        query = f"""
+    @cached(season_arg=None)
+    async def get_team_info(self, team_id: str):
+        query = sql_template("team.info", """
         WITH team_info AS (
             SELECT 
                 t.team_id,
@@ -214,7 +172,7 @@ class TeamService:
             FROM teams t
             LEFT JOIN leagues l ON t.league_id = l.league_id
             LEFT JOIN teams nt ON l.country_id = nt.team_id
-            WHERE t.team_id = '{team_id}'
+            WHERE t.team_id = :team_id
         ),
         team_transfers AS (
             SELECT
@@ -248,7 +206,7 @@ class TeamService:
             JOIN leagues tl ON tt.league_id = tl.league_id
             JOIN teams fn ON fl.country_id = fn.team_id
             JOIN teams tn ON tl.country_id = tn.team_id
-            WHERE tr.from_team_id = '{team_id}' OR tr.to_team_id = '{team_id}'
+            WHERE tr.from_team_id = :team_id OR tr.to_team_id = :team_id
             ORDER BY tr.date DESC
             LIMIT 30
         ),
@@ -298,7 +256,7 @@ class TeamService:
             JOIN teams ht ON m.home_id = ht.team_id
             JOIN teams at ON m.away_id = at.team_id
             JOIN leagues l ON m.comp_id = l.league_id
-            WHERE (m.home_id = '{team_id}' OR m.away_id = '{team_id}')
+            WHERE (m.home_id = :team_id OR m.away_id = :team_id)
             AND m.result IS NOT NULL
             ORDER BY m.match_date DESC, m.match_time DESC
             LIMIT 6
@@ -349,7 +307,7 @@ class TeamService:
             JOIN teams ht ON m.home_id = ht.team_id
             JOIN teams at ON m.away_id = at.team_id
             JOIN leagues l ON m.comp_id = l.league_id
-            WHERE (m.home_id = '{team_id}' OR m.away_id = '{team_id}')
+            WHERE (m.home_id = :team_id OR m.away_id = :team_id)
             AND m.result IS NULL
             ORDER BY m.match_date ASC, m.match_time ASC
             LIMIT 6
@@ -410,7 +368,7 @@ class TeamService:
             JOIN leagues l ON ps.comp_id = l.league_id
             LEFT JOIN teams tn1 ON p.nation1_id = tn1.team_id
             LEFT JOIN teams tn2 ON p.nation2_id = tn2.team_id
-            WHERE ps.team_id = '{team_id}' AND ps.comp_id = 9999 AND ps.season_year = {GLOBAL_YEAR}
+            WHERE ps.team_id = :team_id AND ps.comp_id = 9999 AND ps.season_year = :season
             ORDER BY ps.ga DESC
         )
         SELECT json_build_object(
@@ -473,33 +431,14 @@ class TeamService:
                 ), '[]'::json) FROM team_stats ts)
             )
         ) as result
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(result)
-            response_data = result.get('data')
-            if not response_data:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No team data found"
-                )
-            return result
-
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, function="ga_team_info_v1", team_id="bigint", season="integer").bind(team_id=team_id, season=GLOBAL_YEAR)
+        result = await self.gateway.fetch_data(query, not_found="No team data found")
+        return result
         
 
-    def get_team_matches_by_year(self, team_id: int, season: int):
-        query = f"""
+    @cached()
+    async def get_team_matches_by_year(self, team_id: int, season: int):
+        query = sql_template("team.matches_by_year", """
         SELECT json_build_object(
             'data', json_build_object(
                 'matches', json_agg(
@@ -578,45 +517,18 @@ class TeamService:
             LEFT JOIN teams ht ON m.home_id = ht.team_id
             LEFT JOIN teams at ON m.away_id = at.team_id
             LEFT JOIN leagues l ON m.comp_id = l.league_id
-            WHERE (m.home_id = {team_id} OR m.away_id = {team_id}) AND m.season_year = {season}
+            WHERE (m.home_id = :team_id OR m.away_id = :team_id) AND m.season_year = :season
             ORDER BY m.match_date DESC
             LIMIT 300
         ) as match_data;
 
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response status: {response.status_code}")
-            #print(f"Supabase raw response text: {response.text}")
-            # The response structure is {"data": {...}} not a list with result[0]
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for team {team_id}"
-                )
-            # Parse the response according to the actual structure
-            return result
-            
-        except requests.exceptions.HTTPError as http_err:
-            error_detail = response.text if hasattr(response, 'text') else str(http_err)
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Supabase error: {error_detail}"
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, team_id="bigint", season="integer").bind(team_id=team_id, season=season)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for team {team_id}")
+        return result
         
-    def get_comp_finishes_by_year(self, team_id: int, season: int):
-        query = f"""
+    @cached()
+    async def get_comp_finishes_by_year(self, team_id: int, season: int):
+        query = sql_template("team.comp_finishes_by_year", """
         WITH team_comps AS (
             SELECT 
                 lr.rank,
@@ -632,7 +544,7 @@ class TeamService:
             FROM league_ranks lr
             JOIN leagues l ON lr.comp_id = l.league_id
             JOIN teams t ON lr.team_id = t.team_id
-            WHERE lr.team_id = {team_id} AND lr.season_year = {season}
+            WHERE lr.team_id = :team_id AND lr.season_year = :season
         )
         SELECT json_build_object(
             'data', json_build_object(
@@ -667,40 +579,13 @@ class TeamService:
             )
         ) as result
 
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response status: {response.status_code}")
-            #print(f"Supabase raw response text: {response.text}")
-            # The response structure is {"data": {...}} not a list with result[0]
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No data found for team {team_id}"
-                )
-            # Parse the response according to the actual structure
-            return result
+        """, team_id="bigint", season="integer").bind(team_id=team_id, season=season)
+        result = await self.gateway.fetch_data(query, not_found=f"No data found for team {team_id}")
+        return result
 
-        except requests.exceptions.HTTPError as http_err:
-            error_detail = response.text if hasattr(response, 'text') else str(http_err)
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Supabase error: {error_detail}"
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
-
-    def get_transfers_by_date(self, team_id: int, start_date: str, end_date:str):
-        query = f"""
+    @cached(season_arg='end_date')
+    async def get_transfers_by_date(self, team_id: int, start_date: str, end_date:str):
+        query = sql_template("team.transfers_by_date", """
         WITH team_transfers AS (
             SELECT
                 tr.transfer_id,
@@ -726,8 +611,8 @@ class TeamService:
                 tr.date,
                 tr.season,
                 CASE 
-                    WHEN tr.to_team_id = {team_id} THEN 'in'
-                    WHEN tr.from_team_id = {team_id} THEN 'out'
+                    WHEN tr.to_team_id = :team_id THEN 'in'
+                    WHEN tr.from_team_id = :team_id THEN 'out'
                 END as transfer_direction
             FROM transfers tr
             JOIN players p ON tr.player_id = p.player_id
@@ -737,9 +622,9 @@ class TeamService:
             JOIN leagues tl ON tt.league_id = tl.league_id
             JOIN teams fn ON fl.country_id = fn.team_id
             JOIN teams tn ON tl.country_id = tn.team_id
-            WHERE (tr.from_team_id = {team_id} OR tr.to_team_id = {team_id})
-            AND tr.date >= '{start_date}'
-            AND tr.date <= '{end_date}'
+            WHERE (tr.from_team_id = :team_id OR tr.to_team_id = :team_id)
+            AND tr.date >= :start_date
+            AND tr.date <= :end_date
             ORDER BY tr.date DESC
         ),
         transfers_summary AS (
@@ -777,33 +662,14 @@ class TeamService:
                 ) FROM transfers_summary ts)
             )
         ) as result
-        """
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(result)
-            response_data = result.get('data')
-            if not response_data:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No team data found"
-                )
-            return result
-
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        """, team_id="bigint", start_date="date", end_date="date").bind(team_id=team_id, start_date=start_date, end_date=end_date)
+        result = await self.gateway.fetch_data(query, not_found="No team data found")
+        return result
         
 
-    def get_domestic_finishes(self, team_id: int, season: int):
-        query = f"""
+    @cached()
+    async def get_domestic_finishes(self, team_id: int, season: int):
+        query = sql_template("team.domestic_finishes", """
         WITH domestic_rankings AS (
             SELECT 
                 lr.rank,
@@ -826,8 +692,8 @@ class TeamService:
             FROM league_ranks lr
             JOIN leagues l ON lr.comp_id = l.league_id
             JOIN teams t ON lr.team_id = t.team_id
-            WHERE lr.team_id = {team_id} 
-            AND lr.season_year BETWEEN {season - 25} AND {season}
+            WHERE lr.team_id = :team_id 
+            AND lr.season_year BETWEEN (:season - 25) AND :season
             AND l.type LIKE '%Domestic League%'
             ORDER BY lr.season_year DESC
         )
@@ -865,37 +731,7 @@ class TeamService:
                 )
             )
         ) as result
-        """
+        """, team_id="bigint", season="integer").bind(team_id=team_id, season=season)
         
-        try:
-            response = requests.post(
-                self.url,
-                headers=self.headers,
-                json={"sql_query": query}
-            )
-            response.raise_for_status()
-            result = response.json()
-            #print(f"Supabase raw response status: {response.status_code}")
-            #print(f"Supabase raw response text: {response.text}")
-            
-            # The response structure is {"data": {...}} not a list with result[0]
-            if not result or not result.get("data"):
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No domestic league data found for team {team_id} in the past 5 seasons"
-                )
-            
-            # Parse the response according to the actual structure
-            return result
-            
-        except requests.exceptions.HTTPError as http_err:
-            error_detail = response.text if hasattr(response, 'text') else str(http_err)
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Supabase error: {error_detail}"
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Unexpected error: {str(e)}"
-            )
+        result = await self.gateway.fetch_data(query, not_found=f"No domestic league data found for team {team_id} in the past 5 seasons")
+        return result
@@ -0,0 +1,53 @@
+# app/codec.py
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Union
+from pydantic import BaseModel
+from starlette.responses import JSONResponse as _JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to json
+    orjson = None
+
+# which library encodes and decodes, reported by /v1/admin/responses
+ENGINE = "orjson" if orjson is not None else "json"
+
+
+def encode_default(value: Any) -> Any:
+    """
+    JSON form of what the encoders don't handle natively. Dates and times
+    are ISO 8601 whichever library runs (2024-08-17, 2024-08-17T15:00:00,
+    with +00:00 for aware values), the same as orjson writes them.
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        # non-string keys (season years, ids) become strings, as with json
+        return orjson.dumps(value, default=encode_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=encode_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JSONResponse(_JSONResponse):
+    """
+    The app's default response class, encoded with `dumps`.
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,3 +1,11 @@
 GLOBAL_YEAR = 2024
 
-GLOBAL_YEAR_OTHER = 2024
\ No newline at end of file
+GLOBAL_YEAR_OTHER = 2024
+
+# player_stats columns a leaderboard can be ordered by
+PLAYER_STATS = (
+    'ga', 'goals', 'assists', 'penalty_goals', 'gp', 'minutes', 'cs', 'goals_concede',
+    'yellows', 'yellows2', 'reds', 'own_goals', 'subbed_on', 'subbed_off',
+    'ga_pg', 'goals_pg', 'assists_pg', 'minutes_pg', 'pass_compl_pg', 'passes_pg', 'errors_pg',
+    'shots_pg', 'shots_on_target_pg', 'sca_pg', 'gca_pg', 'take_ons_pg', 'take_ons_won_pg',
+)
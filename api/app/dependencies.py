@@ -1,7 +1,11 @@
 # app/dependencies.py
 import os
-from supabase import create_client, Client
+from typing import Optional
+import httpx
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
 from dotenv import load_dotenv
+from fastapi import Header, HTTPException
+from .gateway import SqlGateway, CircuitBreaker
 
 load_dotenv()
 
@@ -11,10 +15,141 @@ SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables.")
 
+# Token for mutating admin routes (cache purges etc.), disabled when unset
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
 
-def get_supabase_client() -> Client:
+# Connection pool tuning. Every request goes to the same Supabase host, so
+# max connections is also the per-host limit.
+POOL_MAX_CONNECTIONS = int(os.environ.get("SUPABASE_POOL_MAX_CONNECTIONS", "100"))
+POOL_MAX_KEEPALIVE = int(os.environ.get("SUPABASE_POOL_MAX_KEEPALIVE", "20"))
+POOL_KEEPALIVE_EXPIRY = float(os.environ.get("SUPABASE_POOL_KEEPALIVE_EXPIRY", "30"))
+POOL_TIMEOUT = float(os.environ.get("SUPABASE_POOL_TIMEOUT", "30"))
+
+# execute_sql gateway: default per-query deadline, retries for reads and the
+# circuit breaker thresholds
+SQL_TIMEOUT = float(os.environ.get("SQL_TIMEOUT", "15"))
+SQL_RETRIES = int(os.environ.get("SQL_RETRIES", "2"))
+BREAKER_THRESHOLD = int(os.environ.get("SQL_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET_AFTER = float(os.environ.get("SQL_BREAKER_RESET_AFTER", "30"))
+# Call the versioned server-side functions (migrations/) for the queries
+# that have one, 0 sends their inline SQL instead
+SQL_FUNCTIONS = os.environ.get("SQL_FUNCTIONS", "1") == "1"
+
+_http_client: Optional[httpx.AsyncClient] = None
+_supabase: Optional[AsyncClient] = None
+_gateway: Optional[SqlGateway] = None
+_requests_sent = 0
+
+
+async def _count_request(request: httpx.Request):
+    global _requests_sent
+    _requests_sent += 1
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+async def init_supabase_client() -> AsyncClient:
+    """
+    Create the process-wide Supabase client, its pooled HTTP session and the
+    execute_sql gateway. Safe to call more than once, only the first call
+    builds anything.
+    """
+    global _http_client, _supabase, _gateway
+    if _supabase is None:
+        http_client = httpx.AsyncClient(
+            limits=_pool_limits(),
+            timeout=httpx.Timeout(POOL_TIMEOUT, connect=5.0),
+            follow_redirects=True,
+            event_hooks={"request": [_count_request]},
+        )
+        client = await acreate_client(
+            SUPABASE_URL,
+            SUPABASE_KEY,
+            options=AsyncClientOptions(httpx_client=http_client),
+        )
+        # another coroutine may have won the race while we were awaiting
+        if _supabase is None:
+            _http_client, _supabase = http_client, client
+            _gateway = SqlGateway(
+                str(client.rest_url),
+                SUPABASE_KEY,
+                http_client,
+                timeout=SQL_TIMEOUT,
+                retries=SQL_RETRIES,
+                breaker=CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET_AFTER),
+                functions=SQL_FUNCTIONS,
+            )
+        else:
+            await http_client.aclose()
+    return _supabase
+
+
+async def close_supabase_client():
+    """
+    Close the pooled HTTP session (called on app shutdown).
+    """
+    global _http_client, _supabase, _gateway
+    http_client = _http_client
+    _http_client, _supabase, _gateway = None, None, None
+    if http_client is not None:
+        await http_client.aclose()
+
+
+async def get_supabase_client() -> AsyncClient:
+    """
+    Dependency to provide the shared Supabase client.
+    """
+    return _supabase or await init_supabase_client()
+
+
+def get_sql_gateway() -> SqlGateway:
+    """
+    The process-wide execute_sql gateway. Only valid once the client exists,
+    which every route guarantees through get_supabase_client.
+    """
+    if _gateway is None:
+        raise RuntimeError("Supabase client is not initialised")
+    return _gateway
+
+
+def get_pool_stats() -> dict:
+    """
+    Snapshot of the shared connection pool.
+    """
+    stats = {
+        "max_connections": POOL_MAX_CONNECTIONS,
+        "max_keepalive_connections": POOL_MAX_KEEPALIVE,
+        "keepalive_expiry": POOL_KEEPALIVE_EXPIRY,
+        "requests_sent": _requests_sent,
+        "connections": 0,
+        "active": 0,
+        "idle": 0,
+        "utilisation": 0.0,
+    }
+    if _http_client is None:
+        return stats
+
+    pool = getattr(_http_client._transport, "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for conn in connections if conn.is_idle())
+    stats.update(
+        connections=len(connections),
+        active=len(connections) - idle,
+        idle=idle,
+        utilisation=round(100.0 * (len(connections) - idle) / POOL_MAX_CONNECTIONS, 1),
+    )
+    return stats
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
     """
-    Dependency to provide a Supabase client.
+    Dependency guarding admin routes that change server state.
     """
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    return supabase
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
@@ -0,0 +1,232 @@
+# app/dimensions.py
+import os
+import sys
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+from app.dependencies import get_sql_gateway
+from app.queries import sql_template
+
+logger = logging.getLogger(__name__)
+
+# New rows are picked up every DIMENSION_REFRESH_INTERVAL seconds, edits to
+# existing rows on the next full reload
+DIMENSION_REFRESH_INTERVAL = float(os.environ.get("DIMENSION_REFRESH_INTERVAL", "300"))
+DIMENSION_FULL_RELOAD = float(os.environ.get("DIMENSION_FULL_RELOAD", "3600"))
+# Skip the player table when memory is tight, players are then fetched on demand
+DIMENSION_LOAD_PLAYERS = os.environ.get("DIMENSION_LOAD_PLAYERS", "1") == "1"
+# Most ids the database didn't have remembered per table, until the next refresh
+DIMENSION_MAX_ABSENT = int(os.environ.get("DIMENSION_MAX_ABSENT", "10000"))
+
+
+class TeamDim(NamedTuple):
+    team_id: int
+    team_name: str
+    logo_url: Optional[str]
+
+
+class LeagueDim(NamedTuple):
+    league_id: int
+    league_name: str
+    country_id: Optional[int]
+    logo_url: Optional[str]
+    type: Optional[str]
+
+
+class PlayerDim(NamedTuple):
+    player_id: int
+    player_name: str
+    pic_url: Optional[str]
+    curr_team_id: Optional[int]
+    nation1_id: Optional[int]
+    nation1: Optional[str]
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# table, id column, selected columns (in tuple order) and row type
+_TABLES = {
+    "teams": ("teams", "team_id", "team_id, team_name, logo_url", TeamDim),
+    "leagues": ("leagues", "league_id", "league_id, league_name, country_id, logo_url, type", LeagueDim),
+    "players": ("players", "player_id", "player_id, player_name, pic_url, curr_team_id, nation1_id, nation1", PlayerDim),
+}
+
+
+def _dimension_sql(table: str, columns: str, where: str) -> str:
+    return f"""
+        SELECT json_build_object(
+            'data', COALESCE(
+                (SELECT json_agg(json_build_array({columns})) FROM {table} WHERE {where}),
+                '[]'::json
+            )
+        ) as result
+        """
+
+
+# per table: rows above an id (a full load starts at 0) and rows by id
+_QUERIES = {
+    name: {
+        "newer": sql_template(f"dimensions.{name}.newer", _dimension_sql(table, columns, f"{id_col} > :after"), after="bigint"),
+        "ids": sql_template(f"dimensions.{name}.ids", _dimension_sql(table, columns, f"{id_col} = ANY(:ids)"), ids="bigint[]"),
+    }
+    for name, (table, id_col, columns, _) in _TABLES.items()
+}
+
+
+class DimensionStore:
+    """
+    Process-wide copy of the small, slowly changing rows most responses
+    decorate themselves with: teams (clubs and national sides), leagues and
+    player identity. Rows are kept as interned tuples and fetched from the
+    database in bulk, lookups that miss go to the database in one batch
+    and are remembered, ids it doesn't have until the next refresh.
+    """
+    def __init__(self):
+        self._rows: Dict[str, dict] = {name: {} for name in _TABLES}
+        self._high_water: Dict[str, int] = {name: 0 for name in _TABLES}
+        # ids a fetch came back without, not asked for again until a refresh
+        self._absent: Dict[str, set] = {name: set() for name in _TABLES}
+        self.loaded_at = 0.0
+        self.refreshed_at = 0.0
+        self.counters = {"hits": 0, "misses": 0, "absent_hits": 0, "fetches": 0, "refreshes": 0, "errors": 0}
+        # called after every full load, e.g. by the suggestions built from it
+        self.on_load: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def _tables(self):
+        return [name for name in _TABLES if name != "players" or DIMENSION_LOAD_PLAYERS]
+
+    async def _fetch(self, name: str, kind: str, **params) -> list:
+        query = _QUERIES[name][kind].bind(**params)
+        result = await get_sql_gateway().execute(query)
+        return (result or {}).get("data") or []
+
+    def _store(self, name: str, rows: Iterable[list]):
+        row_type = _TABLES[name][3]
+        store = self._rows[name]
+        for row in rows:
+            dim = row_type(*(_intern(v) for v in row))
+            store[dim[0]] = dim
+            if dim[0] > self._high_water[name]:
+                self._high_water[name] = dim[0]
+
+    async def load(self):
+        """
+        Full reload of every table, replaces what is held.
+        """
+        for name in self._tables():
+            rows = await self._fetch(name, "newer", after=0)
+            self._rows[name] = {}
+            self._high_water[name] = 0
+            self._store(name, rows)
+        self._forget_absent()
+        self.loaded_at = self.refreshed_at = time.time()
+        for callback in self.on_load:
+            callback()
+
+    async def refresh(self):
+        """
+        Pick up rows added since the last load or refresh.
+        """
+        for name in self._tables():
+            self._store(name, await self._fetch(name, "newer", after=self._high_water[name]))
+        self._forget_absent()
+        self.refreshed_at = time.time()
+        self.counters["refreshes"] += 1
+
+    def _forget_absent(self):
+        # including tables that aren't loaded, their ids may exist by now
+        for ids in self._absent.values():
+            ids.clear()
+
+    def held(self, name: str) -> list:
+        """
+        The rows of `name` currently in memory, without fetching anything.
+        """
+        return list(self._rows[name].values())
+
+    async def _get_many(self, name: str, ids: Iterable) -> dict:
+        store = self._rows[name]
+        absent = self._absent[name]
+        wanted = {int(i) for i in ids if i is not None}
+        missing = [i for i in wanted if i not in store]
+        self.counters["hits"] += len(wanted) - len(missing)
+        if missing:
+            unknown = [i for i in missing if i not in absent]
+            self.counters["absent_hits"] += len(missing) - len(unknown)
+            if unknown:
+                self.counters["misses"] += len(unknown)
+                self.counters["fetches"] += 1
+                self._store(name, await self._fetch(name, "ids", ids=sorted(unknown)))
+                if len(absent) > DIMENSION_MAX_ABSENT:
+                    absent.clear()
+                absent.update(i for i in unknown if i not in store)
+        return {i: store[i] for i in wanted if i in store}
+
+    async def teams(self, team_ids: Iterable) -> Dict[int, TeamDim]:
+        return await self._get_many("teams", team_ids)
+
+    async def team(self, team_id: Optional[int]) -> Optional[TeamDim]:
+        if team_id is None:
+            return None
+        return (await self.teams([team_id])).get(int(team_id))
+
+    async def leagues(self, league_ids: Iterable) -> Dict[int, LeagueDim]:
+        return await self._get_many("leagues", league_ids)
+
+    async def league(self, league_id: Optional[int]) -> Optional[LeagueDim]:
+        if league_id is None:
+            return None
+        return (await self.leagues([league_id])).get(int(league_id))
+
+    async def players(self, player_ids: Iterable) -> Dict[int, PlayerDim]:
+        return await self._get_many("players", player_ids)
+
+    async def player(self, player_id: Optional[int]) -> Optional[PlayerDim]:
+        if player_id is None:
+            return None
+        return (await self.players([player_id])).get(int(player_id))
+
+    async def _run(self):
+        while True:
+            try:
+                if time.time() - self.loaded_at >= DIMENSION_FULL_RELOAD:
+                    await self.load()
+                else:
+                    await self.refresh()
+            except Exception:
+                self.counters["errors"] += 1
+                logger.warning("Dimension refresh failed", exc_info=True)
+            await asyncio.sleep(DIMENSION_REFRESH_INTERVAL)
+
+    def start(self):
+        """
+        Load in the background and keep refreshing. Lookups made before the
+        first load completes fall back to per-batch fetches.
+        """
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "sizes": {name: len(rows) for name, rows in self._rows.items()},
+            "absent": {name: len(ids) for name, ids in self._absent.items()},
+            "loaded_at": self.loaded_at,
+            "refreshed_at": self.refreshed_at,
+            **self.counters,
+        }
+
+
+dimension_store = DimensionStore()
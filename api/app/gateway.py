@@ -0,0 +1,393 @@
+# app/gateway.py
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Union
+import httpx
+from fastapi import HTTPException
+from .singleflight import SingleFlight
+from .queries import BoundQuery
+from .codec import dumps, loads
+
+# What the gateway runs: raw SQL text or a bound query template
+Query = Union[str, BoundQuery]
+
+# Upstream statuses worth retrying: rate limiting and a degraded gateway.
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `threshold` consecutive upstream failures. Once
+    `reset_after` seconds have passed a single probe request is let through,
+    its outcome decides whether the circuit closes again.
+    """
+    def __init__(self, threshold: int = 5, reset_after: float = 30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_after:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        # the probe was abandoned (e.g. client went away), let the next one through
+        self.probing = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures, "threshold": self.threshold}
+
+
+def normalise_sql(query: str) -> str:
+    """
+    Whitespace-insensitive form of a query, used to spot identical queries.
+    """
+    return " ".join(query.split())
+
+
+def normalise_result(payload: Any) -> Any:
+    """
+    Unwrap the shapes execute_sql can hand back into the query's JSON value.
+    A `json_build_object(...) as result` query arrives as the object itself,
+    row-returning variants arrive as `[{"result": ...}]`, and some servers
+    return the value as a JSON string.
+    """
+    if isinstance(payload, list) and len(payload) == 1 and isinstance(payload[0], dict) and len(payload[0]) == 1:
+        payload = next(iter(payload[0].values()))
+    if isinstance(payload, str):
+        try:
+            payload = loads(payload)
+        except ValueError:
+            pass
+    if payload == []:
+        return None
+    return payload
+
+
+def bundle_sql(queries: Dict[str, Query]) -> str:
+    """
+    One SELECT returning every query's rows under its name. Each entry holds
+    what execute_sql would have returned for that query on its own.
+    """
+    parts = ",\n".join(
+        f"'{name}', (SELECT json_agg(to_json(s)) FROM ({_text(query).strip().rstrip(';')}) s)"
+        for name, query in queries.items()
+    )
+    return f"SELECT json_build_object(\n{parts}\n) as result"
+
+
+def _missing_function(error: HTTPException, function: str) -> bool:
+    """
+    Whether `error` is PostgREST reporting that `function` doesn't exist
+    (PGRST202), as opposed to the function failing.
+    """
+    detail = str(error.detail)
+    return error.status_code == 500 and function in detail and ("PGRST202" in detail or "Could not find the function" in detail)
+
+
+def _text(query: Query) -> str:
+    return query if isinstance(query, str) else query.inline()
+
+
+class QueryBundle:
+    """
+    Collects the reads issued during one event-loop tick and sends them to
+    the gateway as a single execute_sql call.
+    """
+    def __init__(self, gateway: "SqlGateway"):
+        self.gateway = gateway
+        self._pending: List[tuple] = []
+
+    def add(self, query: Query, timeout: Optional[float]) -> "asyncio.Future":
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, timeout, future))
+        if len(self._pending) == 1:
+            # two hops, like the request loaders: sibling tasks get to queue theirs
+            loop.call_soon(loop.call_soon, self._dispatch)
+        return future
+
+    def _dispatch(self):
+        pending, self._pending = self._pending, []
+        if pending:
+            asyncio.ensure_future(self._resolve(pending))
+
+    async def _resolve(self, pending: List[tuple]):
+        queries = {f"q{i}": query for i, (query, _, _) in enumerate(pending)}
+        timeouts = [t for _, t, _ in pending if t]
+        try:
+            results = await self.gateway.execute_many(queries, timeout=max(timeouts) if timeouts else None)
+        except Exception as e:
+            results = {name: e for name in queries}
+        for name, (_, _, future) in zip(queries, pending):
+            if future.done():
+                continue
+            if isinstance(results[name], Exception):
+                future.set_exception(results[name])
+            else:
+                future.set_result(results[name])
+
+
+_bundle: ContextVar[Optional[QueryBundle]] = ContextVar("sql_bundle", default=None)
+
+
+class SqlGateway:
+    """
+    Single entry point for the `execute_sql` RPC. Owns per-query deadlines,
+    bounded retries with jitter for idempotent reads and a circuit breaker
+    shared by every service.
+    """
+    def __init__(
+        self,
+        rest_url: str,
+        key: str,
+        http: httpx.AsyncClient,
+        timeout: float = 15.0,
+        retries: int = 2,
+        backoff: float = 0.2,
+        breaker: Optional[CircuitBreaker] = None,
+        functions: bool = True,
+    ):
+        self.rest_url = rest_url
+        self.url = f"{rest_url}/rpc/execute_sql"
+        self.batch_url = f"{rest_url}/rpc/execute_sql_batch"
+        # unknown until the first batch, False once the server says it lacks
+        # execute_sql_batch (see migrations/versions/)
+        self.batch_rpc: Optional[bool] = None
+        # the same for execute_sql_params, templates are sent with their
+        # values inlined while it is missing
+        self.params_url = f"{rest_url}/rpc/execute_sql_params"
+        self.params_rpc: Optional[bool] = None
+        # templates backed by a server-side function call it by name unless
+        # disabled; functions the server lacks are remembered here as False
+        self.use_functions = functions
+        self.functions: Dict[str, bool] = {}
+        self.http = http
+        self.headers = {
+            "Authorization": f"Bearer {key}",
+            "apikey": key,
+            "Content-Type": "application/json"
+        }
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.flights = SingleFlight()
+        self.counters = {
+            "queries": 0, "retries": 0, "timeouts": 0, "failures": 0, "rejected": 0,
+            "bundles": 0, "bundled_queries": 0, "bundle_fallbacks": 0, "templated": 0, "function_calls": 0,
+        }
+
+    async def execute(self, query: Query, timeout: Optional[float] = None, idempotent: bool = True) -> Any:
+        """
+        Run `query`, SQL text or a bound template from app.queries, and return
+        its decoded result. Identical reads that are already in flight share
+        that upstream call instead of starting one.
+        Results may be shared between requests, treat them as read-only.
+        """
+        self.counters["queries"] += 1
+        if not isinstance(query, str):
+            self.counters["templated"] += 1
+        if not idempotent:
+            return await self._run(query, timeout, idempotent)
+        bundle = _bundle.get()
+        if bundle is not None and bundle.gateway is self:
+            return await bundle.add(query, timeout)
+        key = normalise_sql(query) if isinstance(query, str) else query.key
+        return await self.flights.do(key, lambda: self._run(query, timeout, idempotent))
+
+    async def _run(self, query: Query, timeout: Optional[float], idempotent: bool) -> Any:
+        if isinstance(query, str):
+            return await self._execute(query, timeout, idempotent)
+        function = query.template.function
+        if function and self.use_functions and self.functions.get(function) is not False:
+            try:
+                result = await self._execute(
+                    function, timeout, idempotent,
+                    url=f"{self.rest_url}/rpc/{function}", payload=query.function_args,
+                )
+                self.functions[function] = True
+                self.counters["function_calls"] += 1
+                return result
+            except HTTPException as e:
+                if not _missing_function(e, function):
+                    raise
+                self.functions[function] = False
+        if self.params_rpc is not False:
+            try:
+                result = await self._execute(
+                    query.sql, timeout, idempotent,
+                    url=self.params_url, payload={"sql_query": query.sql, "params": query.params},
+                )
+                self.params_rpc = True
+                return result
+            except HTTPException as e:
+                if not _missing_function(e, "execute_sql_params"):
+                    raise
+                self.params_rpc = False
+        return await self._execute(query.inline(), timeout, idempotent)
+
+    async def _execute(self, query: str, timeout: Optional[float], idempotent: bool, url: Optional[str] = None, payload: Optional[dict] = None) -> Any:
+        deadline = time.monotonic() + (timeout or self.timeout)
+        attempts = 1 + (self.retries if idempotent else 0)
+
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self.counters["rejected"] += 1
+                raise HTTPException(status_code=503, detail="Supabase is unavailable (circuit open)")
+
+            remaining = deadline - time.monotonic()
+            error = None
+            recorded = False
+            try:
+                response = await asyncio.wait_for(self._post(query, url, payload), remaining)
+                if response.status_code < 500 and response.status_code != 429:
+                    self.breaker.record_success()
+                    recorded = True
+                    if response.is_error:
+                        raise HTTPException(status_code=500, detail=f"Supabase error: {response.text}")
+                    return normalise_result(loads(response.content))
+                error = f"Supabase error: {response.status_code} {response.text}"
+                status, retryable = 502, response.status_code in RETRYABLE_STATUSES
+            except asyncio.TimeoutError:
+                self.counters["timeouts"] += 1
+                error, status, retryable = "Supabase query timed out", 504, False
+            except httpx.TransportError as e:
+                error, status, retryable = f"Supabase unreachable: {e!r}", 502, True
+            finally:
+                if not recorded and error is None:
+                    self.breaker.release()
+
+            self.breaker.record_failure()
+            self.counters["failures"] += 1
+            remaining = deadline - time.monotonic()
+            if not retryable or attempt == attempts - 1 or remaining <= 0:
+                raise HTTPException(status_code=status, detail=error)
+
+            # full jitter: anywhere between 0 and the exponential step
+            self.counters["retries"] += 1
+            await asyncio.sleep(min(random.uniform(0, self.backoff * 2 ** attempt), remaining))
+
+    async def execute_many(self, queries: Dict[str, Query], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run several named reads in one round trip and split the results back
+        by name. A query that fails leaves an HTTPException in its own slot,
+        the other results are unaffected; errors that hit the whole round
+        trip (circuit open, timeout) are raised.
+
+        Uses the execute_sql_batch function when the database has it, which
+        isolates errors per query server side. Without it the queries are
+        combined into one SELECT, and if that fails each query is retried on
+        its own to find the culprit.
+        """
+        if len(queries) == 1:
+            name, query = next(iter(queries.items()))
+            try:
+                return {name: await self._run(query, timeout, True)}
+            except HTTPException as e:
+                if e.status_code != 500:
+                    raise
+                return {name: e}
+
+        self.counters["bundles"] += 1
+        self.counters["bundled_queries"] += len(queries)
+
+        if self.batch_rpc is not False:
+            try:
+                payload = {name: self._batch_entry(query) for name, query in queries.items()}
+                rows = await self._execute("", timeout, True, url=self.batch_url, payload={"queries": payload})
+                self.batch_rpc = True
+                return self._split_batch(queries, rows)
+            except HTTPException as e:
+                if not _missing_function(e, "execute_sql_batch"):
+                    raise
+                self.batch_rpc = False
+
+        try:
+            combined = await self._execute(bundle_sql(queries), timeout, True)
+            return {name: normalise_result((combined or {}).get(name) or []) for name in queries}
+        except HTTPException as e:
+            # circuit open, timeouts and the like would hit the single queries too
+            if e.status_code != 500:
+                raise
+
+        self.counters["bundle_fallbacks"] += 1
+        results = await asyncio.gather(
+            *(self._run(query, timeout, True) for query in queries.values()),
+            return_exceptions=True,
+        )
+        return dict(zip(queries, results))
+
+    def _batch_entry(self, query: Query) -> Any:
+        if isinstance(query, str):
+            return query
+        function = query.template.function
+        # only functions known to exist, a missing one would fail its slot
+        if function and self.use_functions and self.functions.get(function):
+            return {"sql": query.call_sql, "params": query.params}
+        return {"sql": query.sql, "params": query.params}
+
+    @staticmethod
+    def _split_batch(queries: Dict[str, Query], rows: Any) -> Dict[str, Any]:
+        by_name = {row["name"]: row for row in rows or []}
+        results = {}
+        for name in queries:
+            row = by_name.get(name)
+            if row is None:
+                results[name] = HTTPException(status_code=500, detail="Supabase error: query missing from batch result")
+            elif row.get("error"):
+                results[name] = HTTPException(status_code=500, detail=f"Supabase error: {row['error']}")
+            else:
+                results[name] = normalise_result(row.get("result") or [])
+        return results
+
+    @contextmanager
+    def bundle(self):
+        """
+        Within this block (and tasks started in it) concurrent reads are sent
+        together through execute_many.
+        """
+        token = _bundle.set(QueryBundle(self))
+        try:
+            yield
+        finally:
+            _bundle.reset(token)
+
+    async def fetch_data(self, query: Query, not_found: str, timeout: Optional[float] = None) -> dict:
+        """
+        Run a `{'data': ...}` shaped query, 404 when it comes back empty.
+        """
+        result = await self.execute(query, timeout=timeout)
+        if not result or not result.get("data"):
+            raise HTTPException(status_code=404, detail=not_found)
+        return result
+
+    async def _post(self, query: str, url: Optional[str] = None, payload: Optional[dict] = None) -> httpx.Response:
+        return await self.http.post(url or self.url, headers=self.headers, content=dumps(payload or {"sql_query": query}))
+
+    def stats(self) -> dict:
+        return {"breaker": self.breaker.stats(), "single_flight": self.flights.stats(), "batch_rpc": self.batch_rpc, "params_rpc": self.params_rpc, "functions": self.functions if self.use_functions else False, **self.counters}
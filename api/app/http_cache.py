@@ -0,0 +1,213 @@
+# app/http_cache.py
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+from app.cache import season_of, season_ttl
+
+# max-age for completed seasons, whose responses never change
+PAST_SEASON_MAX_AGE = int(os.environ.get("HTTP_PAST_SEASON_MAX_AGE", "86400"))
+RESPONSE_MEMO_MAX_ENTRIES = int(os.environ.get("HTTP_MEMO_MAX_ENTRIES", "2048"))
+
+# answered fresh on every call, never memoised or cached downstream
+NO_STORE_PATHS = {"/v1/players/rand-transfer", "/v1/players/search"}
+NO_STORE_PREFIXES = ("/v1/admin",)
+# cached by the route itself and sending their own Cache-Control, too many
+# distinct queries to memoise here
+PASSTHROUGH_PATHS = {"/v1/search/suggest"}
+
+
+def season_cacheable(param: str = "season"):
+    """
+    Marks a route whose response for a completed season never changes, the
+    season being read from the query parameter `param`. Only mark routes
+    whose service calls are all @cached on that same season argument; any
+    other route is memoised for the current season TTL whatever it is asked.
+    """
+    def decorator(endpoint):
+        endpoint.season_param = param
+        return endpoint
+    return decorator
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    If-None-Match uses weak comparison, so W/"x" matches "x".
+    """
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any((t[2:] if t.startswith("W/") else t) == etag for t in tags)
+
+
+def not_modified_since(if_modified_since: str, last_modified: float) -> bool:
+    try:
+        return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+class _Memo:
+    __slots__ = ("body", "headers", "etag", "last_modified", "expires_at")
+
+    def __init__(self, body: bytes, headers: list, etag: str, last_modified: float, expires_at: Optional[float]):
+        self.body = body
+        self.headers = headers
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    def fresh(self) -> bool:
+        return self.expires_at is None or self.expires_at > time.monotonic()
+
+
+class ResponseMemo:
+    """
+    LRU of rendered GET responses, keyed by path and normalised query string.
+    A hit answers the request without touching the database or serialising.
+    """
+    def __init__(self, max_entries: int = RESPONSE_MEMO_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Memo]" = OrderedDict()
+        self.counters = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    def get(self, key: str) -> Optional[_Memo]:
+        memo = self._entries.get(key)
+        if memo is not None and memo.fresh():
+            self._entries.move_to_end(key)
+            return memo
+        if memo is not None:
+            del self._entries[key]
+        return None
+
+    def set(self, key: str, memo: _Memo):
+        self._entries[key] = memo
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def purge(self) -> int:
+        removed = len(self._entries)
+        self._entries.clear()
+        return removed
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, **self.counters}
+
+
+response_memo = ResponseMemo()
+
+
+class ConditionalGetMiddleware:
+    """
+    Adds ETag, Last-Modified and a season-dependent Cache-Control to
+    successful GET responses and answers If-None-Match / If-Modified-Since
+    with 304. Completed seasons of routes marked @season_cacheable are
+    cacheable for a day, everything else for the short result cache TTL.
+    """
+    def __init__(self, app, memo: ResponseMemo = response_memo):
+        self.app = app
+        self.memo = memo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path in PASSTHROUGH_PATHS:
+            await self.app(scope, receive, send)
+            return
+        if path in NO_STORE_PATHS or path.startswith(NO_STORE_PREFIXES):
+            await self.app(scope, receive, self._with_headers(send, [(b"cache-control", b"no-store")]))
+            return
+
+        query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        # re-encoded, so a decoded "&" or "=" cannot pass for a separator
+        key = path + "?" + urlencode(sorted(query))
+        request_headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+
+        memo = self.memo.get(key)
+        if memo is not None:
+            self.memo.counters["hits"] += 1
+            await self._answer(send, request_headers, memo)
+            return
+        self.memo.counters["misses"] += 1
+
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+                # routes opt out per response, e.g. partially failed pages
+                start["passthrough"] = message["status"] != 200 or any(
+                    k.lower() == b"cache-control" and b"no-store" in v for k, v in message.get("headers", [])
+                )
+                if start["passthrough"]:
+                    await send(message)
+                return
+            if start["passthrough"]:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body"):
+                return
+            body = b"".join(chunks)
+            # routing has set the endpoint by now
+            max_age = season_ttl(self._season(query, getattr(scope.get("endpoint"), "season_param", None)))
+            headers = [(k, v) for k, v in start["headers"] if k.lower() not in (b"etag", b"last-modified", b"cache-control")]
+            memo = _Memo(
+                body,
+                headers,
+                make_etag(body),
+                time.time(),
+                None if max_age is None else time.monotonic() + max_age,
+            )
+            self.memo.set(key, memo)
+            await self._answer(send, request_headers, memo)
+
+        await self.app(scope, receive, capture)
+
+    @staticmethod
+    def _season(query: list, param: Optional[str]) -> Optional[int]:
+        value = dict(query).get(param) if param else None
+        return season_of(int(value) if value is not None and value.isdigit() else value)
+
+    async def _answer(self, send, request_headers: dict, memo: _Memo):
+        remaining = None if memo.expires_at is None else max(0, int(memo.expires_at - time.monotonic()))
+        max_age = PAST_SEASON_MAX_AGE if remaining is None else remaining
+        validators = [
+            (b"etag", memo.etag.encode()),
+            (b"last-modified", formatdate(memo.last_modified, usegmt=True).encode()),
+            (b"cache-control", f"public, max-age={max_age}".encode()),
+        ]
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            not_modified = etag_matches(if_none_match, memo.etag)
+        else:
+            if_modified_since = request_headers.get("if-modified-since")
+            not_modified = if_modified_since is not None and not_modified_since(if_modified_since, memo.last_modified)
+
+        if not_modified:
+            self.memo.counters["not_modified"] += 1
+            await send({"type": "http.response.start", "status": 304, "headers": validators})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({"type": "http.response.start", "status": 200, "headers": memo.headers + validators})
+        await send({"type": "http.response.body", "body": memo.body})
+
+    @staticmethod
+    def _with_headers(send, extra: list):
+        async def wrapped(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + extra}
+            await send(message)
+        return wrapped
@@ -0,0 +1,138 @@
+# app/loaders.py
+import asyncio
+import functools
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+from app.dimensions import dimension_store
+from app.batch import BATCH_SCOPE_KEY
+
+
+class DataLoader:
+    """
+    Collects the keys asked for during one event-loop tick and resolves them
+    with a single call to `batch_fn(keys) -> {key: value}`. Every key is
+    loaded at most once per loader, later calls get the memoised result.
+    Missing keys resolve to None.
+    """
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]):
+        self.batch_fn = batch_fn
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        self.batches = 0
+        self.requested = 0
+
+    def load(self, key: Hashable) -> "asyncio.Future":
+        self.requested += 1
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            future.add_done_callback(functools.partial(self._forget_cancelled, key))
+            self._futures[key] = future
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                # two hops: let tasks started in this tick (e.g. by gather)
+                # take their first step and queue their keys too
+                loop.call_soon(loop.call_soon, self._dispatch)
+        # every caller of a key shares the future, a waiter that is cancelled
+        # (a section timeout, a cancelled gather) must not cancel it for the rest
+        return asyncio.shield(future)
+
+    def _forget_cancelled(self, key: Hashable, future: asyncio.Future):
+        # a cancelled lookup is not a result, the next load starts a new one
+        if future.cancelled() and self._futures.get(key) is future:
+            del self._futures[key]
+
+    async def load_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        keys = list(dict.fromkeys(keys))
+        values = await asyncio.gather(*(self.load(key) for key in keys))
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def _dispatch(self):
+        keys, self._queue = self._queue, []
+        if keys:
+            asyncio.ensure_future(self._resolve(keys))
+
+    async def _resolve(self, keys: List[Hashable]):
+        futures = {key: self._futures[key] for key in keys if key in self._futures}
+        if not futures:
+            return
+        self.batches += 1
+        try:
+            found = await self.batch_fn(list(futures))
+        except asyncio.CancelledError:
+            for future in futures.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for key, future in futures.items():
+                # forget failed keys so a later load can retry
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in futures.items():
+            if not future.done():
+                future.set_result(found.get(key))
+
+    def stats(self) -> dict:
+        return {"keys": len(self._futures), "requested": self.requested, "batches": self.batches}
+
+
+class Loaders:
+    """
+    The loaders of one request. Teams, leagues and players go through the
+    dimension store, which answers from memory and fetches whatever it
+    lacks with one IN (...) query. Services can register their own with
+    `get(name, batch_fn)`.
+    """
+    def __init__(self):
+        self.teams = DataLoader(dimension_store.teams)
+        self.leagues = DataLoader(dimension_store.leagues)
+        self.players = DataLoader(dimension_store.players)
+        self._custom: Dict[str, DataLoader] = {}
+
+    def get(self, name: str, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]) -> DataLoader:
+        loader = self._custom.get(name)
+        if loader is None:
+            loader = self._custom[name] = DataLoader(batch_fn)
+        return loader
+
+    def stats(self) -> dict:
+        loaders = {"teams": self.teams, "leagues": self.leagues, "players": self.players, **self._custom}
+        return {name: loader.stats() for name, loader in loaders.items()}
+
+
+_current: ContextVar[Optional[Loaders]] = ContextVar("request_loaders", default=None)
+
+
+def request_loaders() -> Loaders:
+    """
+    Loaders of the current request. Outside a request (scripts, background
+    jobs) a set is created for the current context.
+    """
+    loaders = _current.get()
+    if loaders is None:
+        loaders = Loaders()
+        _current.set(loaders)
+    return loaders
+
+
+class RequestLoadersMiddleware:
+    """
+    Gives every HTTP request a fresh set of loaders. Sub-requests of a
+    /v1/batch call keep the loaders of the batch, so they share lookups.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope.get(BATCH_SCOPE_KEY) and _current.get() is not None):
+            await self.app(scope, receive, send)
+            return
+        token = _current.set(Loaders())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
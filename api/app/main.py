@@ -1,15 +1,53 @@
 #from fastapi import FastAPI, Query, Path, Depends
 #from supabase import create_client, Client
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import teams, leagues, bdor, players, stats, matches
-#from .dependencies import get_supabase_client
+from .routers import teams, leagues, bdor, players, stats, matches, admin, batch, search
+from .dependencies import init_supabase_client, close_supabase_client
+from .cache import shared_cache, CACHE_L2_URL
+from .http_cache import ConditionalGetMiddleware
+from .dimensions import dimension_store
+from .search import player_search_index, suggest_index
+from .transfers import transfer_pool
+from .codec import JSONResponse
+from .loaders import RequestLoadersMiddleware
 import os
 
 load_dotenv() # Load environment variables from .env file
-app = FastAPI() # Initialize FastAPI app
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one pooled Supabase client for the whole process
+    await init_supabase_client()
+    # result cache shared between workers, when CACHE_L2_URL is set
+    shared_cache.configure(CACHE_L2_URL)
+    # teams / leagues / players held in memory, loaded in the background
+    dimension_store.start()
+    # player search index, built in the background
+    player_search_index.start()
+    # typeahead suggestions, rebuilt from the two above
+    suggest_index.start()
+    # transfers drawn by /v1/players/rand-transfer
+    transfer_pool.start()
+    yield
+    await transfer_pool.stop()
+    await suggest_index.stop()
+    await player_search_index.stop()
+    await dimension_store.stop()
+    await shared_cache.close()
+    await close_supabase_client()
+
+
+# responses are encoded with orjson (app/codec.py)
+app = FastAPI(lifespan=lifespan, default_response_class=JSONResponse) # Initialize FastAPI app
+
+# per-request batching loaders for teams / leagues / players
+app.add_middleware(RequestLoadersMiddleware)
+# ETag / 304 handling, inside CORS so short-circuited answers still get CORS headers
+app.add_middleware(ConditionalGetMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -26,7 +64,7 @@ key = os.environ.get("SUPABASE_KEY")
 if not url or not key:
     raise ValueError("SUPABASE_URL or SUPABASE_KEY are not set")
 
-# Initialize Supabase client
+# Supabase client is created once in lifespan()
 
 app.include_router(teams.router)
 app.include_router(leagues.router)
@@ -34,6 +72,9 @@ app.include_router(bdor.router)
 app.include_router(players.router)
 app.include_router(stats.router)
 app.include_router(matches.router)
+app.include_router(admin.router)
+app.include_router(batch.router)
+app.include_router(search.router)
 
 @app.get("/")
 async def read_root():
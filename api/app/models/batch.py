@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# /v1/batch
+class BatchRequest(BaseModel):
+    requests: List[str] = Field(..., min_length=1, description="Relative GET paths with query strings, e.g. /v1/leagues/9/ranks?season=2024")
+    concurrency: Optional[int] = Field(None, ge=1, description="How many paths run at the same time, capped by BATCH_CONCURRENCY")
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List, Optional, Tuple
+
+# /v1/search/suggest, each suggestion is [id, name, logo_url]
+Suggestion = Tuple[int, str, Optional[str]]
+
+class SuggestData(BaseModel):
+    players: List[Suggestion]
+    teams: List[Suggestion]
+    leagues: List[Suggestion]
+
+class SuggestMeta(BaseModel):
+    fuzzy: bool
+    partial: bool
+
+class SuggestResponse(BaseModel):
+    data: SuggestData
+    meta: SuggestMeta
@@ -0,0 +1,81 @@
+# app/pages.py
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+from fastapi import HTTPException
+from pydantic import BaseModel
+from app.dependencies import get_sql_gateway
+
+logger = logging.getLogger(__name__)
+
+# Deadline for each section of a composite page, a slow section is reported
+# as timed out instead of holding back the rest of the page
+PAGE_SECTION_TIMEOUT = float(os.environ.get("PAGE_SECTION_TIMEOUT", "10"))
+
+
+def _unwrap(value: Any) -> Any:
+    """
+    Section payload without the `{"data": ...}` envelope of the single routes.
+    """
+    if isinstance(value, BaseModel):
+        value = value.model_dump()
+    if isinstance(value, dict) and set(value) == {"data"}:
+        return value["data"]
+    return value
+
+
+async def _run_section(name: str, call: Callable[[], Awaitable[Any]], timeout: float) -> tuple:
+    started = time.perf_counter()
+    try:
+        value = await asyncio.wait_for(call(), timeout)
+        if not value:
+            raise HTTPException(status_code=404, detail="Stats not found")
+        outcome = {"status": 200}
+        value = _unwrap(value)
+    except HTTPException as e:
+        value, outcome = None, {"status": e.status_code, "error": e.detail}
+    except asyncio.TimeoutError:
+        value, outcome = None, {"status": 504, "error": "Section timed out"}
+    except Exception:
+        logger.exception("Page section %s failed", name)
+        value, outcome = None, {"status": 500, "error": "Internal Server Error"}
+    outcome["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return value, outcome
+
+
+async def run_sections(sections: Dict[str, Callable[[], Awaitable[Any]]], timeout: float = PAGE_SECTION_TIMEOUT, bundle: bool = True) -> dict:
+    """
+    Run the sections of a composite page concurrently. Each section is
+    reported with its status and timing, a failing section leaves its slot
+    empty without failing the page. Only when every section fails does the
+    page fail, with the first section's error.
+    With `bundle`, queries the sections issue together share one
+    execute_sql round trip.
+    """
+    started = time.perf_counter()
+    if bundle:
+        with get_sql_gateway().bundle():
+            results = await asyncio.gather(*(_run_section(name, call, timeout) for name, call in sections.items()))
+    else:
+        results = await asyncio.gather(*(_run_section(name, call, timeout) for name, call in sections.items()))
+
+    data, meta = {}, {}
+    for name, (value, outcome) in zip(sections, results):
+        data[name] = value
+        meta[name] = outcome
+
+    failed = [name for name, outcome in meta.items() if outcome["status"] != 200]
+    if failed and len(failed) == len(sections):
+        first = meta[failed[0]]
+        raise HTTPException(status_code=first["status"], detail=first["error"])
+
+    return {
+        "data": data,
+        "meta": {
+            "sections": meta,
+            "partial": bool(failed),
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        },
+    }
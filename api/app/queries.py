@@ -0,0 +1,260 @@
+# app/queries.py
+import re
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Optional
+from fastapi import HTTPException
+
+# Postgres types a parameter can be declared with
+_SCALARS = {
+    "bigint": int,
+    "integer": int,
+    "double precision": float,
+    "numeric": float,
+    "text": str,
+    "boolean": bool,
+    "date": date,
+}
+_PLACEHOLDER = re.compile(r"(?<![:\w]):([a-z_][a-z0-9_]*)\b")
+
+
+def _coerce(kind: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if kind.endswith("[]"):
+        return [_coerce(kind[:-2], v) for v in value]
+    python_type = _SCALARS[kind]
+    if python_type is int:
+        if isinstance(value, bool):
+            raise TypeError("expected an integer, got a boolean")
+        return int(value)
+    if python_type is float:
+        return float(value)
+    if python_type is bool:
+        return bool(value)
+    if python_type is date:
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return date.fromisoformat(str(value))
+    return str(value)
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_json_value(v) for v in value]
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def quote_literal(value: Any, kind: str) -> str:
+    """
+    `value` as a SQL literal of type `kind`. Only used when the database
+    can't bind parameters itself; values have already been coerced to the
+    declared type, strings are quoted with standard_conforming_strings rules.
+    """
+    if value is None:
+        return f"NULL::{kind}"
+    if kind.endswith("[]"):
+        return f"ARRAY[{', '.join(quote_literal(v, kind[:-2]) for v in value)}]::{kind}"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    text = str(value.isoformat() if isinstance(value, date) else value)
+    if "\x00" in text:
+        raise ValueError("NUL characters are not allowed in SQL parameters")
+    return "'" + text.replace("'", "''") + f"'::{kind}"
+
+
+def like_pattern(text: str) -> str:
+    """
+    `text` with LIKE wildcards escaped, for `ILIKE '%' || :param || '%'`.
+    """
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class QueryTemplate:
+    """
+    A named query with `:param` placeholders. Parameters are declared with
+    their Postgres type, e.g. `team_id="bigint"`, and travel separately from
+    the SQL text so every call of a template sends the same statement.
+    A parameter declared with a tuple of choices is an identifier (a sort
+    column, a direction, a filter), checked against the choices and written
+    into the text before the values, so a choice may hold placeholders of
+    its own. Each choice gives one more stable variant.
+    A template can name the server-side function that holds the same
+    query (see migrations/), its arguments are the parameters prefixed
+    with `p_`, in declaration order.
+    """
+    def __init__(self, name: str, sql: str, params: Dict[str, Any], function: Optional[str] = None):
+        self.name = name
+        self.sql = sql
+        self.params = params
+        self.function = function
+        self.calls = 0
+        used = set(_PLACEHOLDER.findall(sql))
+        for kind in params.values():
+            if isinstance(kind, tuple):
+                used.update(name for choice in kind for name in _PLACEHOLDER.findall(choice))
+        unknown = [p for p in params if p not in used]
+        if unknown:
+            raise ValueError(f"{name}: declared parameters not in the query: {', '.join(unknown)}")
+        for kind in params.values():
+            if not isinstance(kind, tuple) and kind.rstrip("[]") not in _SCALARS:
+                raise ValueError(f"{name}: unsupported parameter type {kind!r}")
+            if function and isinstance(kind, tuple):
+                raise ValueError(f"{name}: identifier parameters can't be passed to {function}")
+        self._variants: Dict[tuple, str] = {}
+
+    def expand(self, idents: tuple) -> str:
+        """
+        The SQL with the chosen identifiers written in.
+        """
+        if not idents:
+            return self.sql
+        chosen = dict(idents)
+        return _PLACEHOLDER.sub(lambda m: chosen.get(m.group(1), m.group(0)), self.sql)
+
+    def _compile(self, idents: tuple) -> str:
+        """
+        SQL text for one choice of identifiers, values read from the $1 jsonb.
+        """
+        sql = self._variants.get(idents)
+        if sql is None:
+            def replace(match):
+                name = match.group(1)
+                kind = self.params.get(name)
+                if kind is None:
+                    return match.group(0)
+                if kind.endswith("[]"):
+                    return f"(ARRAY(SELECT jsonb_array_elements_text($1->'{name}'))::{kind})"
+                return f"(($1->>'{name}')::{kind})"
+
+            sql = self._variants[idents] = _PLACEHOLDER.sub(replace, self.expand(idents))
+        return sql
+
+    def bind(self, **values) -> "BoundQuery":
+        missing = [name for name in self.params if name not in values]
+        extra = [name for name in values if name not in self.params]
+        if missing or extra:
+            raise TypeError(f"{self.name}: missing {missing}, unexpected {extra}")
+        params, idents = {}, []
+        for name, kind in self.params.items():
+            value = values[name]
+            if isinstance(kind, tuple):
+                if value not in kind:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Invalid {name} field. Must be one of: {', '.join(kind)}"
+                    )
+                idents.append((name, value))
+            else:
+                params[name] = _coerce(kind, value)
+        self.calls += 1
+        return BoundQuery(self, tuple(idents), params)
+
+    def stats(self) -> dict:
+        return {
+            "function": self.function,
+            "params": {name: kind if isinstance(kind, str) else list(kind) for name, kind in self.params.items()},
+            "variants": len(self._variants),
+            "calls": self.calls,
+        }
+
+
+class BoundQuery:
+    """
+    A template with its values, what the gateway executes.
+    """
+    __slots__ = ("template", "idents", "values", "_key")
+
+    def __init__(self, template: QueryTemplate, idents: tuple, values: Dict[str, Any]):
+        self.template = template
+        self.idents = idents
+        self.values = values
+        self._key: Optional[str] = None
+
+    @property
+    def sql(self) -> str:
+        return self.template._compile(self.idents)
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return {name: _json_value(value) for name, value in self.values.items()}
+
+    @property
+    def key(self) -> str:
+        """
+        Identity of the call, used to share identical reads in flight.
+        """
+        if self._key is None:
+            self._key = json.dumps([self.template.name, self.idents, self.params], sort_keys=True)
+        return self._key
+
+    @property
+    def function_args(self) -> Dict[str, Any]:
+        """
+        Arguments for calling the template's function over RPC.
+        """
+        return {f"p_{name}": value for name, value in self.params.items()}
+
+    @property
+    def call_sql(self) -> str:
+        """
+        SQL calling the template's function with the values read from $1,
+        for execute_sql_params and execute_sql_batch.
+        """
+        params = self.template.params
+        args = ", ".join(
+            f"p_{name} => (($1->>'{name}')::{kind})" if not kind.endswith("[]")
+            else f"p_{name} => (ARRAY(SELECT jsonb_array_elements_text($1->'{name}'))::{kind})"
+            for name, kind in params.items()
+        )
+        return f"SELECT {self.template.function}({args}) as result"
+
+    def inline(self) -> str:
+        """
+        The query with its values written in as literals, for servers
+        without execute_sql_params.
+        """
+        params = self.template.params
+
+        def replace(match):
+            name = match.group(1)
+            kind = params.get(name)
+            if kind is None:
+                return match.group(0)
+            return quote_literal(self.values[name], kind)
+
+        return _PLACEHOLDER.sub(replace, self.template.expand(self.idents))
+
+    def __repr__(self):
+        return f"<BoundQuery {self.template.name} {self.params}>"
+
+
+_registry: Dict[str, QueryTemplate] = {}
+
+
+def sql_template(name: str, sql: str, /, *, function: Optional[str] = None, **params) -> QueryTemplate:
+    """
+    The registered template `name`, registering it on first use. A name
+    always stands for the same SQL, registering different text under a
+    known name is an error.
+    """
+    template = _registry.get(name)
+    if template is None:
+        template = _registry[name] = QueryTemplate(name, sql, params, function)
+    elif template.sql is not sql and template.sql != sql:
+        raise ValueError(f"Query template {name} is already registered with different SQL")
+    return template
+
+
+def templates() -> Iterable[QueryTemplate]:
+    return _registry.values()
+
+
+def template_stats() -> dict:
+    return {template.name: template.stats() for template in sorted(_registry.values(), key=lambda t: t.name)}
@@ -0,0 +1,161 @@
+# app/responses.py
+import os
+import random
+import logging
+import functools
+import inspect
+from typing import Any, Callable, Dict, Optional, Union, get_args, get_origin
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.exceptions import ResponseValidationError
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from app.codec import ENGINE, dumps
+
+logger = logging.getLogger(__name__)
+
+# Send the JSON the database built as it is instead of validating and
+# re-serialising it through the route's response_model
+RESPONSE_PASSTHROUGH = os.environ.get("RESPONSE_PASSTHROUGH", "1") == "1"
+# Share of passed-through responses still checked against the response_model,
+# 1 (with STRICT) in tests; with STRICT a mismatch fails the request like
+# FastAPI's own validation, otherwise it is logged and counted
+RESPONSE_VALIDATE_RATE = float(os.environ.get("RESPONSE_VALIDATE_RATE", "0.01"))
+RESPONSE_VALIDATE_STRICT = os.environ.get("RESPONSE_VALIDATE_STRICT", "0") == "1"
+
+counters = {"passthrough": 0, "validated": 0, "invalid": 0}
+
+
+class TrustedJSONResponse(Response):
+    """
+    JSON response for content that is already in its final shape: bytes
+    are sent as they are, anything else is dumped without validation.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+_model_pruners: Dict[type, Callable[[Any], Any]] = {}
+
+
+def _pruner(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """
+    Function cutting a payload down to the keys `annotation` declares, or
+    None when it declares no model. Values of an unexpected type are left
+    as they are, so are unions of more than one model.
+    """
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _model_pruner(annotation)
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is Union:
+        pruners = [p for p in map(_pruner, args) if p is not None]
+        return pruners[0] if len(pruners) == 1 else None
+    if origin in (list, set, frozenset) and args:
+        item = _pruner(args[0])
+        if item is not None:
+            return lambda value: [item(v) for v in value] if isinstance(value, list) else value
+    elif origin is dict and len(args) == 2:
+        item = _pruner(args[1])
+        if item is not None:
+            return lambda value: {k: item(v) for k, v in value.items()} if isinstance(value, dict) else value
+    return None
+
+
+def _model_pruner(model: type) -> Callable[[Any], Any]:
+    """
+    Keeps the fields of `model` and fills in missing ones that have a
+    default, the key set `model_dump()` would send.
+    """
+    pruner = _model_pruners.get(model)
+    if pruner is not None:
+        return pruner
+    fields = []
+
+    def prune(value: Any) -> Any:
+        if not isinstance(value, dict):
+            return value
+        pruned = {}
+        for key, item, field in fields:
+            if key in value:
+                pruned[key] = value[key] if item is None else item(value[key])
+            elif not field.is_required():
+                pruned[key] = field.get_default(call_default_factory=True)
+        return pruned
+
+    # registered before its fields are compiled, for models that nest themselves
+    _model_pruners[model] = prune
+    for name, field in model.model_fields.items():
+        fields.append((field.alias or name, _pruner(field.annotation), field))
+    return prune
+
+
+def _check(adapter: TypeAdapter, content: Any, name: str):
+    counters["validated"] += 1
+    try:
+        adapter.validate_python(content)
+    except ValidationError as e:
+        counters["invalid"] += 1
+        logger.error("Response of %s does not match its response_model: %s", name, e)
+        if RESPONSE_VALIDATE_STRICT:
+            raise ResponseValidationError(errors=e.errors(include_url=False), body=content)
+
+
+def _trusted(endpoint: Callable, response_model: Any) -> Callable:
+    adapter = TypeAdapter(response_model)
+    prune = _pruner(response_model)
+    name = endpoint.__qualname__
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        content = await endpoint(*args, **kwargs)
+        if not isinstance(content, (dict, list)):
+            # models and responses go the usual way
+            return content
+        if prune is not None:
+            # raw columns the query selected beyond the model stay private
+            content = prune(content)
+        if RESPONSE_VALIDATE_RATE and random.random() < RESPONSE_VALIDATE_RATE:
+            _check(adapter, content, name)
+        counters["passthrough"] += 1
+        response = TrustedJSONResponse(content)
+        for value in kwargs.values():
+            if isinstance(value, Response):
+                # headers and status the route set on its `response` parameter
+                response.headers.raw.extend(value.headers.raw)
+                if value.status_code:
+                    response.status_code = value.status_code
+        return response
+
+    return wrapper
+
+
+class PassthroughRoute(APIRoute):
+    """
+    Route class for routers whose services return the JSON documents built
+    by the database. A dict or list returned by the endpoint is cut down to
+    the response_model's fields, missing ones with a default filled in, and
+    sent without validating or coercing the values; the response_model
+    still documents the route and is checked for RESPONSE_VALIDATE_RATE of
+    the responses.
+    """
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        response_model = kwargs.get("response_model")
+        if isinstance(response_model, DefaultPlaceholder):
+            response_model = response_model.value
+        if RESPONSE_PASSTHROUGH and response_model is not None and inspect.iscoroutinefunction(endpoint):
+            endpoint = _trusted(endpoint, response_model)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def stats() -> dict:
+    return {
+        "passthrough": RESPONSE_PASSTHROUGH,
+        "validate_rate": RESPONSE_VALIDATE_RATE,
+        "strict": RESPONSE_VALIDATE_STRICT,
+        "codec": ENGINE,
+        **counters,
+    }
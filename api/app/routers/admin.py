@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from ..dependencies import get_pool_stats, get_supabase_client, get_sql_gateway, require_admin_token
+from ..cache import result_cache, shared_cache
+from ..http_cache import response_memo
+from ..dimensions import dimension_store
+from ..search import player_search_index, suggest_index
+from ..transfers import transfer_pool
+from .. import responses
+from ..queries import template_stats
+
+router = APIRouter(
+    prefix="/v1/admin",
+    tags=["admin"],
+    responses={404: {"description": "Not found"}},
+)
+
+# GET utilisation of the shared Supabase connection pool
+@router.get("/pool")
+async def get_pool():
+    return {"data": get_pool_stats()}
+
+# GET execute_sql gateway counters and circuit breaker state
+@router.get("/gateway", dependencies=[Depends(get_supabase_client)])
+async def get_gateway():
+    return {"data": get_sql_gateway().stats()}
+
+# GET query templates used so far, with their parameters and call counts
+@router.get("/queries")
+async def get_query_templates():
+    return {"data": template_stats()}
+
+# GET result cache size and hit/miss counters per endpoint
+@router.get("/cache")
+async def get_cache_stats():
+    return {"data": {**result_cache.stats(), "shared": shared_cache.stats(), "responses": response_memo.stats()}}
+
+# DELETE cached results, all of them or one endpoint's (e.g. LeagueService.get_league_ranks)
+@router.delete("/cache", dependencies=[Depends(require_admin_token)])
+async def purge_cache(endpoint: Optional[str] = Query(None, description="Service method to purge")):
+    removed = result_cache.purge(endpoint)
+    shared_removed = await shared_cache.purge(endpoint) if shared_cache.enabled else 0
+    # rendered responses are not tracked per endpoint, drop them all
+    response_memo.purge()
+    return {"data": {"removed": removed, "shared_removed": shared_removed}}
+
+
+# GET sizes and hit/miss counters of the in-memory teams/leagues/players store
+@router.get("/dimensions")
+async def get_dimensions():
+    return {"data": dimension_store.stats()}
+
+# GET size and counters of the in-memory player search index and suggestions
+@router.get("/search")
+async def get_search_index():
+    return {"data": {**player_search_index.stats(), "suggest": suggest_index.stats()}}
+
+# GET size and counters of the random transfer pool
+@router.get("/transfers")
+async def get_transfer_pool():
+    return {"data": transfer_pool.stats()}
+
+# GET passthrough response counters (sent unvalidated, sampled, mismatched)
+@router.get("/responses")
+async def get_response_stats():
+    return {"data": responses.stats()}
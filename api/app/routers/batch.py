@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from ..models.batch import BatchRequest
+from ..batch import run_batch, BATCH_MAX_REQUESTS, BATCH_CONCURRENCY
+
+router = APIRouter(
+    prefix="/v1/batch",
+    tags=["batch"],
+    responses={404: {"description": "Not found"}},
+)
+
+# POST several GET paths, answered together in one body
+@router.post("")
+async def post_batch(body: BatchRequest, request: Request, response: Response):
+    """
+    Run up to BATCH_MAX_REQUESTS relative GET paths through the API in one
+    call. `data` holds each path's status and body in request order, a
+    failing path does not fail the batch.
+    """
+    if len(body.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_REQUESTS} requests per batch")
+    response.headers["Cache-Control"] = "no-store"
+    return await run_batch(request.app, request.scope, body.requests, concurrency=body.concurrency or BATCH_CONCURRENCY)
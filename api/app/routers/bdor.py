@@ -1,18 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends
-from supabase import Client
+from supabase import AsyncClient
+from ..responses import PassthroughRoute
 from ..dependencies import get_supabase_client
 
 router = APIRouter(
     prefix="/v1/bdor",
     tags=["bdor"],
+    route_class=PassthroughRoute,
     dependencies=[Depends(get_supabase_client)],
     responses={404: {"description": "Not found"}},
 )
 
 @router.get("/{year}")
-async def get_rankings(year: int, supabase: Client = Depends(get_supabase_client)):
+async def get_rankings(year: int, supabase: AsyncClient = Depends(get_supabase_client)):
     try:
-        response = supabase.rpc("get_ballon_dor_with_logos", {"input_year": year}).execute()
+        response = await supabase.rpc("get_ballon_dor_with_logos", {"input_year": year}).execute()
 
         if response.data:
             return {"data": response.data}
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
-from supabase import Client
+from supabase import AsyncClient
+from ..responses import PassthroughRoute
 from ..dependencies import get_supabase_client
 from ..classes.match import MatchService
 from app.models.response import MatchInfoResponse
@@ -9,16 +10,17 @@ import pytz, requests, random
 router = APIRouter(
     prefix="/v1/matches",
     tags=["matches"],
+    route_class=PassthroughRoute,
     #dependencies=[Depends(get_supabase_client)],
     responses={404: {"description": "Not found"}},
 )
 
 # GET Match Information
 @router.get("/{match_id}", response_model=MatchInfoResponse)
-async def get_match_data(match_id: int, supabase: Client = Depends(get_supabase_client)):
+async def get_match_data(match_id: int, supabase: AsyncClient = Depends(get_supabase_client)):
     try:
         service = MatchService(supabase)
-        stats = service.get_match_data(match_id=match_id)
+        stats = await service.get_match_data(match_id=match_id)
 
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
@@ -1,6 +1,7 @@
 from datetime import date, timedelta, datetime
-from fastapi import APIRouter, Depends, Query, HTTPException
-from supabase import Client
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from supabase import AsyncClient
 import pytz, random
 from app.models.response import (
     PlayerSeasonStatsResponse,
@@ -12,13 +13,17 @@ from app.models.response import (
     RandomTransferResponse
 )
 from app.constants import GLOBAL_YEAR
+from ..responses import PassthroughRoute
+from ..http_cache import season_cacheable
 from ..dependencies import get_supabase_client
 from ..classes.player import PlayerService
 from ..models.player import PlayerPageDataResponse
+from ..pages import run_sections
 
 router = APIRouter(
     prefix="/v1/players",
     tags=["players"],
+    route_class=PassthroughRoute,
     #dependencies=[Depends(get_supabase_client)],
     responses={404: {"description": "Not found"}},
 )
@@ -27,13 +32,13 @@ router = APIRouter(
 @router.get("/search", response_model=PlayerSearchResponse)
 async def get_season_stats(
     name: str = Query("Frank Lampard", description="Season year"),
-    supabase: Client = Depends(get_supabase_client)):
+    supabase: AsyncClient = Depends(get_supabase_client)):
     """
     search for a player by name
     """
     try:
         service = PlayerService(supabase)
-        stats = service.player_search(player_name=name)
+        stats = await service.player_search(player_name=name)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -42,16 +47,17 @@ async def get_season_stats(
 
 # GET Players stats in all competitions per season
 @router.get("/{player_id}/allstats", response_model=PlayerSeasonStatsResponse)
+@season_cacheable()
 async def get_all_season_stats(
     player_id: int,
     season: int = Query(GLOBAL_YEAR, description="Season year"),
-    supabase: Client = Depends(get_supabase_client)):
+    supabase: AsyncClient = Depends(get_supabase_client)):
     """
     get a certain player's stats in a competition
     """
     try:
         service = PlayerService(supabase)
-        stats = service.get_player_stats_all_seasons(player_id=player_id, season=season)
+        stats = await service.get_player_stats_all_seasons(player_id=player_id, season=season)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -62,13 +68,13 @@ async def get_all_season_stats(
 @router.get("/{player_id}/career", response_model=PlayerSeasonStatsResponse)
 async def get_career_stats(
     player_id: int,
-    supabase: Client = Depends(get_supabase_client)):
+    supabase: AsyncClient = Depends(get_supabase_client)):
     """
     get a certain player's overall career stats
     """
     try:
         service = PlayerService(supabase)
-        stats = service.get_career_stats(player_id=player_id)
+        stats = await service.get_career_stats(player_id=player_id)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -79,13 +85,13 @@ async def get_career_stats(
 @router.get("/{player_id}/career-teams", response_model=PlayerCareerTeamsResponse)
 async def get_player_teams(
     player_id: int,
-    supabase: Client = Depends(get_supabase_client)):
+    supabase: AsyncClient = Depends(get_supabase_client)):
     """
     get a certain player's career team
     """
     try:
         service = PlayerService(supabase)
-        stats = service.get_player_career_teams2(player_id=player_id)
+        stats = await service.get_player_career_teams2(player_id=player_id)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -100,13 +106,13 @@ async def get_player_teams(
 @router.get("/{player_id}/infos", response_model=PlayerPageDataResponse)
 async def get_player_page_data(
     player_id: int,
-    supabase: Client = Depends(get_supabase_client)):
+    supabase: AsyncClient = Depends(get_supabase_client)):
     """
     Get a certain player's BIO info.
     """
     try:
         service = PlayerService(supabase)
-        stats = service.get_player_page_data(player_id=player_id)
+        stats = await service.get_player_page_data(player_id=player_id)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -117,18 +123,45 @@ async def get_player_page_data(
         # Preserve original exception context with 'from e'
         raise HTTPException(status_code=500, detail=str(e)) from e
 
+# GET everything the player page shows in one call: bio, career, career teams,
+# season stats, recent G/A and goal distribution, fetched concurrently
+@router.get("/{player_id}/page")
+async def get_player_page(
+    player_id: int,
+    response: Response,
+    season: int = Query(GLOBAL_YEAR, description="Season year"),
+    supabase: AsyncClient = Depends(get_supabase_client)):
+    """
+    Composite player page. Sections that fail are null in `data` and
+    described in `meta.sections`.
+    """
+    service = PlayerService(supabase)
+    page = await run_sections({
+        "infos": lambda: service.get_player_page_data(player_id=player_id),
+        "career": lambda: service.get_career_stats(player_id=player_id),
+        "career_teams": lambda: service.get_player_career_teams2(player_id=player_id),
+        "allstats": lambda: service.get_player_stats_all_seasons(player_id=player_id, season=season),
+        "recent_ga": lambda: service.get_recent_ga(player_id=player_id),
+        "goal_dist": lambda: service.get_player_goal_distribution(player_id=player_id, season=season),
+    })
+    if page["meta"]["partial"]:
+        response.headers["Cache-Control"] = "no-store"
+    return page
+
 # GET a random player transfer
 @router.get("/rand-transfer", response_model=RandomTransferResponse)
 async def get_random_player_transfer(
     start_date: date = Query("2022-08-01", description="Start date in YYYY-MM-DD format"),
     end_date: date = Query("2025-09-01", description="End date in YYYY-MM-DD format"),
-    supabase: Client = Depends(get_supabase_client)):
+    seed: Optional[int] = Query(None, description="Same seed and dates, same transfer"),
+    session: Optional[str] = Query(None, max_length=64, description="Client-chosen id, no transfer repeats for it until all in the window were drawn"),
+    supabase: AsyncClient = Depends(get_supabase_client)):
     """
     Get a random transfer
     """
     try:
         service = PlayerService(supabase)
-        stats = service.get_random_transfer(start_date=start_date, end_date=end_date)
+        stats = await service.get_random_transfer(start_date=start_date, end_date=end_date, seed=seed, session=session)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -141,10 +174,11 @@ async def get_random_player_transfer(
 
 # GET breakdown (teams+pens) of G/A for a season or by date range
 @router.get("/{player_id}/goal-dist", response_model=PlayerGADistResponse)
-async def get_player_goal_dist(player_id: int, season: int = Query(GLOBAL_YEAR, description="Season year"), supabase: Client = Depends(get_supabase_client)):
+@season_cacheable()
+async def get_player_goal_dist(player_id: int, season: int = Query(GLOBAL_YEAR, description="Season year"), supabase: AsyncClient = Depends(get_supabase_client)):
     try:
         service = PlayerService(supabase)
-        stats = service.get_player_goal_distribution(player_id=player_id, season=season)
+        stats = await service.get_player_goal_distribution(player_id=player_id, season=season)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -153,7 +187,8 @@ async def get_player_goal_dist(player_id: int, season: int = Query(GLOBAL_YEAR,
     
 # GET breakdown (teams+pens) of G/A for a season or by date range
 @router.get("/{player_id}/goal-dist-bydate", response_model=PlayerGADistResponse)
-async def get_player_goal_dist_bydate(player_id: int, start_date: date = Query("2024-08-01", description="Start date in YYYY-MM-DD format"), end_date: date = Query("2025-07-01", description="End date in YYYY-MM-DD format"), supabase: Client = Depends(get_supabase_client)):
+@season_cacheable("end_date")
+async def get_player_goal_dist_bydate(player_id: int, start_date: date = Query("2024-08-01", description="Start date in YYYY-MM-DD format"), end_date: date = Query("2025-07-01", description="End date in YYYY-MM-DD format"), supabase: AsyncClient = Depends(get_supabase_client)):
     try:
         if start_date > end_date:
             raise HTTPException(status_code=400, detail="Start date must be before end date")
@@ -162,7 +197,7 @@ async def get_player_goal_dist_bydate(player_id: int, start_date: date = Query("
         end_date_str = end_date.isoformat()
         
         service = PlayerService(supabase)
-        stats = service.get_player_goal_dist_bydate(player_id=player_id, start_date=start_date_str, end_date=end_date_str)
+        stats = await service.get_player_goal_dist_bydate(player_id=player_id, start_date=start_date_str, end_date=end_date_str)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -172,10 +207,11 @@ async def get_player_goal_dist_bydate(player_id: int, start_date: date = Query("
 
 # GET list of all the games per season they were in xi or bench + match stats
 @router.get("/{player_id}/matches", response_model=PlayerMatchesResponse)
-async def get_player_match_statistics(player_id: int, season: int = Query(GLOBAL_YEAR, description="Season year"), supabase: Client = Depends(get_supabase_client)):
+@season_cacheable()
+async def get_player_match_statistics(player_id: int, season: int = Query(GLOBAL_YEAR, description="Season year"), supabase: AsyncClient = Depends(get_supabase_client)):
     try:
         service = PlayerService(supabase)
-        stats = service.get_matches_by_season(player_id=player_id, season=season)
+        stats = await service.get_matches_by_season(player_id=player_id, season=season)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -184,7 +220,8 @@ async def get_player_match_statistics(player_id: int, season: int = Query(GLOBAL
 
 # GET list of games by date range
 @router.get("/{player_id}/matches-bydate", response_model=PlayerMatchesResponse)
-def get_matches_dates(player_id: int, start_date: date = Query("2024-11-01", description="Start date in YYYY-MM-DD format"), end_date: date = Query("2025-03-01", description="End date in YYYY-MM-DD format"), supabase: Client = Depends(get_supabase_client)):
+@season_cacheable("end_date")
+async def get_matches_dates(player_id: int, start_date: date = Query("2024-11-01", description="Start date in YYYY-MM-DD format"), end_date: date = Query("2025-03-01", description="End date in YYYY-MM-DD format"), supabase: AsyncClient = Depends(get_supabase_client)):
     # Validate date range
     if start_date > end_date:
         raise HTTPException(status_code=400, detail="Start date must be before end date")
@@ -193,17 +230,17 @@ def get_matches_dates(player_id: int, start_date: date = Query("2024-11-01", des
     end_date_str = end_date.isoformat()
 
     service = PlayerService(supabase)
-    stats = service.get_matches_by_dates(player_id=player_id, start_date=start_date_str, end_date=end_date_str)
+    stats = await service.get_matches_by_dates(player_id=player_id, start_date=start_date_str, end_date=end_date_str)
     if not stats:
         raise HTTPException(status_code=404, detail="Stats not found")
     return stats
 
 # GET details of the last game where the player had a g/a
 @router.get("/{player_id}/recent-ga", response_model=PlayerRecentGAResponse)
-async def get_player_recent_ga(player_id: int, supabase: Client = Depends(get_supabase_client)):
+async def get_player_recent_ga(player_id: int, supabase: AsyncClient = Depends(get_supabase_client)):
     try:
         service = PlayerService(supabase)
-        stats = service.get_recent_ga(player_id=player_id)
+        stats = await service.get_recent_ga(player_id=player_id)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -212,10 +249,11 @@ async def get_player_recent_ga(player_id: int, supabase: Client = Depends(get_su
 
 # GET details of the last game where the player had a g/a
 @router.get("/{player_id}/recent-ga-bydate", response_model=PlayerRecentGAResponse)
-async def get_player_recent_ga_by_date(player_id: int, start_date: date = Query("2025-01-01", description="Start date in YYYY-MM-DD format"), end_date: date = Query("2025-07-01", description="End date in YYYY-MM-DD format"), supabase: Client = Depends(get_supabase_client)):
+@season_cacheable("end_date")
+async def get_player_recent_ga_by_date(player_id: int, start_date: date = Query("2025-01-01", description="Start date in YYYY-MM-DD format"), end_date: date = Query("2025-07-01", description="End date in YYYY-MM-DD format"), supabase: AsyncClient = Depends(get_supabase_client)):
     try:
         service = PlayerService(supabase)
-        stats = service.get_recent_apps_bydate(player_id=player_id, start_date=start_date, end_date=end_date)
+        stats = await service.get_recent_apps_bydate(player_id=player_id, start_date=start_date, end_date=end_date)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -224,10 +262,10 @@ async def get_player_recent_ga_by_date(player_id: int, start_date: date = Query(
     
 
 @router.get("/{player_id}/ga/{opp_team_id}", response_model=PlayerRecentGAResponse)
-async def get_player_recent_ga_by_opp(player_id: int, opp_team_id: int, supabase: Client = Depends(get_supabase_client)):
+async def get_player_recent_ga_by_opp(player_id: int, opp_team_id: int, supabase: AsyncClient = Depends(get_supabase_client)):
     try:
         service = PlayerService(supabase)
-        stats = service.get_recent_ga_against_team(player_id=player_id, opp_team_id=opp_team_id)
+        stats = await service.get_recent_ga_against_team(player_id=player_id, opp_team_id=opp_team_id)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -235,10 +273,10 @@ async def get_player_recent_ga_by_opp(player_id: int, opp_team_id: int, supabase
         raise HTTPException(status_code=500, detail=str(e))
     
 @router.get("/{player_id}/apps/{opp_team_id}", response_model=PlayerRecentGAResponse)
-async def get_player_apps_against_team(player_id: int, opp_team_id: int, supabase: Client = Depends(get_supabase_client)):
+async def get_player_apps_against_team(player_id: int, opp_team_id: int, supabase: AsyncClient = Depends(get_supabase_client)):
     try:
         service = PlayerService(supabase)
-        stats = service.get_recent_apps_against_team(player_id=player_id, opp_team_id=opp_team_id)
+        stats = await service.get_recent_apps_against_team(player_id=player_id, opp_team_id=opp_team_id)
         if not stats:
             raise HTTPException(status_code=404, detail="Stats not found")
         return stats
@@ -280,7 +318,7 @@ async def get_player_instagram_stats(
     player_id: int,
     start_date: str = Query(default_factory=get_yesterday_toronto_date, 
                           description="Start date in YYYY-MM-DD format (defaults to yesterday)"),
-    supabase: Client = Depends(get_supabase_client)
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     try:
         # Parse the input date (YYYY-MM-DD) and set to start of day in Toronto time
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Query, Response
+from ..responses import PassthroughRoute
+from ..models.search import SuggestResponse
+from ..search import suggest_index, SUGGEST_MAX_LIMIT, SUGGEST_MAX_AGE
+
+router = APIRouter(
+    prefix="/v1/search",
+    tags=["search"],
+    route_class=PassthroughRoute,
+    responses={404: {"description": "Not found"}},
+)
+
+# GET typeahead suggestions across players, teams and leagues
+@router.get("/suggest", response_model=SuggestResponse)
+async def get_suggestions(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=64, description="What has been typed so far"),
+    limit: int = Query(5, ge=1, le=SUGGEST_MAX_LIMIT, description="Suggestions per type")):
+    """
+    players, teams and leagues whose names have words starting with the
+    words of `q`, as [id, name, logo_url], best first
+    """
+    suggestions = suggest_index.suggest(q, limit)
+    # answers are cached in the index, let browsers keep them briefly too
+    response.headers["Cache-Control"] = "no-store" if suggestions["meta"]["partial"] else f"public, max-age={SUGGEST_MAX_AGE}"
+    return suggestions
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
-from supabase import Client
+from supabase import AsyncClient
 from datetime import date
+from ..responses import PassthroughRoute
+from ..http_cache import season_cacheable
 from ..dependencies import get_supabase_client
 from ..classes.stat import StatsRanking, StatsService, LeagueStats, TeamMatches, TeamMatchesResponse
 from app.models.response import H2HResponse
@@ -10,19 +12,21 @@ import requests, random
 router = APIRouter(
     prefix="/v1/stats",
     tags=["stats"],
+    route_class=PassthroughRoute,
     #dependencies=[Depends(get_supabase_client)],
     responses={404: {"description": "Not found"}},
 )
 
 # h2h
 @router.get("/h2h", response_model=H2HResponse)
-def get_h2h(team1_id: int = Query(7761, description="team1"), team2_id: int = Query(5860, description="team2"), num_matches: int = Query(5, description="number of matches"), start_date: date = Query("2005-07-01", description="Start date in YYYY-MM-DD format"), end_date: date = Query("2025-08-01", description="End date in YYYY-MM-DD format"), supabase: Client = Depends(get_supabase_client)):
+@season_cacheable("end_date")
+async def get_h2h(team1_id: int = Query(7761, description="team1"), team2_id: int = Query(5860, description="team2"), num_matches: int = Query(5, description="number of matches"), start_date: date = Query("2005-07-01", description="Start date in YYYY-MM-DD format"), end_date: date = Query("2025-08-01", description="End date in YYYY-MM-DD format"), supabase: AsyncClient = Depends(get_supabase_client)):
     if start_date > end_date:
         raise HTTPException(status_code=400, detail="Start date must be before end date")
     start_date_str = start_date.isoformat()
     end_date_str = end_date.isoformat()
     service = StatsService(supabase)
-    stats = service.get_teams_h2h(team1_id=team1_id, team2_id=team2_id, num_matches=num_matches, start_date=start_date_str, end_date=end_date_str)
+    stats = await service.get_teams_h2h(team1_id=team1_id, team2_id=team2_id, num_matches=num_matches, start_date=start_date_str, end_date=end_date_str)
     if not stats:
         raise HTTPException(status_code=404, detail="Stats not found")
 
@@ -32,9 +36,9 @@ def get_h2h(team1_id: int = Query(7761, description="team1"), team2_id: int = Qu
 
 
 @router.get("/noloss", response_model=List[LeagueStats])
-def get_bio2(supabase: Client = Depends(get_supabase_client)):
+async def get_bio2(supabase: AsyncClient = Depends(get_supabase_client)):
     service = StatsService(supabase)
-    stats = service.get_no_losses()
+    stats = await service.get_no_losses()
 
     if not stats:
         raise HTTPException(status_code=404, detail="Stats not found")
@@ -43,9 +47,9 @@ def get_bio2(supabase: Client = Depends(get_supabase_client)):
 
 
 @router.get("/worst", response_model=List[LeagueStats])
-def get_bio_2(supabase: Client = Depends(get_supabase_client)):
+async def get_bio_2(supabase: AsyncClient = Depends(get_supabase_client)):
     service = StatsService(supabase)
-    stats = service.get_worst_winners()
+    stats = await service.get_worst_winners()
 
     if not stats:
         raise HTTPException(status_code=404, detail="Stats not found")
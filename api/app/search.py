@@ -0,0 +1,563 @@
+# app/search.py
+import os
+import time
+import heapq
+import asyncio
+import logging
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict
+from itertools import chain
+from typing import Callable, Dict, List, Optional, Tuple
+from app.dependencies import get_sql_gateway
+from app.dimensions import dimension_store
+from app.queries import sql_template
+
+logger = logging.getLogger(__name__)
+
+# Answer /v1/players/search from memory; with 0 (or until the first load
+# completes) searches go to the database
+PLAYER_SEARCH_INDEX = os.environ.get("PLAYER_SEARCH_INDEX", "1") == "1"
+# New players are picked up every PLAYER_SEARCH_REFRESH seconds. players has
+# no updated timestamp to follow, so edits to existing ones (name, market
+# value, club, retirement) only show after the next full reload, up to
+# PLAYER_SEARCH_FULL_RELOAD seconds later
+PLAYER_SEARCH_REFRESH = float(os.environ.get("PLAYER_SEARCH_REFRESH", "300"))
+PLAYER_SEARCH_FULL_RELOAD = float(os.environ.get("PLAYER_SEARCH_FULL_RELOAD", "3600"))
+# Players added since the last build are scanned linearly, past this many
+# the index is rebuilt
+PLAYER_SEARCH_MAX_DELTA = int(os.environ.get("PLAYER_SEARCH_MAX_DELTA", "2000"))
+
+# /v1/search/suggest: time one lookup may take before it answers with what
+# it has, the most suggestions per type, and how many answers are kept
+SUGGEST_BUDGET_MS = float(os.environ.get("SUGGEST_BUDGET_MS", "15"))
+SUGGEST_MAX_LIMIT = int(os.environ.get("SUGGEST_MAX_LIMIT", "10"))
+SUGGEST_CACHE_SIZE = int(os.environ.get("SUGGEST_CACHE_SIZE", "4096"))
+# how often the suggestions are rebuilt when players, teams or leagues changed
+SUGGEST_REFRESH = float(os.environ.get("SUGGEST_REFRESH", "60"))
+# Cache-Control max-age of complete answers
+SUGGEST_MAX_AGE = int(os.environ.get("SUGGEST_MAX_AGE", "300"))
+
+# players columns kept per player, in the order the load query returns them
+PLAYER_COLUMNS = (
+    "player_id", "player_name", "full_name", "player_slug", "pic_url", "isRetired",
+    "curr_team_id", "curr_number", "onLoan", "instagram", "parent_team_id", "position",
+    "dob", "age", "pob", "nation1", "nation2", "nation1_id", "nation2_id", "market_value",
+    "height", "foot", "date_joined", "contract_end", "last_extension", "parent_club_exp", "noClub",
+)
+
+# letters NFKD doesn't take apart
+_FOLD = str.maketrans({"ø": "o", "ł": "l", "đ": "d", "ð": "d", "þ": "th", "æ": "ae", "œ": "oe", "ı": "i", "ß": "ss"})
+
+
+def fold(text: Optional[str]) -> str:
+    """
+    Lower case without accents: "Ødegaard" and "odegaard" fold alike.
+    """
+    if not text:
+        return ""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text.casefold().translate(_FOLD))
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _haystack(row: dict) -> str:
+    # full_name often repeats player_name, fold each distinct name once
+    return fold(" ".join(dict.fromkeys(row[col] for col in ("player_name", "full_name", "player_slug") if row.get(col))))
+
+
+def _matches(query: str, haystack: str) -> bool:
+    if len(query) >= 3:
+        return query in haystack
+    return any(word.startswith(query) for word in haystack.split())
+
+
+def _trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def rank_key(row: dict) -> tuple:
+    """
+    The database's ordering of search results: active players first, then
+    market value (descending, unknown first like Postgres' DESC), then name.
+    """
+    retired = row.get("isRetired")
+    value = row.get("market_value")
+    return (
+        2 if retired is None else int(bool(retired)),
+        (0, 0) if value is None else (1, -value),
+        row.get("player_name") or "",
+    )
+
+
+class _Index:
+    """
+    One immutable build: rows in rank order, so a row's position is its
+    rank, and postings of trigrams and of one and two letter word starts
+    listing positions in ascending order.
+    """
+    def __init__(self, rows: List[dict]):
+        self.rows = sorted(rows, key=rank_key)
+        self.haystacks = [_haystack(row) for row in self.rows]
+        postings: Dict[str, array] = defaultdict(lambda: array("i"))
+        prefixes: Dict[str, array] = defaultdict(lambda: array("i"))
+        for position, haystack in enumerate(self.haystacks):
+            for gram in _trigrams(haystack):
+                postings[gram].append(position)
+            # word starts, for queries shorter than a trigram
+            words = haystack.split()
+            for prefix in {word[:1] for word in words} | {word[:2] for word in words}:
+                prefixes[prefix].append(position)
+        self.postings = dict(postings)
+        self.prefixes = dict(prefixes)
+
+    def search(self, query: str, limit: int) -> List[dict]:
+        if len(query) >= 3:
+            grams = _trigrams(query)
+            lists = [self.postings.get(gram) for gram in grams]
+            if any(posting is None for posting in lists):
+                return []
+            # walk the shortest posting in rank order, stop at `limit` hits
+            found = []
+            for position in min(lists, key=len):
+                if query in self.haystacks[position]:
+                    found.append(self.rows[position])
+                    if len(found) == limit:
+                        break
+            return found
+        posting = self.prefixes.get(query) or ()
+        return [self.rows[position] for position in posting[:limit]]
+
+
+class PlayerSearchIndex:
+    """
+    Player search served from memory. Matches the folded query anywhere in
+    player_name, full_name or player_slug, ranked like the SQL search.
+    Queries under three characters only match the start of a word, where
+    the SQL search matched them anywhere: "ar" finds Arteta, not Ramsdale.
+    Players created after the last build sit in a small delta that is
+    scanned on every search and merged by rank; the index is rebuilt from
+    memory when the delta grows and from the database on full reloads.
+    Refreshes only add players, edits to known ones wait for a full reload.
+    """
+    def __init__(self):
+        self._index: Optional[_Index] = None
+        self._delta: List[dict] = []
+        self._high_water = 0
+        self.loaded_at = 0.0
+        self.refreshed_at = 0.0
+        self.counters = {"searches": 0, "refreshes": 0, "rebuilds": 0, "errors": 0}
+        # called after every build, e.g. by the suggestions built from it
+        self.on_load: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    @property
+    def version(self) -> tuple:
+        """
+        Changes whenever the searchable players change.
+        """
+        return (self.counters["rebuilds"], len(self._delta))
+
+    def rows(self) -> List[dict]:
+        """
+        Every player held, best ranked first.
+        """
+        if self._index is None:
+            return []
+        if not self._delta:
+            return list(self._index.rows)
+        return sorted(self._index.rows + self._delta, key=rank_key)
+
+    async def _fetch(self, after: int) -> List[dict]:
+        query = sql_template("search.players.newer", f"""
+        SELECT json_build_object(
+            'data', COALESCE(
+                (SELECT json_agg(json_build_array({', '.join(f'"{c}"' for c in PLAYER_COLUMNS)})) FROM players WHERE player_id > :after),
+                '[]'::json
+            )
+        ) as result
+        """, after="bigint").bind(after=after)
+        result = await get_sql_gateway().execute(query)
+        return [dict(zip(PLAYER_COLUMNS, row)) for row in (result or {}).get("data") or []]
+
+    async def _build(self, rows: List[dict]):
+        # building takes a moment for large tables, keep the loop responsive
+        index = await asyncio.to_thread(_Index, rows)
+        self._index, self._delta = index, []
+        self._high_water = max((row["player_id"] for row in rows), default=0)
+        self.counters["rebuilds"] += 1
+        for callback in self.on_load:
+            callback()
+
+    async def load(self):
+        """
+        Full reload from the database, replaces the index once built.
+        """
+        await self._build(await self._fetch(0))
+        self.loaded_at = self.refreshed_at = time.time()
+
+    async def refresh(self):
+        """
+        Pick up players added since the last load or refresh.
+        """
+        rows = await self._fetch(self._high_water)
+        if rows:
+            self._high_water = max(self._high_water, max(row["player_id"] for row in rows))
+            self._delta.extend(rows)
+            if len(self._delta) > PLAYER_SEARCH_MAX_DELTA and self._index is not None:
+                await self._build(self._index.rows + self._delta)
+        self.refreshed_at = time.time()
+        self.counters["refreshes"] += 1
+
+    def search(self, text: str, limit: int = 15) -> List[dict]:
+        """
+        Up to `limit` player rows matching `text`, best ranked first.
+        """
+        self.counters["searches"] += 1
+        query = " ".join(fold(text).split())
+        if not query or self._index is None:
+            return []
+        found = self._index.search(query, limit)
+        if self._delta:
+            recent = [row for row in self._delta if _matches(query, _haystack(row))]
+            if recent:
+                found = heapq.nsmallest(limit, found + recent, key=rank_key)
+        return found
+
+    async def _run(self):
+        while True:
+            try:
+                if time.time() - self.loaded_at >= PLAYER_SEARCH_FULL_RELOAD:
+                    await self.load()
+                else:
+                    await self.refresh()
+            except Exception:
+                self.counters["errors"] += 1
+                logger.warning("Player search refresh failed", exc_info=True)
+            await asyncio.sleep(PLAYER_SEARCH_REFRESH)
+
+    def start(self):
+        """
+        Build in the background and keep refreshing. Searches made before
+        the first build completes go to the database.
+        """
+        if PLAYER_SEARCH_INDEX and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        index = self._index
+        return {
+            "enabled": PLAYER_SEARCH_INDEX,
+            "players": len(index.rows) if index else 0,
+            "trigrams": len(index.postings) if index else 0,
+            "delta": len(self._delta),
+            "loaded_at": self.loaded_at,
+            "refreshed_at": self.refreshed_at,
+            **self.counters,
+        }
+
+
+player_search_index = PlayerSearchIndex()
+
+SUGGEST_TYPES = ("players", "teams", "leagues")
+
+
+def prefix_distance(query: str, word: str, limit: int) -> int:
+    """
+    Fewest edits turning `query` into a start of `word`, a swap of
+    neighbours counting as one. Gives up with `limit + 1` once it is
+    certain to exceed `limit`.
+    """
+    word = word[:len(query) + limit]
+    before, row = None, list(range(len(word) + 1))
+    for i, ca in enumerate(query, 1):
+        current = [i]
+        for j, cb in enumerate(word, 1):
+            cost = min(current[j - 1] + 1, row[j] + 1, row[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == word[j - 2] and query[i - 2] == cb and before[j - 2] + 1 < cost:
+                cost = before[j - 2] + 1
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, row = row, current
+    return min(row)
+
+
+class _Suggestions:
+    """
+    One immutable build. Players, teams and leagues become numbered entries,
+    best first within each type, so a lower number is a better suggestion.
+    The distinct name words are kept in a sorted array with the entries
+    containing each word; a prefix is a bisected range of that array.
+    The best entries for every one and two letter prefix, whose ranges are
+    the largest, are worked out up front.
+    """
+    def __init__(self, players: List[dict], teams: list, leagues: list):
+        squad_sizes: Dict[int, int] = defaultdict(int)
+        for row in players:
+            for col in ("curr_team_id", "nation1_id"):
+                if row.get(col) is not None:
+                    squad_sizes[row[col]] += 1
+        # teams with more players in the archive first, leagues by name
+        teams = sorted(teams, key=lambda t: (-squad_sizes.get(t.team_id, 0), len(t.team_name or ""), t.team_name or ""))
+        leagues = sorted(leagues, key=lambda l: (len(l.league_name or ""), l.league_name or ""))
+
+        self.entries: List[tuple] = []
+        self.names: List[str] = []
+        self.bounds: Dict[str, Tuple[int, int]] = {}
+        words: Dict[str, array] = defaultdict(lambda: array("i"))
+        sources = (
+            ("players", ((row["player_id"], row.get("player_name"), row.get("pic_url"), (row.get("player_name"), row.get("full_name"))) for row in players)),
+            ("teams", ((t.team_id, t.team_name, t.logo_url, (t.team_name,)) for t in teams)),
+            ("leagues", ((l.league_id, l.league_name, l.logo_url, (l.league_name,)) for l in leagues)),
+        )
+        for kind, items in sources:
+            start = len(self.entries)
+            for entry_id, name, logo, names in items:
+                if not name:
+                    continue
+                position = len(self.entries)
+                folded = fold(" ".join(dict.fromkeys(n for n in names if n)))
+                self.entries.append((entry_id, name, logo))
+                self.names.append(folded)
+                for word in set(folded.split()):
+                    words[word].append(position)
+            self.bounds[kind] = (start, len(self.entries))
+
+        self.words = sorted(words)
+        self.postings = [words[word] for word in self.words]
+        # trigrams of the words (with a start marker), for typo tolerance
+        grams: Dict[str, array] = defaultdict(lambda: array("i"))
+        for i, word in enumerate(self.words):
+            for gram in _trigrams("^" + word):
+                grams[gram].append(i)
+        self.grams = dict(grams)
+        short = defaultdict(set)
+        for i, word in enumerate(self.words):
+            for prefix in {word[:1], word[:2]}:
+                short[prefix].update(self.postings[i])
+        self.top = {prefix: self.best(found, SUGGEST_MAX_LIMIT) for prefix, found in short.items()}
+
+    def best(self, found, limit: int) -> Dict[str, list]:
+        """
+        The best `limit` entries of each type among the numbers in `found`.
+        """
+        ranked = sorted(found)
+        result = {}
+        for kind, (start, end) in self.bounds.items():
+            first = bisect_left(ranked, start)
+            result[kind] = [p for p in ranked[first:first + limit] if p < end]
+        return result
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + "\uffff")
+        return start, end
+
+    def lookup(self, tokens: List[str], limit: int, deadline: float) -> Tuple[Dict[str, list], bool]:
+        """
+        Entries with a word starting with each token. Returns the best per
+        type and whether the lookup finished within the deadline.
+        """
+        if len(tokens) == 1 and tokens[0] in self.top:
+            return {kind: found[:limit] for kind, found in self.top[tokens[0]].items()}, True
+        # entries under each token's range, intersected smallest first
+        ranges = sorted((self._range(token) for token in tokens), key=lambda r: r[1] - r[0])
+        found = None
+        complete = True
+        for start, end in ranges:
+            matched = set()
+            for i in range(start, end):
+                if i % 256 == 0 and time.perf_counter() > deadline:
+                    complete = False
+                    break
+                matched.update(self.postings[i])
+            found = matched if found is None else found & matched
+            if not complete or not found:
+                break
+        return self.best(found, limit), complete
+
+    def similar_words(self, token: str, deadline: float) -> List[int]:
+        """
+        Word numbers whose start is within one edit of `token` (two for
+        tokens of eight letters or more).
+        """
+        limit = 1 if len(token) < 8 else 2
+        shared = Counter(chain.from_iterable(self.grams.get(gram, ()) for gram in _trigrams("^" + token)))
+        similar = []
+        for i, _ in shared.most_common(200):
+            if time.perf_counter() > deadline:
+                break
+            if prefix_distance(token, self.words[i], limit) <= limit:
+                similar.append(i)
+        return similar
+
+
+class SuggestIndex:
+    """
+    As-you-type suggestions over players, teams and leagues, built from
+    the player search index and the dimension store. Each type answers
+    with up to `limit` (id, name, logo) tuples, best first. A query whose
+    words match nothing is retried allowing a typo in its longest word.
+    Answers are cached per folded query until the next rebuild.
+    """
+    def __init__(self):
+        self._suggestions: Optional[_Suggestions] = None
+        self._sources: Optional[tuple] = None
+        self._cache: "OrderedDict[tuple, dict]" = OrderedDict()
+        self.built_at = 0.0
+        self.counters = {"lookups": 0, "cache_hits": 0, "fuzzy": 0, "over_budget": 0, "rebuilds": 0, "errors": 0}
+        self._rebuilding: Optional[asyncio.Task] = None
+        self._rebuild_again = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._suggestions is not None
+
+    def _source_version(self) -> tuple:
+        sizes = tuple(len(dimension_store.held(name)) for name in ("teams", "leagues"))
+        return (player_search_index.version, dimension_store.loaded_at, sizes)
+
+    async def rebuild(self, force: bool = False):
+        """
+        Rebuild when the players, teams or leagues changed since the last build.
+        """
+        if not dimension_store.loaded_at or (PLAYER_SEARCH_INDEX and not player_search_index.ready):
+            # an empty build would pass for "nothing matches"
+            return
+        version = self._source_version()
+        if not force and version == self._sources:
+            return
+        suggestions = await asyncio.to_thread(
+            _Suggestions, player_search_index.rows(), dimension_store.held("teams"), dimension_store.held("leagues")
+        )
+        self._suggestions, self._sources = suggestions, version
+        self._cache.clear()
+        self.built_at = time.time()
+        self.counters["rebuilds"] += 1
+
+    def suggest(self, text: str, limit: int = 5) -> dict:
+        """
+        {"data": {type: [[id, name, logo], ...]}, "meta": {...}} for `text`.
+        `meta.partial` is set when the answer may be incomplete, because
+        the suggestions are still loading or the lookup ran over budget.
+        """
+        self.counters["lookups"] += 1
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+        tokens = list(dict.fromkeys(fold(text).split()))
+        suggestions = self._suggestions
+        if not tokens or suggestions is None:
+            return {"data": {kind: [] for kind in SUGGEST_TYPES}, "meta": {"fuzzy": False, "partial": suggestions is None}}
+
+        key = (tuple(tokens), limit)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.counters["cache_hits"] += 1
+            return cached
+
+        deadline = time.perf_counter() + SUGGEST_BUDGET_MS / 1000
+        found, complete = suggestions.lookup(tokens, limit, deadline)
+        fuzzy = False
+        if complete and not any(found.values()):
+            typo = max(tokens, key=len)
+            if len(typo) >= 4:
+                fuzzy = True
+                self.counters["fuzzy"] += 1
+                matched = set()
+                for i in suggestions.similar_words(typo, deadline):
+                    matched.update(suggestions.postings[i])
+                others = [token for token in tokens if token != typo]
+                if others:
+                    matched = {p for p in matched if all(any(w.startswith(t) for w in suggestions.names[p].split()) for t in others)}
+                found = suggestions.best(matched, limit)
+                complete = time.perf_counter() <= deadline
+        if not complete:
+            self.counters["over_budget"] += 1
+
+        answer = {
+            "data": {kind: [list(suggestions.entries[p]) for p in found[kind]] for kind in SUGGEST_TYPES},
+            "meta": {"fuzzy": fuzzy, "partial": not complete},
+        }
+        if complete:
+            self._cache[key] = answer
+            if len(self._cache) > SUGGEST_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return answer
+
+    def schedule_rebuild(self):
+        """
+        Rebuild in the background, one rebuild at a time; asked again while
+        one runs, another follows it.
+        """
+        self._rebuild_again = True
+        if self._rebuilding is None or self._rebuilding.done():
+            self._rebuilding = asyncio.ensure_future(self._rebuild_scheduled())
+
+    async def _rebuild_scheduled(self):
+        while self._rebuild_again:
+            self._rebuild_again = False
+            try:
+                await self.rebuild()
+            except Exception:
+                self.counters["errors"] += 1
+                logger.warning("Suggestion rebuild failed", exc_info=True)
+
+    async def _run(self):
+        while True:
+            self.schedule_rebuild()
+            await asyncio.sleep(SUGGEST_REFRESH)
+
+    def start(self):
+        """
+        Build in the background and rebuild whenever the sources change:
+        right after they load, and checked every SUGGEST_REFRESH seconds
+        for smaller changes.
+        """
+        if self._task is None:
+            dimension_store.on_load.append(self.schedule_rebuild)
+            player_search_index.on_load.append(self.schedule_rebuild)
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is None:
+            return
+        dimension_store.on_load.remove(self.schedule_rebuild)
+        player_search_index.on_load.remove(self.schedule_rebuild)
+        for pending in (task, self._rebuilding):
+            if pending is not None:
+                pending.cancel()
+                try:
+                    await pending
+                except asyncio.CancelledError:
+                    pass
+
+    def stats(self) -> dict:
+        suggestions = self._suggestions
+        return {
+            "entries": {kind: end - start for kind, (start, end) in suggestions.bounds.items()} if suggestions else {},
+            "words": len(suggestions.words) if suggestions else 0,
+            "cached": len(self._cache),
+            "built_at": self.built_at,
+            **self.counters,
+        }
+
+
+suggest_index = SuggestIndex()
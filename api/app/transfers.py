@@ -0,0 +1,266 @@
+# app/transfers.py
+import os
+import time
+import random
+import asyncio
+import logging
+from array import array
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import List, Optional
+from fastapi import HTTPException
+from app.dependencies import get_sql_gateway
+from app.queries import sql_template
+
+logger = logging.getLogger(__name__)
+
+# Answer /v1/players/rand-transfer from memory; with 0 every call runs the
+# ORDER BY RANDOM() query
+TRANSFER_POOL = os.environ.get("TRANSFER_POOL", "1") == "1"
+# Fees and clubs change, the pool is small, so it is reloaded whole
+TRANSFER_POOL_REFRESH = float(os.environ.get("TRANSFER_POOL_REFRESH", "900"))
+# After a failed first load, calls go to the database this long before
+# the pool is tried again
+TRANSFER_POOL_RETRY = float(os.environ.get("TRANSFER_POOL_RETRY", "30"))
+# Sessions remembered for no-repeat draws, least recently used dropped first
+TRANSFER_POOL_SESSIONS = int(os.environ.get("TRANSFER_POOL_SESSIONS", "10000"))
+
+# what makes a transfer worth guessing
+MIN_FEE = 20000000
+
+_POOL_QUERY = sql_template("transfers.pool", """
+    WITH transfer_data AS (
+        SELECT
+            tr.transfer_id,
+            tr.player_id,
+            p.player_name,
+            json_build_object(
+                'team_id', ft.team_id,
+                'team_name', ft.team_name,
+                'team_url', ft.logo_url,
+                'nation', fn.team_name,
+                'nation_url', fn.logo_url
+            ) as from_team,
+            json_build_object(
+                'team_id', tt.team_id,
+                'team_name', tt.team_name,
+                'team_url', tt.logo_url,
+                'nation', tn.team_name,
+                'nation_url', tn.logo_url
+            ) as to_team,
+            tr."isLoan",
+            tr.fee,
+            tr.value,
+            tr.date,
+            tr.season
+        FROM transfers tr
+        LEFT JOIN players p ON tr.player_id = p.player_id
+        LEFT JOIN teams ft ON tr.from_team_id = ft.team_id
+        LEFT JOIN teams tt ON tr.to_team_id = tt.team_id
+        LEFT JOIN leagues fl ON ft.league_id = fl.league_id
+        LEFT JOIN leagues tl ON tt.league_id = tl.league_id
+        LEFT JOIN teams fn ON fl.country_id = fn.team_id
+        LEFT JOIN teams tn ON tl.country_id = tn.team_id
+        WHERE tr.date IS NOT NULL
+            AND tr.fee is NOT null
+            AND tr.fee >= :min_fee
+            AND tr."isLoan" is false
+    )
+    SELECT json_build_object(
+        'data', COALESCE((SELECT json_agg(transfer_data ORDER BY date, transfer_id) FROM transfer_data), '[]'::json)
+    ) as result
+""", min_fee="bigint")
+
+
+class _Pool:
+    """
+    One load: the eligible transfers sorted by date, plus for every day
+    between the first and last transfer the position of the first transfer
+    on or after it. A date window is then two array lookups and a draw is
+    one random index into it.
+    """
+    def __init__(self, transfers: List[dict]):
+        self.transfers = transfers
+        self.dates = [date.fromisoformat(str(t["date"])[:10]) for t in transfers]
+        self.first_day = self.dates[0].toordinal() if transfers else 0
+        last_day = self.dates[-1].toordinal() if transfers else -1
+        starts = array("i")
+        position = 0
+        for day in range(self.first_day, last_day + 1):
+            while self.dates[position].toordinal() < day:
+                position += 1
+            starts.append(position)
+        self.starts = starts
+
+    def position(self, day: date) -> int:
+        """
+        Index of the first transfer on or after `day`.
+        """
+        offset = day.toordinal() - self.first_day
+        if offset <= 0:
+            return 0
+        if offset >= len(self.starts):
+            return len(self.transfers)
+        return self.starts[offset]
+
+    def window(self, start_date: date, end_date: date) -> range:
+        return range(self.position(start_date), self.position(end_date + timedelta(days=1)))
+
+
+class _Session:
+    """
+    A lazy shuffle of one window for one session: each draw picks from the
+    transfers not drawn yet (Fisher-Yates, swaps kept in a dict), and a new
+    round starts once all have been drawn.
+    """
+    __slots__ = ("rng", "drawn", "swaps")
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.drawn = 0
+        self.swaps = {}
+
+    def draw(self, size: int) -> int:
+        if self.drawn >= size:
+            self.drawn = 0
+            self.swaps.clear()
+        k = self.drawn
+        j = self.rng.randrange(k, size)
+        picked = self.swaps.get(j, j)
+        self.swaps[j] = self.swaps.get(k, k)
+        self.drawn = k + 1
+        return picked
+
+
+class TransferPool:
+    """
+    Eligible transfers (fee of at least MIN_FEE, not a loan) held in
+    memory, drawn uniformly at random within a date window. A `seed` makes
+    the draw reproducible; a `session` never repeats a transfer within the
+    same window until all of them have been drawn, or the pool is reloaded.
+    """
+    def __init__(self):
+        self._pool: Optional[_Pool] = None
+        self._sessions: "OrderedDict[tuple, _Session]" = OrderedDict()
+        self._loading: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+        self.loaded_at = 0.0
+        self.counters = {"samples": 0, "loads": 0, "errors": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._pool is not None
+
+    async def load(self):
+        """
+        Reload the whole pool, replacing the previous one and its sessions.
+        """
+        result = await get_sql_gateway().execute(_POOL_QUERY.bind(min_fee=MIN_FEE))
+        pool = _Pool((result or {}).get("data") or [])
+        self._pool = pool
+        self._sessions.clear()
+        self.loaded_at = time.time()
+        self.counters["loads"] += 1
+
+    async def ensure_loaded(self) -> bool:
+        """
+        Load now if nothing is loaded yet (once, however many callers wait),
+        returns whether the pool can answer.
+        """
+        if not TRANSFER_POOL:
+            return False
+        if self._pool is None:
+            if self._loading is None or self._loading.done():
+                if time.monotonic() < self._retry_at:
+                    return False
+                self._loading = asyncio.ensure_future(self._first_load())
+            await asyncio.shield(self._loading)
+        return self._pool is not None
+
+    async def _first_load(self):
+        try:
+            await self.load()
+        except Exception:
+            self._retry_at = time.monotonic() + TRANSFER_POOL_RETRY
+            self.counters["errors"] += 1
+            logger.warning("Transfer pool load failed", exc_info=True)
+
+    def sample(self, start_date: date, end_date: date, seed: Optional[int] = None, session: Optional[str] = None) -> Optional[dict]:
+        """
+        A transfer dated within [start_date, end_date], None when there is none.
+        """
+        pool = self._pool
+        window = pool.window(start_date, end_date)
+        if not window:
+            return None
+        self.counters["samples"] += 1
+        if session is not None:
+            key = (session, window.start, window.stop)
+            state = self._sessions.get(key)
+            if state is None:
+                rng = random.Random(f"{seed}:{session}") if seed is not None else random.Random()
+                state = self._sessions[key] = _Session(rng)
+                if len(self._sessions) > TRANSFER_POOL_SESSIONS:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(key)
+            return pool.transfers[window.start + state.draw(len(window))]
+        if seed is not None:
+            return pool.transfers[window[random.Random(f"{seed}:{start_date}:{end_date}").randrange(len(window))]]
+        return pool.transfers[window[random.randrange(len(window))]]
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(TRANSFER_POOL_REFRESH)
+            try:
+                await self.load()
+            except Exception:
+                self.counters["errors"] += 1
+                logger.warning("Transfer pool refresh failed", exc_info=True)
+
+    def start(self):
+        """
+        Load in the background and reload every TRANSFER_POOL_REFRESH
+        seconds. A draw made before the first load completes waits for it.
+        """
+        if TRANSFER_POOL and self._task is None:
+            asyncio.ensure_future(self.ensure_loaded())
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        pool = self._pool
+        return {
+            "enabled": TRANSFER_POOL,
+            "transfers": len(pool.transfers) if pool else 0,
+            "first_date": pool.dates[0].isoformat() if pool and pool.dates else None,
+            "last_date": pool.dates[-1].isoformat() if pool and pool.dates else None,
+            "sessions": len(self._sessions),
+            "loaded_at": self.loaded_at,
+            **self.counters,
+        }
+
+
+transfer_pool = TransferPool()
+
+
+async def random_transfer(start_date: date, end_date: date, seed: Optional[int] = None, session: Optional[str] = None) -> Optional[dict]:
+    """
+    `{"data": {"transfer": ...}}` from the pool, None when the pool can't
+    answer (disabled, or its load failed).
+    """
+    if not await transfer_pool.ensure_loaded():
+        return None
+    transfer = transfer_pool.sample(start_date, end_date, seed=seed, session=session)
+    if transfer is None:
+        raise HTTPException(status_code=404, detail="No data found for")
+    return {"data": {"transfer": transfer}}
@@ -0,0 +1,84 @@
+"""
+Compare JSON codecs on recorded API payloads: decoding (what the gateway
+does with execute_sql responses) and encoding (what the API does with
+responses), the old jsonable_encoder + json path against app.codec.
+
+Record payloads from a running API first, then benchmark them:
+
+    cd api && python -m benchmarks.codecs --record http://localhost:90 /v1/players/44/matches /v1/leagues/9/matches?season=2024
+    cd api && python -m benchmarks.codecs --runs 50
+"""
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from statistics import median
+from fastapi.encoders import jsonable_encoder
+from app import codec
+
+PAYLOADS_DIR = Path(__file__).parent / "payloads"
+
+
+def record(base_url: str, paths: list, directory: Path):
+    import httpx
+
+    directory.mkdir(parents=True, exist_ok=True)
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        for path in paths:
+            response = client.get(path)
+            response.raise_for_status()
+            name = re.sub(r"[^\w]+", "_", path).strip("_") + ".json"
+            (directory / name).write_bytes(response.content)
+            print(f"recorded {path} -> {name} ({len(response.content)} bytes)")
+
+
+def _time(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return median(timings) * 1000
+
+
+def _codecs() -> dict:
+    variants = {
+        "json": (json.loads, lambda v: json.dumps(jsonable_encoder(v)).encode()),
+        "app.codec": (codec.loads, codec.dumps),
+    }
+    if codec.orjson is None:
+        print(f"orjson is not installed, app.codec uses {codec.ENGINE}")
+    return variants
+
+
+def benchmark(directory: Path, runs: int):
+    payloads = sorted(directory.glob("*.json"))
+    if not payloads:
+        sys.exit(f"No payloads in {directory}, record some with --record")
+    variants = _codecs()
+
+    print(f"{'payload':<40} {'KB':>7} {'codec':<10} {'decode ms':>10} {'encode ms':>10}")
+    for path in payloads:
+        raw = path.read_bytes()
+        value = json.loads(raw)
+        for name, (loads, dumps) in variants.items():
+            # same document either way
+            assert loads(dumps(value)) == value, f"{name} changes {path.name}"
+            decode = _time(lambda: loads(raw), runs)
+            encode = _time(lambda: dumps(value), runs)
+            print(f"{path.name[:40]:<40} {len(raw) / 1024:>7.1f} {name:<10} {decode:>10.3f} {encode:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", metavar="BASE_URL", help="Fetch the given paths from a running API and save them")
+    parser.add_argument("paths", nargs="*", help="API paths to record")
+    parser.add_argument("--payloads", type=Path, default=PAYLOADS_DIR, help="Where recorded payloads are kept")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    if args.record:
+        record(args.record, args.paths, args.payloads)
+    else:
+        benchmark(args.payloads, args.runs)
@@ -0,0 +1,106 @@
+"""
+Compare the windowed get_highest_league_stat2 with the per-season loop it
+replaced. Needs SUPABASE_URL / SUPABASE_KEY for a database with data.
+
+    cd api && python -m benchmarks.highest_stat --league 9 --start 2000 --end 2024 --runs 5
+"""
+import time
+import asyncio
+import argparse
+from statistics import median
+from app import dependencies
+from app.dimensions import dimension_store
+from app.classes.league import LeagueService
+from app.models.league import LeagueInfo, TeamRank
+from app.models.response import LeagueTeamStatData, LeagueTeamStatResponse, TeamLeagueStats
+from app.models.team import Team
+
+
+async def per_season_loop(supabase, league_id: int, stat: str, start_year: int, end_year: int, desc: bool, top: int = 3) -> LeagueTeamStatResponse:
+    """
+    What get_highest_league_stat2 replaced: one league_ranks query per
+    season through the Supabase client, teams decorated from the dimension
+    store.
+    """
+    league = await dimension_store.league(league_id)
+    country = await dimension_store.team(league.country_id)
+    comp = LeagueInfo(
+        comp_id=league.league_id,
+        league_name=league.league_name,
+        country_id=league.country_id,
+        country=country.team_name if country else None,
+        league_logo=league.logo_url,
+        type=league.type,
+        country_url=country.logo_url if country else None,
+    )
+    years = {}
+    for season in range(start_year, end_year + 1):
+        query = supabase.table("league_ranks").select("*").eq("comp_id", league_id).eq("season_year", season)
+        rows = (await query.order(stat, desc=desc).limit(top).execute()).data
+        teams = await dimension_store.teams(row["team_id"] for row in rows)
+        years[str(season)] = [
+            TeamRank(
+                team=Team(team_id=row["team_id"], team_name=teams[row["team_id"]].team_name, logo=teams[row["team_id"]].logo_url),
+                rank=str(row.get("rank")),
+                **{column: row.get(column) for column in LeagueService.RANK_STATS if column != "rank"},
+            )
+            for row in rows
+        ]
+    return LeagueTeamStatResponse(data=LeagueTeamStatData(stats=TeamLeagueStats(comp=comp, years=years)))
+
+
+async def _measure(fn, runs: int) -> tuple:
+    timings = []
+    sent_before = dependencies._requests_sent
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = await fn()
+        timings.append(time.perf_counter() - started)
+    round_trips = (dependencies._requests_sent - sent_before) / runs
+    return result, timings, round_trips
+
+
+def _team_ids(response) -> dict:
+    return {season: [t.team.team_id for t in teams] for season, teams in response.data.stats.years.items()}
+
+
+async def main(args):
+    supabase = await dependencies.init_supabase_client()
+    try:
+        await dimension_store.load()
+        service = LeagueService(supabase)
+        params = dict(league_id=args.league, stat=args.stat, start_year=args.start, end_year=args.end, desc=not args.asc, top=args.top)
+        # bypass the result cache, we want the database every time
+        windowed = LeagueService.get_highest_league_stat2.__wrapped__
+
+        rows = []
+        for name, fn in (
+            ("per-season loop", lambda: per_season_loop(supabase, **params)),
+            ("windowed", lambda: windowed(service, **params)),
+        ):
+            result, timings, round_trips = await _measure(fn, args.runs)
+            rows.append((name, result, timings, round_trips))
+
+        print(f"{'variant':<16} {'median ms':>10} {'min ms':>8} {'round trips':>12}")
+        for name, _, timings, round_trips in rows:
+            print(f"{name:<16} {median(timings) * 1000:>10.1f} {min(timings) * 1000:>8.1f} {round_trips:>12.1f}")
+
+        loop_ids, window_ids = _team_ids(rows[0][1]), _team_ids(rows[1][1])
+        differing = [season for season in loop_ids if loop_ids[season] != window_ids.get(season)]
+        # ties and NULLs may order differently, the windowed query breaks ties by team_id
+        print("same teams per season" if not differing else f"order differs in seasons: {', '.join(differing)}")
+    finally:
+        await dependencies.close_supabase_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--league", type=int, default=9)
+    parser.add_argument("--stat", default="goals_f", choices=LeagueService.RANK_STATS)
+    parser.add_argument("--start", type=int, default=2000)
+    parser.add_argument("--end", type=int, default=2024)
+    parser.add_argument("--top", type=int, default=3)
+    parser.add_argument("--asc", action="store_true")
+    parser.add_argument("--runs", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
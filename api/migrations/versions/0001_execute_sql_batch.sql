@@ -0,0 +1,37 @@
+-- Companion of execute_sql: runs several named read queries in one call.
+-- Every query runs in its own exception block, so one failing query only
+-- fills its own error column. Used by SqlGateway.execute_many.
+-- A query is either SQL text or a bound template, {"sql": ..., "params": {...}}
+-- with its values read as $1 like in execute_sql_params.
+--
+--   POST /rest/v1/rpc/execute_sql_batch  {"queries": {"ranks": "SELECT ...", "form": {"sql": "SELECT ...", "params": {...}}}}
+--   -> [{"name": "ranks", "result": [...rows...], "error": null}, ...]
+
+CREATE OR REPLACE FUNCTION execute_sql_batch(queries jsonb)
+RETURNS TABLE(name text, result json, error text)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    q record;
+BEGIN
+    FOR q IN SELECT key, value FROM jsonb_each(queries) LOOP
+        name := q.key;
+        BEGIN
+            IF jsonb_typeof(q.value) = 'object' THEN
+                EXECUTE format('SELECT json_agg(to_json(s)) FROM (%s) s', rtrim(rtrim(q.value->>'sql'), ';'))
+                INTO result
+                USING q.value->'params';
+            ELSE
+                EXECUTE format('SELECT json_agg(to_json(s)) FROM (%s) s', rtrim(rtrim(q.value #>> '{}'), ';'))
+                INTO result;
+            END IF;
+            error := NULL;
+        EXCEPTION WHEN OTHERS THEN
+            result := NULL;
+            error := SQLSTATE || ': ' || SQLERRM;
+        END;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,23 @@
+-- Companion of execute_sql for query templates (app/queries.py): the
+-- statement text stays the same for every call of a template and the values
+-- arrive separately as one jsonb, read in the query as ($1->>'name')::type.
+-- Used by SqlGateway.execute for bound templates.
+--
+--   POST /rest/v1/rpc/execute_sql_params
+--        {"sql_query": "SELECT ... WHERE t.team_id = (($1->>'team_id')::bigint)", "params": {"team_id": 11}}
+--   -> [{"result": ...}]
+
+CREATE OR REPLACE FUNCTION execute_sql_params(sql_query text, params jsonb)
+RETURNS json
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    result json;
+BEGIN
+    EXECUTE format('SELECT json_agg(to_json(s)) FROM (%s) s', rtrim(rtrim(sql_query), ';'))
+    INTO result
+    USING params;
+    RETURN result;
+END;
+$$;
@@ -0,0 +1,288 @@
+-- Team page header (TeamService.get_team_info, template "team.info"): info,
+-- last 30 transfers, recent and upcoming matches and the current season's
+-- squad stats.
+
+CREATE OR REPLACE FUNCTION ga_team_info_v1(p_team_id bigint, p_season integer)
+RETURNS json
+LANGUAGE plpgsql
+STABLE
+AS $$
+BEGIN
+    RETURN (
+        WITH team_info AS (
+            SELECT 
+                t.team_id,
+                t.team_name,
+                t.team_name2,
+                t.logo_url,
+                t.league_id as curr_league_id,
+                l.league_name as current_league_name,
+                l.country_id as nation_id,
+                nt.logo_url as nation_url,
+                t.city,
+                t.stadium
+            FROM teams t
+            LEFT JOIN leagues l ON t.league_id = l.league_id
+            LEFT JOIN teams nt ON l.country_id = nt.team_id
+            WHERE t.team_id = p_team_id
+        ),
+        team_transfers AS (
+            SELECT
+                tr.transfer_id,
+                p.player_id,
+                p.player_name,
+                json_build_object(
+                    'team_id', ft.team_id,
+                    'team_name', ft.team_name,
+                    'team_url', ft.logo_url,
+                    'nation', fn.team_name,
+                    'nation_url', fn.logo_url
+                ) as from_team,
+                json_build_object(
+                    'team_id', tt.team_id,
+                    'team_name', tt.team_name,
+                    'team_url', tt.logo_url,
+                    'nation', tn.team_name,
+                    'nation_url', tn.logo_url
+                ) as to_team,
+                tr."isLoan" as "isLoan",
+                tr.fee,
+                tr.value,
+                tr.date,
+                tr.season
+            FROM transfers tr
+            JOIN players p ON tr.player_id = p.player_id
+            JOIN teams ft ON tr.from_team_id = ft.team_id
+            JOIN teams tt ON tr.to_team_id = tt.team_id
+            JOIN leagues fl ON ft.league_id = fl.league_id
+            JOIN leagues tl ON tt.league_id = tl.league_id
+            JOIN teams fn ON fl.country_id = fn.team_id
+            JOIN teams tn ON tl.country_id = tn.team_id
+            WHERE tr.from_team_id = p_team_id OR tr.to_team_id = p_team_id
+            ORDER BY tr.date DESC
+            LIMIT 30
+        ),
+        played_matches AS (
+            SELECT 
+                json_build_object(
+                    'home', json_build_object(
+                        'stats', json_build_object(
+                            'goals', m.home_goals,
+                            'pen_goals', m.pen_home_goals,
+                            'ranking', NULL
+                        ),
+                        'team', json_build_object(
+                            'team_id', ht.team_id,
+                            'team_name', ht.team_name,
+                            'logo', ht.logo_url
+                        )
+                    ),
+                    'away', json_build_object(
+                        'stats', json_build_object(
+                            'goals', m.away_goals,
+                            'pen_goals', m.pen_away_goals,
+                            'ranking', NULL
+                        ),
+                        'team', json_build_object(
+                            'team_id', at.team_id,
+                            'team_name', at.team_name,
+                            'logo', at.logo_url
+                        )
+                    )
+                ) as teams,
+                json_build_object(
+                    'match_id', m.match_id,
+                    'match_date', m.match_date::text,
+                    'date_time_utc', (m.match_date::text || ' ' || COALESCE(m.match_time::text, '00:00:00')),
+                    'round', m.round,
+                    'season_year', EXTRACT(YEAR FROM m.match_date)::int,
+                    'draw', m."isDraw",
+                    'et', m.extra_time,
+                    'pens', m.pens,
+                    'result', m.result,
+                    'comp_id', m.comp_id,
+                    'comp', l.league_name,
+                    'comp_logo', l.logo_url
+                ) as match_info
+            FROM matches m
+            JOIN teams ht ON m.home_id = ht.team_id
+            JOIN teams at ON m.away_id = at.team_id
+            JOIN leagues l ON m.comp_id = l.league_id
+            WHERE (m.home_id = p_team_id OR m.away_id = p_team_id)
+            AND m.result IS NOT NULL
+            ORDER BY m.match_date DESC, m.match_time DESC
+            LIMIT 6
+        ),
+        upcoming_matches AS (
+            SELECT 
+                json_build_object(
+                    'home', json_build_object(
+                        'stats', json_build_object(
+                            'goals', m.home_goals,
+                            'pen_goals', m.pen_home_goals,
+                            'ranking', NULL
+                        ),
+                        'team', json_build_object(
+                            'team_id', ht.team_id,
+                            'team_name', ht.team_name,
+                            'logo', ht.logo_url
+                        )
+                    ),
+                    'away', json_build_object(
+                        'stats', json_build_object(
+                            'goals', m.away_goals,
+                            'pen_goals', m.pen_away_goals,
+                            'ranking', NULL
+                        ),
+                        'team', json_build_object(
+                            'team_id', at.team_id,
+                            'team_name', at.team_name,
+                            'logo', at.logo_url
+                        )
+                    )
+                ) as teams,
+                json_build_object(
+                    'match_id', m.match_id,
+                    'match_date', m.match_date::text,
+                    'date_time_utc', (m.match_date::text || ' ' || COALESCE(m.match_time::text, '00:00:00')),
+                    'round', m.round,
+                    'season_year', EXTRACT(YEAR FROM m.match_date)::int,
+                    'draw', m."isDraw",
+                    'et', m.extra_time,
+                    'pens', m.pens,
+                    'result', m.result,
+                    'comp_id', m.comp_id,
+                    'comp', l.league_name,
+                    'comp_logo', l.logo_url
+                ) as match_info
+            FROM matches m
+            JOIN teams ht ON m.home_id = ht.team_id
+            JOIN teams at ON m.away_id = at.team_id
+            JOIN leagues l ON m.comp_id = l.league_id
+            WHERE (m.home_id = p_team_id OR m.away_id = p_team_id)
+            AND m.result IS NULL
+            ORDER BY m.match_date ASC, m.match_time ASC
+            LIMIT 6
+        ),
+        team_matches AS (
+            SELECT teams, match_info FROM played_matches
+            UNION ALL
+            SELECT teams, match_info FROM upcoming_matches
+        ),
+        team_stats AS (
+            SELECT
+                json_build_object(
+                    'player_id', p.player_id,
+                    'player_name', p.player_name,
+                    'img', p.pic_url
+                ) as player,
+                json_build_object(
+                    'comp_id', ps.comp_id,
+                    'comp_name', l.league_name,
+                    'comp_url', l.logo_url
+                ) as comp,
+                json_build_object(
+                    'team_id', t.team_id,
+                    'team_name', t.team_name,
+                    'logo', t.logo_url
+                ) as team,
+                ps.season_year,
+                p.age,
+                ps.ga,
+                CASE WHEN ps.gp > 0 THEN ROUND((ps.ga::decimal / ps.gp), 2) ELSE NULL END as ga_pg,
+                ps.goals,
+                CASE WHEN ps.gp > 0 THEN ROUND((ps.goals::decimal / ps.gp), 2) ELSE NULL END as goals_pg,
+                ps.assists,
+                CASE WHEN ps.gp > 0 THEN ROUND((ps.assists::decimal / ps.gp), 2) ELSE NULL END as assists_pg,
+                ps.penalty_goals,
+                ps.gp,
+                ps.minutes,
+                CASE WHEN ps.gp > 0 THEN ROUND((ps.minutes::decimal / ps.gp), 2) ELSE NULL END as minutes_pg,
+                NULL as cs,
+                NULL as pass_compl_pg,
+                NULL as passes_pg,
+                NULL as errors_pg,
+                NULL as shots_pg,
+                NULL as shots_on_target_pg,
+                NULL as sca_pg,
+                NULL as gca_pg,
+                NULL as take_ons_pg,
+                NULL as take_ons_won_pg,
+                NULL as goals_concede,
+                NULL as yellows,
+                NULL as yellows2,
+                NULL as reds,
+                NULL as own_goals,
+                ps.stats_id
+            FROM player_stats ps
+            JOIN players p ON ps.player_id = p.player_id
+            JOIN teams t ON ps.team_id = t.team_id
+            JOIN leagues l ON ps.comp_id = l.league_id
+            LEFT JOIN teams tn1 ON p.nation1_id = tn1.team_id
+            LEFT JOIN teams tn2 ON p.nation2_id = tn2.team_id
+            WHERE ps.team_id = p_team_id AND ps.comp_id = 9999 AND ps.season_year = p_season
+            ORDER BY ps.ga DESC
+        )
+        SELECT json_build_object(
+            'data', json_build_object(
+                'info', (SELECT row_to_json(team_info) FROM team_info),
+                'transfers', (SELECT coalesce(json_agg(
+                    json_build_object(
+                        'transfer_id', tt.transfer_id,
+                        'player_id', tt.player_id,
+                        'player_name', tt.player_name,
+                        'from_team', tt.from_team,
+                        'to_team', tt.to_team,
+                        'isLoan', tt."isLoan",
+                        'fee', tt.fee,
+                        'value', tt.value,
+                        'date', tt.date,
+                        'season', tt.season
+                    )
+                ), '[]'::json) FROM team_transfers tt),
+                'matches', (SELECT coalesce(json_agg(
+                    json_build_object(
+                        'teams', tm.teams,
+                        'match_info', tm.match_info
+                    )
+                ), '[]'::json) FROM team_matches tm),
+                'stats', (SELECT coalesce(json_agg(
+                    json_build_object(
+                        'player', ts.player,
+                        'comp', ts.comp,
+                        'team', ts.team,
+                        'season_year', ts.season_year,
+                        'age', ts.age,
+                        'ga', ts.ga,
+                        'ga_pg', ts.ga_pg,
+                        'goals', ts.goals,
+                        'goals_pg', ts.goals_pg,
+                        'assists', ts.assists,
+                        'assists_pg', ts.assists_pg,
+                        'penalty_goals', ts.penalty_goals,
+                        'gp', ts.gp,
+                        'minutes', ts.minutes,
+                        'minutes_pg', ts.minutes_pg,
+                        'cs', ts.cs,
+                        'pass_compl_pg', ts.pass_compl_pg,
+                        'passes_pg', ts.passes_pg,
+                        'errors_pg', ts.errors_pg,
+                        'shots_pg', ts.shots_pg,
+                        'shots_on_target_pg', ts.shots_on_target_pg,
+                        'sca_pg', ts.sca_pg,
+                        'gca_pg', ts.gca_pg,
+                        'take_ons_pg', ts.take_ons_pg,
+                        'take_ons_won_pg', ts.take_ons_won_pg,
+                        'goals_concede', ts.goals_concede,
+                        'yellows', ts.yellows,
+                        'yellows2', ts.yellows2,
+                        'reds', ts.reds,
+                        'own_goals', ts.own_goals,
+                        'stats_id', ts.stats_id
+                    )
+                ), '[]'::json) FROM team_stats ts)
+            )
+        ) as result
+    );
+END;
+$$;
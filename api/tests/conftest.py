@@ -0,0 +1,144 @@
+# tests/conftest.py
+import os
+import json
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+import httpx
+import pytest
+
+# app.dependencies refuses to import without them; nothing is ever sent there
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+from app import dependencies
+from app.gateway import SqlGateway, CircuitBreaker
+
+REST_URL = "https://example.supabase.co/rest/v1"
+
+
+class Upstream:
+    """
+    Fake Supabase REST host for httpx.MockTransport. Only /rpc/execute_sql
+    exists, so the gateway inlines templates and bundles with one SELECT,
+    as against a database without the migrations. Each call is answered by
+    the first route whose text occurs in the SQL; the answer is the query's
+    JSON value, a callable building it from the SQL, or an httpx.Response.
+    Other functions exist once given in `functions`, a callable answering
+    the request's JSON body.
+    """
+    def __init__(self):
+        self.routes: List[tuple] = []
+        self.requests: List[str] = []
+        self.functions: Dict[str, Callable[[dict], Any]] = {}
+
+    def route(self, text: str, answer: Any):
+        self.routes.append((text, answer))
+
+    def sent(self, text: str) -> int:
+        return sum(1 for sql in self.requests if text in sql)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        function = request.url.path.rsplit("/", 1)[-1]
+        if function in self.functions:
+            self.requests.append(request.content.decode())
+            answer = self.functions[function](json.loads(request.content))
+            return answer if isinstance(answer, httpx.Response) else httpx.Response(200, json=answer)
+        if function != "execute_sql":
+            return httpx.Response(404, json={
+                "code": "PGRST202",
+                "message": f"Could not find the function public.{function} in the schema cache",
+            })
+        sql = json.loads(request.content)["sql_query"]
+        self.requests.append(sql)
+        for text, answer in self.routes:
+            if text in sql:
+                if callable(answer):
+                    answer = answer(sql)
+                if isinstance(answer, httpx.Response):
+                    return answer
+                return httpx.Response(200, json=[{"result": answer}])
+        return httpx.Response(200, json=[])
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def upstream() -> Upstream:
+    return Upstream()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    """
+    Stands in for time.monotonic in app.cache, moved by hand.
+    """
+    from app import cache
+
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def make_gateway(upstream: Callable, **kwargs) -> SqlGateway:
+    http = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    kwargs.setdefault("backoff", 0)
+    kwargs.setdefault("breaker", CircuitBreaker(threshold=3, reset_after=60))
+    return SqlGateway(REST_URL, "test-key", http, **kwargs)
+
+
+@pytest.fixture
+def gateway(upstream: Upstream, monkeypatch) -> SqlGateway:
+    """
+    A gateway talking to `upstream`, also what get_sql_gateway() returns.
+    """
+    gateway = make_gateway(upstream)
+    monkeypatch.setattr(dependencies, "_gateway", gateway)
+    return gateway
+
+
+@pytest.fixture
+def client(upstream: Upstream, monkeypatch):
+    """
+    TestClient for the whole app, lifespan included, with the Supabase
+    client and gateway already set up against `upstream`.
+    """
+    from fastapi.testclient import TestClient
+    from supabase import acreate_client, AsyncClientOptions
+    from app.main import app
+    from app.cache import result_cache
+    from app.http_cache import response_memo
+
+    gateway = make_gateway(upstream)
+    supabase = asyncio.run(acreate_client(
+        os.environ["SUPABASE_URL"], "test-key", options=AsyncClientOptions(httpx_client=gateway.http),
+    ))
+    # init_supabase_client() leaves an existing client alone
+    monkeypatch.setattr(dependencies, "_http_client", gateway.http)
+    monkeypatch.setattr(dependencies, "_supabase", supabase)
+    monkeypatch.setattr(dependencies, "_gateway", gateway)
+    result_cache.purge()
+    response_memo.purge()
+    with TestClient(app) as test_client:
+        yield test_client
+    result_cache.purge()
+    response_memo.purge()
+
+
+def rows_result(rows: list, columns: Optional[tuple] = None) -> dict:
+    """
+    `{"data": [...]}` as the array-of-rows queries return it.
+    """
+    if columns is None:
+        return {"data": rows}
+    return {"data": [[row[c] for c in columns] for row in rows]}
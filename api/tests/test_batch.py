@@ -0,0 +1,71 @@
+import pytest
+from app.batch import check_path
+
+
+@pytest.mark.parametrize("path", [
+    "/v1/players/44/matches",
+    "/v1/leagues/9/matches?season=2024",
+    "/v1/players/search?name=Modri%C4%87",
+    "/v1/teams/",
+])
+def test_allowed_paths(path):
+    assert check_path(path) is None
+
+
+@pytest.mark.parametrize("path", [
+    "https://example.com/v1/players/44",
+    "//example.com/v1/players/44",
+    "v1/players/44",
+    "/v2/players/44",
+    "/v1/admin/pool",
+    "/v1/batch",
+    # the same, encoded or dressed up
+    "/v1/%61dmin/pool",
+    "/v1/%62atch",
+    "%2Fv1/admin/pool",
+    "/v1/players/../admin/pool",
+    "/v1/players/%2E%2E/admin/pool",
+    "/v1/./admin/pool",
+    "/v1//admin/pool",
+])
+def test_rejected_paths(path):
+    assert check_path(path) is not None
+
+
+@pytest.fixture
+def players(upstream):
+    from tests.test_search import player, serve_players
+
+    # served before the app starts, so its own index load sees them too
+    serve_players(upstream, [player(1, "Luka Modrić", market_value=10000000), player(2, "Luka Jović")])
+
+
+def test_batch_runs_paths_through_the_app(players, client):
+    from app.search import player_search_index
+
+    client.portal.call(player_search_index.load)
+
+    response = client.post("/v1/batch", json={"requests": [
+        "/v1/players/search?name=Modrić",
+        "/v1/players/search?name=Modri%C4%87",
+        "/v1/%61dmin/pool",
+    ]})
+    assert response.status_code == 200
+    first, second, admin = response.json()["data"]
+    assert first["status"] == 200, first
+    assert [p["player_name"] for p in first["body"]["data"]["search"]] == ["Luka Modrić"]
+    assert second["body"] == first["body"]
+    assert admin["status"] == 400
+
+
+def test_batch_hides_exception_text(client, monkeypatch):
+    from app import batch
+
+    async def broken(app, parent_scope, path):
+        raise RuntimeError("secret connection string")
+
+    monkeypatch.setattr(batch, "_dispatch", broken)
+    response = client.post("/v1/batch", json={"requests": ["/v1/players/44/matches"]})
+    entry = response.json()["data"][0]
+    assert entry["status"] == 500
+    assert "secret" not in str(entry["body"])
@@ -0,0 +1,50 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from app.pages import run_sections
+from tests.conftest import make_gateway
+
+
+@pytest.mark.anyio
+async def test_bundle_sends_one_select(upstream):
+    upstream.route("json_build_object(\n'q0'", {"q0": [{"result": {"data": [1]}}], "q1": [{"result": {"data": [2]}}]})
+    gateway = make_gateway(upstream)
+    with gateway.bundle():
+        first, second = await asyncio.gather(gateway.execute("SELECT 1"), gateway.execute("SELECT 2"))
+    assert first == {"data": [1]}
+    assert second == {"data": [2]}
+    assert len(upstream.requests) == 1
+    assert gateway.batch_rpc is False
+    assert gateway.counters["bundles"] == 1
+
+
+@pytest.mark.anyio
+async def test_bundle_falls_back_to_single_queries(upstream):
+    # the combined SELECT fails, each query is retried on its own
+    upstream.route("json_build_object(\n'q0'", httpx.Response(400, text="division by zero"))
+    upstream.route("SELECT 1/0", httpx.Response(400, text="division by zero"))
+    upstream.route("SELECT 2", {"data": [2]})
+    gateway = make_gateway(upstream)
+    with gateway.bundle():
+        results = await asyncio.gather(
+            gateway.execute("SELECT 1/0"), gateway.execute("SELECT 2"), return_exceptions=True,
+        )
+    assert isinstance(results[0], HTTPException)
+    assert results[0].status_code == 500
+    assert results[1] == {"data": [2]}
+    assert gateway.counters["bundle_fallbacks"] == 1
+    assert len(upstream.requests) == 3
+
+
+@pytest.mark.anyio
+async def test_page_sections_share_one_round_trip(upstream, gateway):
+    upstream.route("json_build_object(\n'q0'", {"q0": [{"result": {"data": [1]}}], "q1": [{"result": {"data": [2]}}]})
+    upstream.route("SELECT", lambda sql: {"data": [int(sql.split()[-1])]})
+
+    page = await run_sections({"one": lambda: gateway.execute("SELECT 1"), "two": lambda: gateway.execute("SELECT 2")})
+    assert page["data"] == {"one": [1], "two": [2]}
+    assert len(upstream.requests) == 1
+
+    await run_sections({"one": lambda: gateway.execute("SELECT 1"), "two": lambda: gateway.execute("SELECT 2")}, bundle=False)
+    assert len(upstream.requests) == 3
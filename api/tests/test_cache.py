@@ -0,0 +1,79 @@
+import pytest
+from app import cache
+from app.constants import GLOBAL_YEAR
+from app.cache import ResultCache, cached, result_cache, season_of, season_ttl, _MISSING
+
+
+def test_season_of():
+    assert season_of(2023) == 2023
+    assert season_of("2025-03-01") == 2024
+    assert season_of("2024-08-17") == 2024
+    assert season_of(True) is None
+    assert season_of("not a date") is None
+
+
+def test_past_seasons_never_expire():
+    assert season_ttl(2000) is None
+    assert season_ttl(None) == cache.CURRENT_SEASON_TTL
+
+
+def test_lru_eviction():
+    results = ResultCache(max_entries=2)
+    results.set("ep", 1, "a", ttl=None)
+    results.set("ep", 2, "b", ttl=None)
+    results.get("ep", 1)
+    results.set("ep", 3, "c", ttl=None)
+    assert results.get("ep", 2) is _MISSING
+    assert results.get("ep", 1) == "a"
+
+
+class Service:
+    def __init__(self):
+        self.calls = []
+
+    @cached()
+    async def table(self, league_id: int, season: int = GLOBAL_YEAR):
+        self.calls.append((league_id, season))
+        return {"league_id": league_id, "season": season}
+
+
+@pytest.mark.anyio
+async def test_past_season_results_stay_cached(clock):
+    result_cache.purge()
+    service = Service()
+
+    assert await service.table(9, GLOBAL_YEAR - 1) == {"league_id": 9, "season": GLOBAL_YEAR - 1}
+    clock.now += 10 * cache.CURRENT_SEASON_TTL
+    assert await service.table(9, season=GLOBAL_YEAR - 1) == {"league_id": 9, "season": GLOBAL_YEAR - 1}
+    assert service.calls == [(9, GLOBAL_YEAR - 1)]
+    result_cache.purge()
+
+
+@pytest.mark.anyio
+async def test_current_season_results_expire(clock):
+    result_cache.purge()
+    service = Service()
+
+    await service.table(9)
+    clock.now += cache.CURRENT_SEASON_TTL - 1
+    # the default season and the same season passed explicitly share an entry
+    await service.table(9, GLOBAL_YEAR)
+    assert service.calls == [(9, GLOBAL_YEAR)]
+    clock.now += 2
+    await service.table(9)
+    assert service.calls == [(9, GLOBAL_YEAR)] * 2
+    result_cache.purge()
+
+
+@pytest.mark.anyio
+async def test_arguments_make_the_key(clock):
+    result_cache.purge()
+    service = Service()
+
+    await service.table(9, 2020)
+    await service.table(10, 2020)
+    await service.table(9, 2021)
+    await service.table(9, 2020)
+    assert service.calls == [(9, 2020), (10, 2020), (9, 2021)]
+    assert result_cache.counters["Service.table"]["hits"] >= 1
+    result_cache.purge()
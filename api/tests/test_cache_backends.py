@@ -0,0 +1,109 @@
+from datetime import date
+import pytest
+from app import cache_backends
+from app.cache import SharedCache, cached, result_cache, shared_cache, _MISSING
+from app.cache_backends import FileBackend, MemoryBackend, decode, encode, make_key
+from app.models.match import MatchGoals
+
+VALUE = [MatchGoals(goals=2, pen_goals=1), {"date": date(2024, 8, 17), "ids": [1, 2]}]
+
+
+@pytest.mark.parametrize("packages", ["all", "none"])
+def test_round_trip(packages, monkeypatch):
+    if packages == "none":
+        monkeypatch.setattr(cache_backends, "msgpack", None)
+        monkeypatch.setattr(cache_backends, "zstandard", None)
+    blob = encode(VALUE)
+    assert blob[:2] == (b"MZ" if packages == "all" else b"Jz")
+    model, plain = decode(blob)
+    assert model == MatchGoals(goals=2, pen_goals=1)
+    assert plain == {"date": "2024-08-17", "ids": [1, 2]}
+
+
+def test_other_workers_read_the_fallback_format(monkeypatch):
+    monkeypatch.setattr(cache_backends, "msgpack", None)
+    monkeypatch.setattr(cache_backends, "zstandard", None)
+    blob = encode(VALUE)
+    monkeypatch.undo()
+    assert decode(blob)[0] == MatchGoals(goals=2, pen_goals=1)
+
+
+def test_only_app_models_are_rebuilt():
+    blob = encode({"__model__": "os:system", "value": "true"})
+    with pytest.raises(ValueError):
+        decode(blob)
+
+
+def test_keys_are_stable():
+    key = make_key("ga:v1", "LeagueService.table", (("league_id", 9), ("season", 2024)))
+    assert key == make_key("ga:v1", "LeagueService.table", (("season", 2024), ("league_id", 9)))
+    assert key.startswith("ga:v1:LeagueService.table:")
+    assert key != make_key("ga:v1", "LeagueService.table", (("league_id", 9), ("season", 2023)))
+
+
+@pytest.mark.anyio
+async def test_file_backend(tmp_path):
+    backend = FileBackend(str(tmp_path))
+    await backend.set("ga:v1:a:1", b"one", None)
+    await backend.set("ga:v1:a:2", b"two", -1)
+    await backend.set("ga:v1:b:1", b"three", 60)
+
+    assert await backend.get("ga:v1:a:1") == b"one"
+    assert await backend.get("ga:v1:a:2") is None
+    assert await backend.get("ga:v1:missing") is None
+    assert await backend.delete_prefix("ga:v1:a:") == 2
+    assert await backend.get("ga:v1:a:1") is None
+    assert await backend.get("ga:v1:b:1") == b"three"
+
+
+class Service:
+    def __init__(self):
+        self.calls = 0
+
+    @cached(season_arg=None)
+    async def goals(self, player_id: int):
+        self.calls += 1
+        return MatchGoals(goals=player_id)
+
+
+@pytest.fixture
+def shared(monkeypatch) -> SharedCache:
+    monkeypatch.setattr(shared_cache, "backend", MemoryBackend())
+    monkeypatch.setattr(shared_cache, "counters", dict.fromkeys(shared_cache.counters, 0))
+    result_cache.purge()
+    yield shared_cache
+    result_cache.purge()
+
+
+@pytest.mark.anyio
+async def test_workers_share_results(shared):
+    first, second = Service(), Service()
+    assert await first.goals(7) == MatchGoals(goals=7)
+    # another worker: its own, empty, in-process cache
+    result_cache.purge()
+    assert await second.goals(7) == MatchGoals(goals=7)
+    assert (first.calls, second.calls) == (1, 0)
+    assert shared.stats()["hits"] == 1 and shared.stats()["writes"] == 1
+
+    assert await shared.purge("Service.goals") == 1
+    result_cache.purge()
+    await second.goals(7)
+    assert second.calls == 1
+
+
+class Broken(MemoryBackend):
+    async def get(self, key):
+        raise ConnectionError("redis down")
+
+    async def set(self, key, blob, ttl):
+        raise ConnectionError("redis down")
+
+
+@pytest.mark.anyio
+async def test_backend_errors_fall_back_to_the_service(shared, monkeypatch):
+    monkeypatch.setattr(shared, "backend", Broken())
+    service = Service()
+    assert await service.goals(3) == MatchGoals(goals=3)
+    assert service.calls == 1
+    assert shared.stats()["errors"] == 2
+    assert await shared.get("Service.goals", (("player_id", 3),)) is _MISSING
@@ -0,0 +1,78 @@
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+import pytest
+from pydantic import BaseModel
+from app import codec
+
+
+class Score(BaseModel):
+    home: int
+    kickoff: datetime
+
+
+VALUES = {
+    "date": date(2024, 8, 17),
+    "naive": datetime(2024, 8, 17, 15, 0),
+    "micro": datetime(2024, 8, 17, 15, 0, 0, 250000),
+    "utc": datetime(2024, 8, 17, 15, 0, tzinfo=timezone.utc),
+    "offset": datetime(2024, 8, 17, 15, 0, tzinfo=timezone(timedelta(hours=-4))),
+    "time": time(20, 45),
+    "decimal": Decimal("12.5"),
+    "set": {3},
+    "model": Score(home=2, kickoff=datetime(2024, 8, 17, 15, 0, tzinfo=timezone.utc)),
+    "seasons": {2024: [1, 2], 2023: []},
+    "text": "Ødegaard – Modrić",
+    "nested": [{"x": None, "y": True, "z": 1.5}],
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def engine(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(codec, "orjson", None)
+    elif codec.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+def test_dumps_writes_iso_dates_and_string_keys(engine):
+    decoded = json.loads(codec.dumps(VALUES))
+    assert decoded == {
+        "date": "2024-08-17",
+        "naive": "2024-08-17T15:00:00",
+        "micro": "2024-08-17T15:00:00.250000",
+        "utc": "2024-08-17T15:00:00+00:00",
+        "offset": "2024-08-17T15:00:00-04:00",
+        "time": "20:45:00",
+        "decimal": 12.5,
+        "set": [3],
+        "model": {"home": 2, "kickoff": "2024-08-17T15:00:00Z"},
+        "seasons": {"2024": [1, 2], "2023": []},
+        "text": "Ødegaard – Modrić",
+        "nested": [{"x": None, "y": True, "z": 1.5}],
+    }
+
+
+def test_engines_write_the_same_bytes(monkeypatch):
+    if codec.orjson is None:
+        pytest.skip("orjson is not installed")
+    fast = codec.dumps(VALUES)
+    monkeypatch.setattr(codec, "orjson", None)
+    assert codec.dumps(VALUES) == fast
+
+
+def test_loads_reads_bytes_and_text(engine):
+    body = '{"data": [{"team": "Ødegaard", "goals": 3}]}'
+    assert codec.loads(body.encode()) == codec.loads(body) == {"data": [{"team": "Ødegaard", "goals": 3}]}
+
+
+def test_unknown_types_are_refused(engine):
+    with pytest.raises(TypeError):
+        codec.dumps({"value": object()})
+
+
+def test_responses_are_encoded_with_the_codec(client):
+    response = client.get("/v1/admin/responses")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["data"]["codec"] == codec.ENGINE
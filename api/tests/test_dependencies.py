@@ -0,0 +1,43 @@
+import asyncio
+import httpx
+import pytest
+from app import dependencies
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    """
+    No client built yet; the tests close what they build.
+    """
+    monkeypatch.setattr(dependencies, "_http_client", None)
+    monkeypatch.setattr(dependencies, "_supabase", None)
+    monkeypatch.setattr(dependencies, "_gateway", None)
+
+
+@pytest.mark.anyio
+async def test_one_client_per_process(fresh):
+    with pytest.raises(RuntimeError):
+        dependencies.get_sql_gateway()
+
+    clients = await asyncio.gather(*(dependencies.get_supabase_client() for _ in range(5)))
+    assert all(client is clients[0] for client in clients)
+    assert await dependencies.get_supabase_client() is clients[0]
+    gateway = dependencies.get_sql_gateway()
+    assert gateway.http is dependencies._http_client
+
+    await dependencies.close_supabase_client()
+    assert dependencies._supabase is None and dependencies._http_client is None
+    assert gateway.http.is_closed
+
+
+@pytest.mark.anyio
+async def test_pool_stats_count_requests(fresh, upstream):
+    await dependencies.init_supabase_client()
+    dependencies._http_client._transport = httpx.MockTransport(upstream)
+    sent = dependencies.get_pool_stats()["requests_sent"]
+
+    await dependencies.get_sql_gateway().execute("SELECT 1")
+    stats = dependencies.get_pool_stats()
+    assert stats["requests_sent"] == sent + 1
+    assert stats["max_connections"] == dependencies.POOL_MAX_CONNECTIONS
+    await dependencies.close_supabase_client()
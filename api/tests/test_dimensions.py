@@ -0,0 +1,46 @@
+import pytest
+from app.dimensions import DimensionStore, TeamDim
+
+
+def serve_dimension(upstream, id_column: str, rows: dict):
+    def answer(sql: str) -> dict:
+        ids = [int(i) for i in sql.split("ANY(ARRAY[")[1].split("]")[0].split(",")] if "ANY(" in sql else None
+        return {"data": [list(r) for i, r in rows.items() if ids is None or i in ids]}
+    upstream.route(f"json_build_array({id_column}", answer)
+
+
+def serve_teams(upstream, teams: dict):
+    serve_dimension(upstream, "team_id", teams)
+
+
+def serve_leagues(upstream, leagues: dict):
+    serve_dimension(upstream, "league_id", leagues)
+
+
+@pytest.mark.anyio
+async def test_lookups_fetch_what_is_missing_once(upstream, gateway):
+    serve_teams(upstream, {1: (1, "Arsenal", "a.png"), 2: (2, "Chelsea", None)})
+    store = DimensionStore()
+
+    assert await store.teams([1, 2, None]) == {1: TeamDim(1, "Arsenal", "a.png"), 2: TeamDim(2, "Chelsea", None)}
+    assert await store.team(1) == TeamDim(1, "Arsenal", "a.png")
+    assert upstream.sent("FROM teams") == 1
+
+
+@pytest.mark.anyio
+async def test_absent_ids_are_not_fetched_again_until_refresh(upstream, gateway):
+    teams = {1: (1, "Arsenal", "a.png")}
+    serve_teams(upstream, teams)
+    store = DimensionStore()
+
+    assert await store.teams([1, 99]) == {1: TeamDim(1, "Arsenal", "a.png")}
+    assert await store.team(99) is None
+    assert await store.teams([99, 1]) == {1: TeamDim(1, "Arsenal", "a.png")}
+    assert upstream.sent("FROM teams") == 1
+    assert store.counters["absent_hits"] == 2
+
+    teams[99] = (99, "Brentford", None)
+    await store.refresh()
+    fetched = upstream.sent("FROM teams")
+    assert await store.team(99) == TeamDim(99, "Brentford", None)
+    assert upstream.sent("FROM teams") == fetched
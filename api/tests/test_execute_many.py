@@ -0,0 +1,83 @@
+import httpx
+import pytest
+from fastapi import HTTPException
+from app.queries import sql_template
+from tests.conftest import make_gateway
+
+RANKS = sql_template("test.ranks", "SELECT rank FROM league_ranks WHERE comp_id = :comp_id", comp_id="bigint")
+
+
+def batch_function(answers: dict, calls: list):
+    """
+    execute_sql_batch answering every query by name: a value is its rows,
+    a string starting with "ERROR" its error column.
+    """
+    def answer(body: dict) -> list:
+        calls.append(body["queries"])
+        rows = []
+        for name in body["queries"]:
+            value = answers[name]
+            if isinstance(value, str) and value.startswith("ERROR"):
+                rows.append({"name": name, "result": None, "error": value[6:]})
+            else:
+                rows.append({"name": name, "result": value, "error": None})
+        return rows
+    return answer
+
+
+@pytest.mark.anyio
+async def test_batch_function_splits_results_by_name(upstream):
+    calls = []
+    upstream.functions["execute_sql_batch"] = batch_function({
+        "ranks": [{"result": {"data": [1, 2]}}],
+        "form": "ERROR 42P01: relation \"form\" does not exist",
+    }, calls)
+    gateway = make_gateway(upstream)
+
+    results = await gateway.execute_many({"ranks": RANKS.bind(comp_id=9), "form": "SELECT * FROM form"})
+    assert results["ranks"] == {"data": [1, 2]}
+    assert isinstance(results["form"], HTTPException)
+    assert results["form"].status_code == 500
+    assert "does not exist" in results["form"].detail
+    assert gateway.batch_rpc is True
+    assert len(upstream.requests) == 1
+    # templates go with their parameters, text as it is
+    assert calls[0]["ranks"] == {"sql": RANKS.bind(comp_id=9).sql, "params": RANKS.bind(comp_id=9).params}
+    assert calls[0]["form"] == "SELECT * FROM form"
+
+
+@pytest.mark.anyio
+async def test_query_missing_from_the_batch_fails_alone(upstream):
+    upstream.functions["execute_sql_batch"] = lambda body: [{"name": "a", "result": [{"result": {"data": [1]}}], "error": None}]
+    gateway = make_gateway(upstream)
+
+    results = await gateway.execute_many({"a": "SELECT 1", "b": "SELECT 2"})
+    assert results["a"] == {"data": [1]}
+    assert isinstance(results["b"], HTTPException)
+
+
+@pytest.mark.anyio
+async def test_missing_batch_function_falls_back_to_one_select(upstream):
+    # no execute_sql_batch: PostgREST answers PGRST202
+    upstream.route("json_build_object(\n'a'", {"a": [{"result": {"data": [1]}}], "b": [{"result": {"data": [2]}}]})
+    gateway = make_gateway(upstream)
+
+    assert await gateway.execute_many({"a": "SELECT 1", "b": "SELECT 2"}) == {"a": {"data": [1]}, "b": {"data": [2]}}
+    assert gateway.batch_rpc is False
+    assert gateway.breaker.state == "closed"
+
+    # remembered, the next bundle goes straight to the combined SELECT
+    sent = len(upstream.requests)
+    await gateway.execute_many({"a": "SELECT 1", "b": "SELECT 2"})
+    assert len(upstream.requests) == sent + 1
+
+
+@pytest.mark.anyio
+async def test_failing_batch_function_is_not_taken_for_missing(upstream):
+    upstream.functions["execute_sql_batch"] = lambda body: httpx.Response(400, json={"code": "22023", "message": "invalid input"})
+    gateway = make_gateway(upstream)
+
+    with pytest.raises(HTTPException) as error:
+        await gateway.execute_many({"a": "SELECT 1", "b": "SELECT 2"})
+    assert error.value.status_code == 500
+    assert gateway.batch_rpc is None
@@ -0,0 +1,109 @@
+import json
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from app.gateway import CircuitBreaker, normalise_result
+from tests.conftest import make_gateway
+
+
+def test_normalise_result():
+    assert normalise_result([{"result": {"data": [1]}}]) == {"data": [1]}
+    assert normalise_result([{"result": '{"data": [1]}'}]) == {"data": [1]}
+    assert normalise_result([]) is None
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(threshold=2, reset_after=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_lets_one_probe_through(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.gateway.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(threshold=1, reset_after=30)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # only the probe, until its outcome is known
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_abandoned_probe_is_released():
+    breaker = CircuitBreaker(threshold=1, reset_after=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+@pytest.mark.anyio
+async def test_gateway_fails_fast_once_open(upstream):
+    upstream.route("SELECT", httpx.Response(503, text="unavailable"))
+    gateway = make_gateway(upstream, retries=0, breaker=CircuitBreaker(threshold=2, reset_after=60))
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            await gateway.execute("SELECT 1")
+        assert error.value.status_code == 502
+    with pytest.raises(HTTPException) as error:
+        await gateway.execute("SELECT 1")
+    assert error.value.status_code == 503
+    assert len(upstream.requests) == 2
+    assert gateway.counters["rejected"] == 1
+
+
+@pytest.mark.anyio
+async def test_retryable_status_is_retried(upstream):
+    answers = iter([httpx.Response(503, text="busy"), {"data": [1]}])
+    upstream.route("SELECT", lambda sql: next(answers))
+    gateway = make_gateway(upstream, retries=2)
+    assert await gateway.execute("SELECT 1") == {"data": [1]}
+    assert gateway.counters["retries"] == 1
+    assert gateway.breaker.state == "closed"
+
+
+@pytest.mark.anyio
+async def test_fetch_data_404_when_empty(upstream):
+    upstream.route("SELECT", {"data": []})
+    gateway = make_gateway(upstream)
+    with pytest.raises(HTTPException) as error:
+        await gateway.fetch_data("SELECT 1", "No data found for")
+    assert error.value.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_queries_run_concurrently():
+    in_flight, peak = 0, 0
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return httpx.Response(200, json=[{"result": {"data": [json.loads(request.content)["sql_query"]]}}])
+
+    gateway = make_gateway(upstream)
+    results = await asyncio.gather(*(gateway.execute(f"SELECT {i}") for i in range(5)))
+    assert results == [{"data": [f"SELECT {i}"]} for i in range(5)]
+    # nothing blocked the event loop while the others waited on the network
+    assert peak == 5
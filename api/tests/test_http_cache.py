@@ -0,0 +1,73 @@
+from app.http_cache import etag_matches, response_memo
+
+
+def test_etag_weak_comparison():
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"x"', '"abc"')
+
+
+def test_304_on_if_none_match(client):
+    first = client.get("/")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"].startswith("public, max-age=")
+
+    second = client.get("/", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+    other = client.get("/", headers={"If-None-Match": '"something-else"'})
+    assert other.status_code == 200
+    assert other.json() == first.json()
+    assert response_memo.counters["not_modified"] >= 1
+
+
+def test_no_store_paths_are_not_memoised(client):
+    response = client.get("/v1/admin/pool")
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+
+
+def season_app():
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+    from app.http_cache import ConditionalGetMiddleware, ResponseMemo, season_cacheable
+
+    app = FastAPI()
+
+    @app.get("/ranks")
+    @season_cacheable()
+    async def ranks(season: int):
+        return {"season": season}
+
+    @app.get("/info")
+    async def info(request: Request):
+        return dict(request.query_params)
+
+    return TestClient(ConditionalGetMiddleware(app, ResponseMemo()))
+
+
+def test_only_marked_routes_cache_past_seasons():
+    client = season_app()
+    assert client.get("/ranks", params={"season": 2010}).headers["cache-control"] == "public, max-age=86400"
+    # the current season, or none given, expires with the result cache
+    assert client.get("/ranks", params={"season": 2999}).headers["cache-control"] != "public, max-age=86400"
+    # a past season in the query says nothing about an unmarked route
+    assert client.get("/info", params={"season": 2010}).headers["cache-control"] != "public, max-age=86400"
+
+
+def test_routes_with_current_data_are_not_marked():
+    from app.main import app
+
+    marked = {route.path for route in app.routes if getattr(getattr(route, "endpoint", None), "season_param", None)}
+    assert "/v1/leagues/{league_id}/ranks" in marked
+    assert not {path for path in marked if path.endswith(("/infos", "/page"))}
+
+
+def test_encoded_separators_do_not_share_a_memo():
+    client = season_app()
+    assert client.get("/info?a=x&b=1").json() == {"a": "x", "b": "1"}
+    assert client.get("/info?a=x%26b%3D1").json() == {"a": "x&b=1"}
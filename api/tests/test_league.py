@@ -0,0 +1,186 @@
+import re
+import random
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from app.classes.league import LeagueService
+from tests.test_dimensions import serve_leagues, serve_teams
+
+
+@pytest.mark.anyio
+async def test_team_stats_need_a_season_unless_all_time(upstream, gateway):
+    service = LeagueService(None)
+    with pytest.raises(HTTPException) as error:
+        await service.most_league_stats_by_team(team_id=1, league_id=9, season=None)
+    assert error.value.status_code == 400
+    assert upstream.requests == []
+
+
+TEAMS = {
+    901: (901, "Arsenal", "a.png"), 902: (902, "Chelsea", None), 903: (903, "Liverpool", "l.png"),
+    904: (904, "Everton", None), 905: (905, "Fulham", "f.png"), 990: (990, "England", "e.png"),
+}
+LEAGUES = {909: (909, "Premier League", 990, "pl.png", "league")}
+
+
+def league_ranks() -> list:
+    rows = []
+    for season in range(2006, 2027):
+        for rank, team_id in enumerate((901 + season % 3, 901 + (season + 1) % 3), start=1):
+            rows.append({"rank_id": season * 10 + rank, "comp_id": 909, "season_year": season, "team_id": team_id,
+                         "rank": rank, "round": None, "points": 90 - rank * 5 - season % 4})
+    # cup-style rows: a winning round instead of a rank
+    rows.append({"rank_id": 1, "comp_id": 909, "season_year": 2013, "team_id": 903, "rank": None, "round": "Winner", "points": None})
+    rows.append({"rank_id": 2, "comp_id": 909, "season_year": 2014, "team_id": 903, "rank": None, "round": "Winners", "points": None})
+    rows.append({"rank_id": 3, "comp_id": 910, "season_year": 2015, "team_id": 903, "rank": 1, "round": None, "points": 99})
+    return rows
+
+
+def old_league_winners(rows: list, league_id: int) -> list:
+    """
+    What get_league_winners returned before the joined query: the ranks of
+    2010-2024 filtered like its PostgREST call, decorated and sorted newest first.
+    """
+    winners = [
+        r for r in rows if r["comp_id"] == league_id and 2010 <= r["season_year"] <= 2024
+        and (r["rank"] == 1 or r["round"] in ("Winners", "Winner"))
+    ]
+    win_teams = [{
+        "team": {"team_id": r["team_id"], "team_name": TEAMS[r["team_id"]][1], "logo": TEAMS[r["team_id"]][2]},
+        "rank": r["rank"], "round": r["round"], "points": r["points"], "season": r["season_year"], "rank_id": r["rank_id"],
+    } for r in winners]
+    win_teams.sort(key=lambda w: w["season"], reverse=True)
+    return win_teams
+
+
+def serve_winners(upstream, rows: list):
+    """
+    Answers the joined winners query from `rows` with the bounds it was sent.
+    """
+    def answer(sql: str) -> dict:
+        league_id = int(re.search(r"lr\.comp_id = (\d+)", sql).group(1))
+        start, end = map(int, re.search(r"BETWEEN (\d+) AND (\d+)", sql).groups())
+        rounds = re.findall(r"'(\w+)'::text", sql.split("ANY(")[1])
+        found = [
+            r for r in rows if r["comp_id"] == league_id and start <= r["season_year"] <= end
+            and (str(r["rank"]) == "1" or r["round"] in rounds)
+        ]
+        return {"data": [{
+            "team": {"team_id": r["team_id"], "team_name": TEAMS[r["team_id"]][1], "logo": TEAMS[r["team_id"]][2]},
+            "rank": r["rank"], "round": r["round"], "points": r["points"], "season": r["season_year"], "rank_id": r["rank_id"],
+        } for r in sorted(found, key=lambda r: -r["season_year"])]}
+    upstream.route("FROM league_ranks lr\n                JOIN teams t", answer)
+
+
+@pytest.mark.anyio
+async def test_winners_match_the_old_lookup(upstream, gateway):
+    rows = league_ranks()
+    serve_teams(upstream, TEAMS)
+    serve_leagues(upstream, LEAGUES)
+    serve_winners(upstream, rows)
+    service = LeagueService(None)
+
+    answer = (await LeagueService.get_league_winners.__wrapped__(service, 909)).model_dump()
+    assert answer["data"]["stats"]["win_teams"] == old_league_winners(rows, 909)
+    assert answer["data"]["stats"]["comp"] == {
+        "comp_id": 909, "league_name": "Premier League", "country_id": 990, "country": "England",
+        "league_logo": "pl.png", "type": "league", "country_url": "e.png",
+    }
+    assert upstream.sent("FROM league_ranks") == 1
+
+    # the seasons endpoint counts only "Winners" rounds
+    by_years = await LeagueService.get_league_winners_by_years.__wrapped__(service, 909, 2012, 2015)
+    assert [(w.season, w.round) for w in by_years.data.stats.win_teams] == [(2015, None), (2014, None), (2014, "Winners"), (2013, None), (2012, None)]
+
+
+class Tables:
+    """
+    Just enough of the Supabase client for the per-season loop: eq filters,
+    one order (NULLs first when descending, as Postgres sorts) and a limit.
+    """
+    def __init__(self, tables: dict):
+        self.tables = tables
+
+    def table(self, name: str) -> "Tables._Query":
+        return self._Query(self.tables[name])
+
+    class _Query:
+        def __init__(self, rows: list):
+            self.rows = list(rows)
+
+        def select(self, columns: str):
+            return self
+
+        def eq(self, column: str, value):
+            self.rows = [r for r in self.rows if r[column] == value]
+            return self
+
+        def order(self, column: str, desc: bool = False):
+            present = sorted((r for r in self.rows if r[column] is not None), key=lambda r: r[column], reverse=desc)
+            missing = [r for r in self.rows if r[column] is None]
+            self.rows = missing + present if desc else present + missing
+            return self
+
+        def limit(self, count: int):
+            self.rows = self.rows[:count]
+            return self
+
+        async def execute(self):
+            return SimpleNamespace(data=self.rows)
+
+
+def season_table() -> list:
+    rng = random.Random(11)
+    rows = []
+    for season in (2000, 2001, 2003, 2004):
+        goals = rng.sample(range(20, 100), len(TEAMS) - 1)
+        for rank, team_id in enumerate(sorted(t for t in TEAMS if t != 990), start=1):
+            gf = goals[rank - 1]
+            rows.append({
+                "comp_id": 909, "season_year": season, "team_id": team_id, "rank": rank, "info": None,
+                "points": gf + season % 7, "gp": 38, "gd": gf - 40, "wins": gf // 4, "losses": 38 - gf // 4 - 3,
+                "draws": 3, "goals_f": gf, "goals_a": 40,
+            })
+    rows.append(dict(rows[0], comp_id=910))
+    return rows
+
+
+def serve_highest_stat(upstream, rows: list):
+    """
+    Answers the windowed query from `rows`: per season in the range, the
+    first `top` teams by the sent column, NULLs last, ties by team_id.
+    """
+    def answer(sql: str) -> dict:
+        league_id = int(re.search(r"lr\.comp_id = (\d+)", sql).group(1))
+        start, end = map(int, re.search(r"BETWEEN (\d+) AND (\d+)", sql).groups())
+        stat, direction = re.search(r"ORDER BY lr\.(\w+) (ASC|DESC) NULLS LAST", sql).groups()
+        top = int(re.search(r"r\.row_num <= (\d+)", sql).group(1))
+        years = {}
+        for season in range(start, end + 1):
+            found = [r for r in rows if r["comp_id"] == league_id and r["season_year"] == season]
+            found.sort(key=lambda r: r["team_id"])
+            present = sorted((r for r in found if r[stat] is not None), key=lambda r: r[stat], reverse=direction == "DESC")
+            years[str(season)] = [{
+                "team": {"team_id": r["team_id"], "team_name": TEAMS[r["team_id"]][1], "logo": TEAMS[r["team_id"]][2]},
+                "rank": str(r["rank"]), **{c: r[c] for c in LeagueService.RANK_STATS if c != "rank"},
+            } for r in (present + [r for r in found if r[stat] is None])[:top]]
+        return {"data": years}
+    upstream.route("WITH ranked AS", answer)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("stat,desc,top", [("goals_f", True, 3), ("points", False, 2), ("wins", True, 10)])
+async def test_highest_stat_matches_the_per_season_loop(upstream, gateway, stat, desc, top):
+    from benchmarks.highest_stat import per_season_loop
+
+    rows = season_table()
+    serve_teams(upstream, TEAMS)
+    serve_leagues(upstream, LEAGUES)
+    serve_highest_stat(upstream, rows)
+    params = dict(league_id=909, stat=stat, start_year=2000, end_year=2004, desc=desc, top=top)
+
+    windowed = await LeagueService.get_highest_league_stat2.__wrapped__(LeagueService(None), **params)
+    loop = await per_season_loop(Tables({"league_ranks": rows}), **params)
+    assert windowed.model_dump() == loop.model_dump()
+    assert windowed.data.stats.years["2002"] == []
+    assert upstream.sent("WITH ranked AS") == 1
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from app.loaders import DataLoader
+
+
+class Source:
+    def __init__(self, rows: dict):
+        self.rows = rows
+        self.calls = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, keys: list) -> dict:
+        self.calls.append(sorted(keys))
+        await self.release.wait()
+        return {key: self.rows[key] for key in keys if key in self.rows}
+
+
+@pytest.mark.anyio
+async def test_keys_of_one_tick_share_a_batch():
+    source = Source({1: "a", 2: "b", 3: "c"})
+    loader = DataLoader(source)
+
+    async def one(key):
+        return await loader.load(key)
+
+    assert await asyncio.gather(one(1), one(2), loader.load_many([3, 2, 4])) == ["a", "b", {3: "c", 2: "b"}]
+    assert source.calls == [[1, 2, 3, 4]]
+    # memoised, missing keys included
+    assert await loader.load(4) is None
+    assert await loader.load_many([1, 3]) == {1: "a", 3: "c"}
+    assert source.calls == [[1, 2, 3, 4]]
+    assert loader.stats()["batches"] == 1
+
+
+@pytest.mark.anyio
+async def test_failed_batch_is_retried():
+    source = Source({1: "a"})
+    calls = 0
+
+    async def flaky(keys):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("database down")
+        return await source(keys)
+
+    loader = DataLoader(flaky)
+    with pytest.raises(RuntimeError):
+        await loader.load(1)
+    assert await loader.load(1) == "a"
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiter_does_not_cancel_the_others():
+    source = Source({1: "a"})
+    source.release.clear()
+    loader = DataLoader(source)
+
+    other = asyncio.ensure_future(loader.load(1))
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(loader.load(1), 0.01)
+    assert not other.done()
+
+    source.release.set()
+    assert await other == "a"
+    assert await loader.load(1) == "a"
+    assert len(source.calls) == 1
+
+
+@pytest.mark.anyio
+async def test_cancelled_lookup_can_be_loaded_again():
+    source = Source({1: "a"})
+    source.release.clear()
+    loader = DataLoader(source)
+
+    waiter = asyncio.ensure_future(loader.load(1))
+    await asyncio.sleep(0)
+    loader._futures[1].cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert 1 not in loader._futures
+
+    source.release.set()
+    assert await loader.load(1) == "a"
@@ -0,0 +1,102 @@
+import re
+from pathlib import Path
+import pytest
+from migrations import runner
+
+
+class FakeConnection:
+    """
+    The psycopg calls the runner makes, over an in-memory schema_migrations.
+    """
+    def __init__(self, applied: dict = None):
+        self.applied = dict(applied or {})
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return self
+
+    def transaction(self):
+        return self
+
+    def commit(self):
+        pass
+
+    def execute(self, sql: str, params: tuple = None):
+        self.executed.append(sql.strip())
+        if sql.startswith("INSERT INTO schema_migrations"):
+            version, name, checksum = params
+            self.applied[version] = checksum
+
+    def fetchall(self):
+        return list(self.applied.items())
+
+
+@pytest.fixture
+def versions(tmp_path, monkeypatch) -> Path:
+    (tmp_path / "0001_first.sql").write_text("SELECT 1;")
+    (tmp_path / "0002_second.sql").write_text("SELECT 2;")
+    discover = runner.discover
+    monkeypatch.setattr(runner, "discover", lambda: discover(tmp_path))
+    return tmp_path
+
+
+def connect_to(monkeypatch, conn: FakeConnection):
+    monkeypatch.setattr(runner, "_connect", lambda dsn: conn)
+
+
+def test_shipped_migrations_are_in_order():
+    migrations = runner.discover()
+    assert [m.version for m in migrations] == list(range(1, len(migrations) + 1))
+    installed = {name for m in migrations for name in re.findall(r"CREATE OR REPLACE FUNCTION (\w+)\(", m.sql)}
+    app = Path(runner.__file__).parent.parent / "app"
+    called = {name for path in app.rglob("*.py") for name in re.findall(r'function="(\w+)"', path.read_text())}
+    # every function a template calls, and the gateway's own RPCs
+    assert called | {"execute_sql_batch", "execute_sql_params"} <= installed
+
+
+def test_unexpected_files_are_refused(tmp_path):
+    (tmp_path / "0001_first.sql").write_text("SELECT 1;")
+    (tmp_path / "0001_again.sql").write_text("SELECT 1;")
+    with pytest.raises(ValueError):
+        runner.discover(tmp_path)
+    (tmp_path / "0001_again.sql").rename(tmp_path / "second.sql")
+    with pytest.raises(ValueError):
+        runner.discover(tmp_path)
+
+
+def test_pending_migrations_are_applied_once(versions, monkeypatch):
+    conn = FakeConnection()
+    connect_to(monkeypatch, conn)
+
+    assert [m.name for m in runner.migrate("postgresql://test")] == ["first", "second"]
+    assert [sql for sql in conn.executed if sql.startswith("SELECT") and "schema_migrations" not in sql] == ["SELECT 1;", "SELECT 2;"]
+    assert conn.executed[-1] == "NOTIFY pgrst, 'reload schema'"
+
+    conn.executed.clear()
+    assert runner.migrate("postgresql://test") == []
+    assert not any(sql.startswith("NOTIFY") for sql in conn.executed)
+
+
+def test_dry_run_applies_nothing(versions, monkeypatch):
+    conn = FakeConnection({1: runner.discover()[0].checksum})
+    connect_to(monkeypatch, conn)
+
+    assert [m.name for m in runner.migrate("postgresql://test", dry_run=True)] == ["second"]
+    assert "SELECT 2;" not in conn.executed
+    assert list(conn.applied) == [1]
+
+
+def test_changed_applied_migration_is_refused(versions, monkeypatch):
+    conn = FakeConnection({1: runner.discover()[0].checksum})
+    connect_to(monkeypatch, conn)
+    (versions / "0001_first.sql").write_text("SELECT 10;")
+
+    with pytest.raises(SystemExit):
+        runner.migrate("postgresql://test")
+    assert "SELECT 2;" not in conn.executed
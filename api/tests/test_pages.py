@@ -0,0 +1,167 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.pages import run_sections
+
+
+@pytest.mark.anyio
+async def test_failed_section_hides_exception_text(gateway):
+    async def broken():
+        raise RuntimeError("secret connection string")
+
+    async def fine():
+        return {"data": [1]}
+
+    page = await run_sections({"broken": broken, "fine": fine})
+    assert page["data"] == {"broken": None, "fine": [1]}
+    assert page["meta"]["sections"]["broken"]["status"] == 500
+    assert page["meta"]["sections"]["broken"]["error"] == "Internal Server Error"
+    assert page["meta"]["partial"] is True
+
+
+@pytest.mark.anyio
+async def test_slow_section_times_out_alone(gateway):
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def fine():
+        return {"data": {"name": "x"}}
+
+    page = await run_sections({"slow": slow, "fine": fine}, timeout=0.01)
+    assert page["data"] == {"slow": None, "fine": {"name": "x"}}
+    assert page["meta"]["sections"]["slow"]["status"] == 504
+
+
+@pytest.mark.anyio
+async def test_page_fails_when_every_section_fails(gateway):
+    async def missing():
+        raise HTTPException(status_code=404, detail="Player not found")
+
+    async def empty():
+        return {}
+
+    with pytest.raises(HTTPException) as error:
+        await run_sections({"infos": missing, "career": empty})
+    assert error.value.status_code == 404
+    assert error.value.detail == "Player not found"
+
+
+def test_player_page_composes_the_single_routes(client, monkeypatch):
+    from app.classes.player import PlayerService
+    from app.models.response import Comp2
+
+    seasons = []
+
+    def section(value):
+        async def call(self, **kwargs):
+            seasons.append(kwargs.get("season"))
+            return value
+        return call
+
+    async def missing(self, **kwargs):
+        raise HTTPException(status_code=404, detail="No data found")
+
+    answers = {
+        "get_player_page_data": {"data": {"player_name": "Luka Modrić"}},
+        "get_career_stats": {"data": [{"season": 2020}]},
+        "get_player_career_teams2": {"data": [{"team_id": 1}]},
+        "get_player_stats_all_seasons": {"data": [{"season": 2019}]},
+        # models are dumped, without their data envelope
+        "get_player_goal_distribution": Comp2(comp_id=9999, comp_name="All Competitions", comp_url=None, season_year=2019),
+    }
+    for name, value in answers.items():
+        monkeypatch.setattr(PlayerService, name, section(value))
+    monkeypatch.setattr(PlayerService, "get_recent_ga", missing)
+
+    response = client.get("/v1/players/44/page", params={"season": 2019})
+    assert response.status_code == 200
+    page = response.json()
+    assert page["data"] == {
+        "infos": {"player_name": "Luka Modrić"},
+        "career": [{"season": 2020}],
+        "career_teams": [{"team_id": 1}],
+        "allstats": [{"season": 2019}],
+        "recent_ga": None,
+        "goal_dist": {"comp_id": 9999, "comp_name": "All Competitions", "comp_url": None, "season_year": 2019},
+    }
+    assert page["meta"]["sections"]["recent_ga"]["status"] == 404
+    assert all(meta["status"] == 200 for name, meta in page["meta"]["sections"].items() if name != "recent_ga")
+    assert page["meta"]["partial"] is True
+    # a partial page is not cached
+    assert response.headers["cache-control"] == "no-store"
+    assert set(seasons) == {None, 2019}
+
+
+def stub_sections(monkeypatch, service, answers: dict) -> list:
+    """
+    Replaces the service methods a page calls, each answering its value
+    (raised when an exception); returns the keyword arguments they got.
+    """
+    calls = []
+
+    def section(name, value):
+        async def call(self, **kwargs):
+            calls.append((name, kwargs))
+            if isinstance(value, Exception):
+                raise value
+            return value
+        return call
+
+    for name, value in answers.items():
+        monkeypatch.setattr(service, name, section(name, value))
+    return calls
+
+
+def test_team_page_asks_for_the_season(client, monkeypatch):
+    from datetime import date
+    from app.classes.team import TeamService
+
+    calls = stub_sections(monkeypatch, TeamService, {
+        "get_team_info": {"data": {"team_name": "Arsenal"}},
+        "get_team_matches_by_year": {"data": [{"match_id": 1}]},
+        "get_comp_finishes_by_year": {"data": []},
+        "get_domestic_finishes": {"data": [{"season": 2020}]},
+        "get_transfers_by_date": {"data": [{"transfer_id": 3}]},
+    })
+
+    response = client.get("/v1/teams/11/page", params={"season": 2020})
+    assert response.status_code == 200
+    page = response.json()
+    assert page["data"]["infos"] == {"team_name": "Arsenal"}
+    assert page["data"]["transfers"] == [{"transfer_id": 3}]
+    assert page["data"]["comps"] == []
+    assert page["meta"]["partial"] is False
+    assert dict(calls)["get_transfers_by_date"] == {"team_id": 11, "start_date": date(2020, 5, 1), "end_date": date(2021, 8, 1)}
+    assert dict(calls)["get_team_info"] == {"team_id": "11"}
+
+
+def test_complete_league_page_is_cacheable(client, monkeypatch):
+    from app.classes.league import LeagueService
+
+    calls = stub_sections(monkeypatch, LeagueService, {
+        "get_league_info": {"data": {"league_name": "Premier League"}},
+        "get_league_ranks": {"data": [{"rank": "1"}]},
+        "get_league_form_by_year": {"data": [{"team_id": 1}]},
+        "most_stats_league": {"data": [{"player_id": 7}]},
+        "get_league_winners": {"data": {"stats": {"win_teams": []}}},
+    })
+
+    response = client.get("/v1/leagues/9/page", params={"season": 2020})
+    page = response.json()
+    assert page["meta"]["partial"] is False
+    assert list(page["data"]) == ["infos", "ranks", "form", "stats", "winners"]
+    assert page["data"]["winners"] == {"stats": {"win_teams": []}}
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert dict(calls)["most_stats_league"] == {"league_id": 9, "season": 2020, "stat": "ga", "age": 50}
+
+
+def test_league_page_with_every_section_failing_is_an_error(client, monkeypatch):
+    from app.classes.league import LeagueService
+
+    stub_sections(monkeypatch, LeagueService, {
+        name: HTTPException(status_code=404, detail="League 9 not found")
+        for name in ("get_league_info", "get_league_ranks", "get_league_form_by_year", "most_stats_league", "get_league_winners")
+    })
+    response = client.get("/v1/leagues/9/page")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "League 9 not found"
@@ -0,0 +1,138 @@
+import re
+import pytest
+from app.classes.player import PlayerService
+from tests.test_dimensions import serve_teams
+
+
+@pytest.mark.anyio
+async def test_goal_distribution_skips_unknown_opponents(upstream, gateway):
+    serve_teams(upstream, {501: (501, "Arsenal", "a.png")})
+    upstream.route("per_team AS", {"data": {"goals": 3, "assists": 1, "pens": 0, "teams": [[501, 2, 1], [502, 1, 0]]}})
+    service = PlayerService(None)
+
+    answer = await service._goal_distribution(7, match_filter=service.SEASON_MATCHES, season_year=2020, season=2020)
+    teams = [dist.teams for dist in answer.data.goal_dist]
+    assert [(t.team.team_id, t.team.team_name) for t in teams] == [(501, "Arsenal")]
+    assert teams[0].stats.ga_against_pct == 75.0
+
+
+OPPONENTS = {511: (511, "Bologna", "b.png"), 512: (512, "Torino", None), 513: (513, "Genoa", "g.png"), 514: (514, "Empoli", None)}
+
+
+def match_events(player_id: int = 7) -> list:
+    """
+    Goals, assists, penalties and other players' goals over two seasons,
+    with a different number of contributions against every opponent.
+    """
+    events = []
+    for season, match_date in ((2020, "2021-02-01"), (2021, "2022-02-01")):
+        for count, opp_team_id in enumerate(OPPONENTS, start=1):
+            for i in range(2 * count + season % 2):
+                events.append({"event_type": "goal", "active_player_id": player_id if i % 3 else 99,
+                               "passive_player_id": 99 if i % 3 else player_id, "opp_team_id": opp_team_id})
+            if count % 2:
+                events.append({"event_type": "penalty goal", "active_player_id": player_id, "passive_player_id": None, "opp_team_id": opp_team_id})
+            events.append({"event_type": "goal", "active_player_id": 98, "passive_player_id": 97, "opp_team_id": opp_team_id})
+        events.append({"event_type": "goal", "active_player_id": player_id, "passive_player_id": None, "opp_team_id": None})
+        events.append({"event_type": "yellow card", "active_player_id": player_id, "passive_player_id": None, "opp_team_id": 511})
+        for event in events:
+            event.setdefault("season_year", season)
+            event.setdefault("match_date", match_date)
+    return events
+
+
+def old_goal_distribution(events: list, player_id: int, season: int) -> dict:
+    """
+    What get_player_goal_distribution counted in Python from the player's
+    goal and penalty events of the season.
+    """
+    events = [e for e in events if e["season_year"] == season]
+    goals = [e for e in events if e["event_type"] == "goal" and player_id in (e["active_player_id"], e["passive_player_id"])]
+    pens = [e for e in events if e["event_type"] == "penalty goal" and e["active_player_id"] == player_id]
+    total_goals = sum(1 for e in goals if e["active_player_id"] == player_id)
+    total_assists = sum(1 for e in goals if e["passive_player_id"] == player_id)
+    total_ga = total_goals + total_assists
+
+    per_team = {}
+    for e in goals + pens:
+        if not e["opp_team_id"]:
+            continue
+        team = per_team.setdefault(e["opp_team_id"], {"goals_against": 0, "assists_against": 0, "ga_against": 0})
+        if e["active_player_id"] == player_id:
+            team["goals_against"] += 1
+            team["ga_against"] += 1
+        if e["event_type"] == "goal" and e["passive_player_id"] == player_id:
+            team["assists_against"] += 1
+            team["ga_against"] += 1
+
+    def pct(part, whole):
+        return round(part * 100.0 / whole, 1) if whole else None
+
+    dist = [{"teams": {
+        "team": {"team_id": team_id, "team_name": OPPONENTS[team_id][1], "logo": OPPONENTS[team_id][2]},
+        "stats": {
+            "ga_against": s["ga_against"], "ga_against_pct": pct(s["ga_against"], total_ga),
+            "goals_against": s["goals_against"], "goals_against_pct": pct(s["goals_against"], total_goals),
+            "assists_against": s["assists_against"], "assists_against_pct": pct(s["assists_against"], total_assists),
+        },
+    }} for team_id, s in per_team.items()]
+    dist.sort(key=lambda d: d["teams"]["stats"]["ga_against_pct"] or 0, reverse=True)
+    return {
+        "info": {"comp_id": 9999, "comp_name": "All Competitions", "comp_url": None, "season_year": season},
+        "total": {"goals": total_goals, "assists": total_assists, "ga": total_ga, "pens": len(pens) or None},
+        "goal_dist": dist,
+        "pens": {"pen_pct": pct(len(pens), total_goals), "pens_scored": len(pens) or None},
+    }
+
+
+def serve_goal_distribution(upstream, events: list):
+    """
+    Answers the aggregating query from `events`: the player's totals and one
+    [opp_team_id, goals, assists] row per opponent, in no particular order.
+    """
+    def answer(sql: str) -> dict:
+        player_id = int(re.search(r"active_player_id = (\d+)", sql).group(1))
+        season = re.search(r"m\.season_year = (\d+)", sql)
+        if season:
+            chosen = [e for e in events if e["season_year"] == int(season.group(1))]
+        else:
+            start, end = re.search(r"BETWEEN '([\d-]+)'(?:::date)? AND '([\d-]+)'", sql).groups()
+            chosen = [e for e in events if start <= e["match_date"] <= end]
+        mine = [e for e in chosen if (e["event_type"] == "goal" and player_id in (e["active_player_id"], e["passive_player_id"]))
+                or (e["event_type"] == "penalty goal" and e["active_player_id"] == player_id)]
+        teams = {}
+        for e in mine:
+            if e["opp_team_id"] is not None:
+                row = teams.setdefault(e["opp_team_id"], [e["opp_team_id"], 0, 0])
+                row[1] += e["active_player_id"] == player_id
+                row[2] += e["event_type"] == "goal" and e["passive_player_id"] == player_id
+        return {"data": {
+            "goals": sum(1 for e in mine if e["event_type"] == "goal" and e["active_player_id"] == player_id),
+            "assists": sum(1 for e in mine if e["event_type"] == "goal" and e["passive_player_id"] == player_id),
+            "pens": sum(1 for e in mine if e["event_type"] == "penalty goal"),
+            "teams": sorted(teams.values(), reverse=True),
+        }}
+    upstream.route("per_team AS", answer)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("season", [2020, 2021, 2019])
+async def test_goal_distribution_matches_the_event_loop(upstream, gateway, season):
+    events = match_events()
+    serve_teams(upstream, OPPONENTS)
+    serve_goal_distribution(upstream, events)
+
+    answer = await PlayerService.get_player_goal_distribution.__wrapped__(PlayerService(None), 7, season)
+    assert answer.model_dump()["data"] == old_goal_distribution(events, 7, season)
+
+
+@pytest.mark.anyio
+async def test_goal_distribution_by_dates_counts_the_same(upstream, gateway):
+    events = match_events()
+    serve_teams(upstream, OPPONENTS)
+    serve_goal_distribution(upstream, events)
+
+    by_dates = await PlayerService.get_player_goal_dist_bydate.__wrapped__(PlayerService(None), 7, "2021-07-01", "2022-06-30")
+    by_season = old_goal_distribution(events, 7, 2021)
+    # the info block names the year the range starts in
+    assert by_dates.model_dump()["data"] == {**by_season, "info": {**by_season["info"], "season_year": 2021}}
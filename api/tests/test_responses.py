@@ -0,0 +1,96 @@
+from typing import Dict, List, Optional
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from app.responses import PassthroughRoute
+
+
+class Team(BaseModel):
+    team_id: int
+    team_name: str
+    logo: Optional[str] = None
+
+
+class Node(BaseModel):
+    name: str
+    children: List["Node"] = []
+
+
+class Page(BaseModel):
+    team: Team
+    rivals: Optional[List[Team]] = None
+    years: Dict[str, List[Team]]
+    tree: Optional[Node] = None
+
+
+PAYLOAD = {
+    "team": {"team_id": 1, "team_name": "Arsenal", "logo_url": "a.png", "internal_rank": 3},
+    "rivals": [{"team_id": 2, "team_name": "Spurs", "logo": None, "budget": 1}],
+    "years": {"2020": [{"team_id": 3, "team_name": "Chelsea", "secret": True}]},
+    "tree": {"name": "root", "children": [{"name": "leaf", "depth": 1}]},
+    "raw_column": 42,
+}
+
+
+def page_client(route_class) -> TestClient:
+    router = APIRouter(route_class=route_class)
+
+    @router.get("/page", response_model=Page)
+    async def page():
+        return PAYLOAD
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_passthrough_sends_only_model_fields():
+    body = page_client(PassthroughRoute).get("/page").json()
+    assert "raw_column" not in body
+    assert body["team"] == {"team_id": 1, "team_name": "Arsenal", "logo": None}
+    assert body["rivals"] == [{"team_id": 2, "team_name": "Spurs", "logo": None}]
+    assert body["years"] == {"2020": [{"team_id": 3, "team_name": "Chelsea", "logo": None}]}
+    assert body["tree"] == {"name": "root", "children": [{"name": "leaf", "children": []}]}
+
+
+def test_passthrough_sends_what_validation_would():
+    from fastapi.routing import APIRoute
+
+    assert page_client(PassthroughRoute).get("/page").json() == page_client(APIRoute).get("/page").json()
+
+
+def test_sampled_mismatch_fails_when_strict(monkeypatch):
+    from app import responses
+
+    monkeypatch.setattr(responses, "RESPONSE_VALIDATE_RATE", 1.0)
+    monkeypatch.setattr(responses, "RESPONSE_VALIDATE_STRICT", True)
+    router = APIRouter(route_class=PassthroughRoute)
+
+    @router.get("/team", response_model=Team)
+    async def team():
+        return {"team_id": "not a number", "team_name": "Arsenal"}
+
+    app = FastAPI()
+    app.include_router(router)
+    invalid = responses.counters["invalid"]
+    assert TestClient(app, raise_server_exceptions=False).get("/team").status_code == 500
+    assert responses.counters["invalid"] == invalid + 1
+
+
+def test_passthrough_keeps_headers_set_on_the_response():
+    from fastapi import Response
+
+    router = APIRouter(route_class=PassthroughRoute)
+
+    @router.get("/team", response_model=Team)
+    async def team(response: Response):
+        response.headers["Cache-Control"] = "no-store"
+        response.status_code = 203
+        return {"team_id": 1, "team_name": "Arsenal"}
+
+    app = FastAPI()
+    app.include_router(router)
+    answer = TestClient(app).get("/team")
+    assert answer.status_code == 203
+    assert answer.headers["cache-control"] == "no-store"
+    assert answer.json() == {"team_id": 1, "team_name": "Arsenal", "logo": None}
@@ -0,0 +1,123 @@
+import random
+import sqlite3
+import pytest
+from app.search import PLAYER_COLUMNS, PlayerSearchIndex, fold, prefix_distance
+
+SYLLABLES = ("ka", "lo", "mar", "tin", "ro", "na", "el", "son", "vi", "dan")
+
+
+def player(player_id: int, name: str, retired=False, market_value=None, **extra) -> dict:
+    row = dict.fromkeys(PLAYER_COLUMNS)
+    row.update(
+        player_id=player_id, player_name=name, full_name=name, player_slug=name.lower().replace(" ", "-"),
+        isRetired=retired, market_value=market_value, **extra,
+    )
+    return row
+
+
+def random_players(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for player_id in range(1, count + 1):
+        name = " ".join("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))).title() for _ in range(2))
+        rows.append(player(
+            player_id, f"{name} {player_id}",
+            retired=rng.choice([False, True, None]),
+            market_value=rng.choice([None, rng.randrange(100, 1000) * 100000]),
+        ))
+    return rows
+
+
+def sql_search(rows: list, text: str) -> list:
+    """
+    The old SQL search, run by SQLite with Postgres' NULL ordering spelled out.
+    """
+    db = sqlite3.connect(":memory:")
+    db.execute('CREATE TABLE players (player_id, player_name, player_slug, "isRetired", market_value)')
+    db.executemany("INSERT INTO players VALUES (?, ?, ?, ?, ?)", [
+        (r["player_id"], r["player_name"], r["player_slug"], r["isRetired"], r["market_value"]) for r in rows
+    ])
+    found = db.execute("""
+        SELECT player_id FROM players
+        WHERE player_name LIKE '%' || ? || '%' OR player_slug LIKE '%' || ? || '%'
+        ORDER BY "isRetired" ASC NULLS LAST, market_value DESC NULLS FIRST, player_name
+        LIMIT 15
+    """, (text, text)).fetchall()
+    return [player_id for player_id, in found]
+
+
+def serve_players(upstream, rows: list):
+    def answer(sql: str) -> dict:
+        after = int(sql.split("player_id >")[1].split(")")[0])
+        return {"data": [[r[c] for c in PLAYER_COLUMNS] for r in rows if r["player_id"] > after]}
+    upstream.route("FROM players WHERE player_id >", answer)
+
+
+@pytest.mark.anyio
+async def test_ranking_matches_sql_order(upstream, gateway):
+    rows = random_players(400)
+    serve_players(upstream, rows)
+    index = PlayerSearchIndex()
+    await index.load()
+
+    for text in ("mar", "tin", "lon", "elso", "kaka", "vi", "7"):
+        if len(text) < 3:
+            # short queries match word starts only, compare those
+            expected = [r["player_id"] for r in rows if any(w.lower().startswith(text) for w in r["player_name"].split())]
+            assert {r["player_id"] for r in index.search(text)} <= set(expected)
+            continue
+        assert [r["player_id"] for r in index.search(text)] == sql_search(rows, text), text
+
+
+@pytest.mark.anyio
+async def test_new_players_are_ranked_in(upstream, gateway):
+    rows = random_players(200)
+    serve_players(upstream, rows)
+    index = PlayerSearchIndex()
+    await index.load()
+
+    rows += [player(1000, "Marmar Star", market_value=None), player(1001, "Marmar Retired", retired=True)]
+    await index.refresh()
+    assert index.stats()["delta"] == 2
+    for text in ("marmar", "mar"):
+        assert [r["player_id"] for r in index.search(text)] == sql_search(rows, text)
+
+
+@pytest.mark.anyio
+async def test_edits_wait_for_a_full_reload(upstream, gateway):
+    rows = [player(1, "Bukayo Saka", market_value=100000000), player(2, "Emile Smith Rowe", market_value=30000000)]
+    serve_players(upstream, rows)
+    index = PlayerSearchIndex()
+    await index.load()
+
+    rows[1] = player(2, "Emile Smith Rowe", market_value=200000000)
+    await index.refresh()
+    assert [r["market_value"] for r in index.search("smith")] == [30000000]
+    await index.load()
+    assert [r["market_value"] for r in index.search("smith")] == [200000000]
+
+
+@pytest.mark.anyio
+async def test_short_queries_match_word_starts(upstream, gateway):
+    rows = [player(1, "Mikel Arteta"), player(2, "Aaron Ramsdale")]
+    serve_players(upstream, rows)
+    index = PlayerSearchIndex()
+    await index.load()
+
+    assert [r["player_id"] for r in index.search("ar")] == [1]
+    assert sql_search(rows, "ar") == [2, 1]
+    # from three characters on, anywhere in the name
+    assert {r["player_id"] for r in index.search("ram")} == {2}
+    assert {r["player_id"] for r in index.search("dal")} == {2}
+
+
+def test_fold():
+    assert fold("Ødegaard") == fold("odegaard") == "odegaard"
+    assert fold("Modrić") == "modric"
+    assert fold("Großkreutz") == "grosskreutz"
+
+
+def test_prefix_distance():
+    assert prefix_distance("mbape", "mbappe", 1) == 1
+    assert prefix_distance("odegarad", "odegaard", 2) == 1
+    assert prefix_distance("abc", "xyz", 1) == 2
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from app.singleflight import SingleFlight
+from tests.conftest import make_gateway
+
+
+@pytest.mark.anyio
+async def test_identical_reads_share_one_call(upstream):
+    upstream.route("SELECT", {"data": [1]})
+    gateway = make_gateway(upstream)
+    results = await asyncio.gather(*(gateway.execute("SELECT  1") for _ in range(5)))
+    assert results == [{"data": [1]}] * 5
+    assert len(upstream.requests) == 1
+
+
+@pytest.mark.anyio
+async def test_writes_are_never_shared(upstream):
+    upstream.route("UPDATE", {"data": []})
+    gateway = make_gateway(upstream)
+    await asyncio.gather(*(gateway.execute("UPDATE t SET x = 1", idempotent=False) for _ in range(3)))
+    assert len(upstream.requests) == 3
+
+
+@pytest.mark.anyio
+async def test_callers_share_the_error_and_the_key_is_released():
+    flights = SingleFlight()
+    release = asyncio.Event()
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        raise RuntimeError("database down")
+
+    waiters = [asyncio.ensure_future(flights.do("k", failing)) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert flights.in_flight() == 1
+    release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert calls == 1
+    assert flights.stats() == {"calls": 1, "coalesced": 2, "in_flight": 0}
+
+
+@pytest.mark.anyio
+async def test_cancelled_caller_leaves_the_call_running():
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flights.do("k", slow))
+    second = asyncio.ensure_future(flights.do("k", slow))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await second == "done"
+    assert first.cancelled()
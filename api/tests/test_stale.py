@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from app import cache
+from app.cache import ResultCache, cached, result_cache, _MISSING
+
+
+def test_hit_stale_and_expiry(clock):
+    results = ResultCache()
+    results.set("ep", ("k",), "value", ttl=10, stale_for=5)
+
+    assert results.lookup("ep", ("k",)) == ("value", False)
+    clock.now += 12
+    assert results.lookup("ep", ("k",)) == ("value", True)
+    # get() never hands out stale values
+    assert results.get("ep", ("k",)) is _MISSING
+    clock.now += 5
+    assert results.lookup("ep", ("k",)) == (_MISSING, False)
+    assert results.counters["ep"] == {"hits": 1, "misses": 1, "stale": 2}
+
+
+class Service:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    @cached(season_arg=None, ttl=0.05, stale_for=60)
+    async def lookup(self, key: str):
+        self.calls += 1
+        if self.calls > 1:
+            await self.release.wait()
+        return f"{key}:{self.calls}"
+
+
+@pytest.mark.anyio
+async def test_stale_value_served_while_refreshing():
+    result_cache.purge()
+    service = Service()
+
+    assert await service.lookup("a") == "a:1"
+    assert await service.lookup("a") == "a:1"
+    assert service.calls == 1
+
+    await asyncio.sleep(0.06)
+    # expired: the stale value comes back at once, one refresh starts
+    assert await service.lookup("a") == "a:1"
+    assert await service.lookup("a") == "a:1"
+    await asyncio.sleep(0)
+    assert service.calls == 2
+    assert len(cache._refreshing) == 1
+
+    service.release.set()
+    while cache._refreshing:
+        await asyncio.sleep(0.01)
+    assert await service.lookup("a") == "a:2"
+    result_cache.purge()
+
+
+@pytest.mark.anyio
+async def test_failed_refresh_keeps_stale_value():
+    result_cache.purge()
+
+    class Flaky:
+        calls = 0
+
+        @cached(season_arg=None, ttl=0.05, stale_for=60)
+        async def lookup(self):
+            self.calls += 1
+            if self.calls > 1:
+                raise RuntimeError("database down")
+            return "first"
+
+    service = Flaky()
+    assert await service.lookup() == "first"
+    await asyncio.sleep(0.06)
+    assert await service.lookup() == "first"
+    while cache._refreshing:
+        await asyncio.sleep(0.01)
+    assert service.calls == 2
+    assert await service.lookup() == "first"
+    result_cache.purge()
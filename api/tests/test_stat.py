@@ -0,0 +1,102 @@
+import re
+from datetime import date, timedelta
+import pytest
+from fastapi import HTTPException
+from app.classes.stat import StatsService
+
+TEAMS = {801: "Bologna", 802: "Atalanta", 803: "Torino", 804: "Genoa", 805: "Empoli", 806: "Lazio"}
+
+
+def season_matches(comp_id: int = 55, season_year: int = 2021) -> list:
+    """
+    A double round robin, one round a week, so no team plays twice a day.
+    """
+    teams = sorted(TEAMS)
+    rounds = []
+    for _ in range(len(teams) - 1):
+        rounds.append([(teams[i], teams[-1 - i]) for i in range(len(teams) // 2)])
+        teams.insert(1, teams.pop())
+    rounds += [[(away, home) for home, away in pairs] for pairs in rounds]
+    matches = []
+    for week, pairs in enumerate(rounds):
+        for home_id, away_id in pairs:
+            home_goals, away_goals = (home_id * 7 + week) % 4, (away_id * 3 + week) % 3
+            draw = home_goals == away_goals
+            matches.append({
+                "match_id": len(matches) + 1, "comp_id": comp_id, "season_year": season_year,
+                "home_id": home_id, "away_id": away_id, "home_goals": home_goals, "away_goals": away_goals,
+                "match_date": (date(season_year, 8, 14) + timedelta(weeks=week)).isoformat(),
+                "result": f"{home_goals}-{away_goals}", "isDraw": draw,
+                "win_team": None if draw else home_id if home_goals > away_goals else away_id,
+                "loss_team": None if draw else away_id if home_goals > away_goals else home_id,
+            })
+    return matches
+
+
+def match_info(m: dict) -> dict:
+    return {
+        "match_id": m["match_id"], "home_id": m["home_id"], "home_team_name": TEAMS[m["home_id"]],
+        "away_id": m["away_id"], "away_team_name": TEAMS[m["away_id"]], "home_goals": m["home_goals"],
+        "away_goals": m["away_goals"], "match_date": m["match_date"], "result": m["result"],
+        "win_team": m["win_team"], "loss_team": m["loss_team"], "isDraw": m["isDraw"],
+    }
+
+
+def old_recent_matches(matches: list, comp_id: int, season_year: int, n: int = 6) -> list:
+    """
+    What get_teams_recent_matches built with one matches query per team.
+    Its teams came in whatever order the teams query returned them, so they
+    are sorted by name here like the new query does.
+    """
+    season = [m for m in matches if m["comp_id"] == comp_id and m["season_year"] == season_year]
+    team_ids = {m["home_id"] for m in season} | {m["away_id"] for m in season}
+    grid = []
+    for team_id in team_ids:
+        played = [m for m in season if team_id in (m["home_id"], m["away_id"])]
+        played.sort(key=lambda m: m["match_date"], reverse=True)
+        grid.append({
+            "team_name": TEAMS[team_id], "team_id": team_id, "comp_id": comp_id,
+            "recent_matches": [match_info(m) for m in played[:n]],
+        })
+    return sorted(grid, key=lambda t: t["team_name"])
+
+
+def serve_recent_matches(upstream, matches: list):
+    """
+    Answers the partitioned form query from `matches`: every side of every
+    match, the last `n` per team by date then match_id, teams by name.
+    """
+    def answer(sql: str) -> dict:
+        comp_id = int(re.search(r"m\.comp_id = (\d+)", sql).group(1))
+        season_year = int(re.search(r"m\.season_year = (\d+)", sql).group(1))
+        n = int(re.search(r"row_num <= (\d+)", sql).group(1))
+        season = [m for m in matches if m["comp_id"] == comp_id and m["season_year"] == season_year]
+        sides = {}
+        for m in season:
+            for team_id in (m["home_id"], m["away_id"]):
+                sides.setdefault(team_id, []).append(m)
+        grid = [{
+            "team_name": TEAMS[team_id], "team_id": team_id, "comp_id": comp_id,
+            "recent_matches": [match_info(m) for m in sorted(played, key=lambda m: (m["match_date"], m["match_id"]), reverse=True)[:n]],
+        } for team_id, played in sides.items()]
+        return {"data": sorted(grid, key=lambda t: t["team_name"])}
+    upstream.route("WITH season_matches AS", answer)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("n", [1, 6, 38])
+async def test_form_grid_matches_the_per_team_queries(upstream, gateway, n):
+    matches = season_matches() + season_matches(season_year=2022) + season_matches(comp_id=56)
+    serve_recent_matches(upstream, matches)
+
+    grid = await StatsService.get_teams_recent_matches.__wrapped__(StatsService(None), comp_id=55, season_year=2021, n=n)
+    assert [team.model_dump() for team in grid] == old_recent_matches(matches, 55, 2021, n)
+    assert upstream.sent("FROM matches m") == 1
+
+
+@pytest.mark.anyio
+async def test_form_grid_without_matches_is_404(upstream, gateway):
+    serve_recent_matches(upstream, season_matches())
+    with pytest.raises(HTTPException) as error:
+        await StatsService.get_teams_recent_matches.__wrapped__(StatsService(None), comp_id=55, season_year=1990)
+    assert error.value.status_code == 404
@@ -0,0 +1,82 @@
+import asyncio
+import time
+import pytest
+from app.dimensions import LeagueDim, TeamDim
+from app.search import _Suggestions, fold
+from tests.test_search import player, serve_players
+
+
+@pytest.fixture
+def suggestions() -> _Suggestions:
+    players = [
+        player(1, "Martin Ødegaard", market_value=90000000, curr_team_id=10, pic_url="o.png"),
+        player(2, "Kylian Mbappé", market_value=180000000, curr_team_id=11),
+        player(3, "Marco Reus", market_value=5000000, curr_team_id=13),
+        player(4, "Vinícius Júnior", market_value=200000000, curr_team_id=11),
+    ]
+    teams = [
+        TeamDim(10, "Arsenal", "a.png"), TeamDim(11, "Real Madrid", "r.png"),
+        TeamDim(12, "Real Sociedad", None), TeamDim(13, "Borussia Dortmund", None),
+    ]
+    leagues = [
+        LeagueDim(1, "Premier League", 9, "pl.png", "league"), LeagueDim(2, "LaLiga", 8, None, "league"),
+        LeagueDim(3, "UEFA Champions League", None, None, "cup"),
+    ]
+    players.sort(key=lambda r: -r["market_value"])
+    return _Suggestions(players, teams, leagues)
+
+
+def lookup(suggestions: _Suggestions, text: str, limit: int = 5) -> dict:
+    found, complete = suggestions.lookup(fold(text).split(), limit, time.perf_counter() + 1)
+    assert complete
+    return {kind: [suggestions.entries[p][1] for p in positions] for kind, positions in found.items()}
+
+
+def test_suggest_prefix(suggestions):
+    # squad size decides between the two Real clubs
+    assert lookup(suggestions, "real")["teams"] == ["Real Madrid", "Real Sociedad"]
+    assert lookup(suggestions, "real ma") == {"players": [], "teams": ["Real Madrid"], "leagues": []}
+    assert lookup(suggestions, "mar")["players"] == ["Martin Ødegaard", "Marco Reus"]
+    assert lookup(suggestions, "ødeg")["players"] == ["Martin Ødegaard"]
+    assert lookup(suggestions, "l")["leagues"] == ["LaLiga", "Premier League", "UEFA Champions League"]
+    assert lookup(suggestions, "leag", limit=1)["leagues"] == ["Premier League"]
+
+
+def test_suggest_typo(suggestions):
+    assert lookup(suggestions, "mbape")["players"] == []
+    similar = [suggestions.words[i] for i in suggestions.similar_words("mbape", time.perf_counter() + 1)]
+    assert similar == ["mbappe"]
+    assert "odegaard" in [suggestions.words[i] for i in suggestions.similar_words("odegarad", time.perf_counter() + 1)]
+    assert suggestions.similar_words("zzzzz", time.perf_counter() + 1) == []
+
+
+def test_suggestions_build_as_soon_as_sources_load(client, upstream, monkeypatch):
+    from app.dimensions import dimension_store
+    from app.search import player_search_index, suggest_index
+
+    upstream.route("json_build_array(team_id", {"data": [[11, "Real Madrid", "r.png"], [12, "Real Sociedad", None]]})
+    upstream.route("json_build_array(league_id", {"data": [[2, "LaLiga", 8, None, "league"]]})
+    upstream.route("json_build_array(player_id", {"data": []})
+    serve_players(upstream, [player(2, "Kylian Mbappé", market_value=180000000, curr_team_id=11)])
+    # the test does the loading: stop the app's own background loads and
+    # let a rebuild they set off finish before faking the cold start
+    client.portal.call(dimension_store.stop)
+    client.portal.call(player_search_index.stop)
+    monkeypatch.setattr(dimension_store, "loaded_at", 0.0)
+    monkeypatch.setattr(player_search_index, "_index", None)
+    if suggest_index._rebuilding is not None:
+        client.portal.call(asyncio.wait, {suggest_index._rebuilding})
+    # a cold start: the periodic rebuild has run and found nothing loaded
+    monkeypatch.setattr(suggest_index, "_suggestions", None)
+    monkeypatch.setattr(suggest_index, "_sources", None)
+    assert client.get("/v1/search/suggest", params={"q": "real"}).json()["meta"]["partial"]
+
+    client.portal.call(dimension_store.load)
+    client.portal.call(player_search_index.load)
+    deadline = time.monotonic() + 5
+    # well before the next periodic rebuild, SUGGEST_REFRESH seconds away
+    while suggest_index._sources != suggest_index._source_version() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    answer = client.get("/v1/search/suggest", params={"q": "real"}).json()
+    assert answer["meta"]["partial"] is False
+    assert [team[1] for team in answer["data"]["teams"]] == ["Real Madrid", "Real Sociedad"]
@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+import pytest
+from fastapi import HTTPException
+from app.transfers import TransferPool, _Pool, random_transfer, transfer_pool
+
+START = date(2020, 7, 1)
+
+
+def transfers(count: int) -> list:
+    # two transfers every three days
+    return [
+        {"transfer_id": i, "player_id": i, "fee": 25000000, "date": (START + timedelta(days=i * 3 // 2)).isoformat()}
+        for i in range(count)
+    ]
+
+
+def test_window_matches_a_scan():
+    rows = transfers(200)
+    pool = _Pool(rows)
+    for start, end in [(START, START), (START - timedelta(days=9), START + timedelta(days=40)),
+                       (START + timedelta(days=17), START + timedelta(days=17)), (date(2030, 1, 1), date(2031, 1, 1))]:
+        window = pool.window(start, end)
+        assert [rows[i]["transfer_id"] for i in window] == [
+            r["transfer_id"] for r in rows if start <= date.fromisoformat(r["date"]) <= end
+        ]
+
+
+@pytest.mark.anyio
+async def test_session_never_repeats_within_a_round(upstream, gateway):
+    upstream.route("FROM transfers", {"data": transfers(60)})
+    pool = TransferPool()
+    assert await pool.ensure_loaded()
+
+    start, end = START, START + timedelta(days=30)
+    size = len(pool._pool.window(start, end))
+    drawn = [pool.sample(start, end, session="s1")["transfer_id"] for _ in range(size)]
+    assert len(set(drawn)) == size
+    # the next round starts over
+    assert pool.sample(start, end, session="s1")["transfer_id"] in drawn
+
+
+@pytest.mark.anyio
+async def test_seeded_draws_are_reproducible(upstream, gateway):
+    upstream.route("FROM transfers", {"data": transfers(60)})
+    pool = TransferPool()
+    await pool.load()
+    start, end = START, START + timedelta(days=60)
+
+    first = [pool.sample(start, end, seed=4, session="a")["transfer_id"] for _ in range(10)]
+    await pool.load()
+    assert [pool.sample(start, end, seed=4, session="a")["transfer_id"] for _ in range(10)] == first
+    assert pool.sample(start, end, seed=4) == pool.sample(start, end, seed=4)
+
+
+@pytest.mark.anyio
+async def test_empty_window_is_404(upstream, gateway, monkeypatch):
+    upstream.route("FROM transfers", {"data": transfers(10)})
+    monkeypatch.setattr(transfer_pool, "_pool", None)
+    with pytest.raises(HTTPException) as error:
+        await random_transfer(date(2030, 1, 1), date(2030, 12, 31))
+    assert error.value.status_code == 404
+    found = await random_transfer(START, START + timedelta(days=5))
+    assert found["data"]["transfer"]["transfer_id"] < 5
+
+
+@pytest.mark.anyio
+async def test_failed_load_falls_back_to_the_query(upstream, gateway, monkeypatch):
+    import httpx
+    from app import transfers as module
+    from app.classes.player import PlayerService
+
+    pool = TransferPool()
+    monkeypatch.setattr(module, "transfer_pool", pool)
+    upstream.route("ORDER BY RANDOM()", {"data": {"transfer": {"transfer_id": 99}}})
+    upstream.route("FROM transfers", httpx.Response(400, json={"message": "relation does not exist"}))
+    service = PlayerService(None)
+
+    found = await service.get_random_transfer(START, START + timedelta(days=5))
+    assert found["data"]["transfer"]["transfer_id"] == 99
+    assert pool.stats()["errors"] == 1
+    # within TRANSFER_POOL_RETRY the pool is not tried again
+    await service.get_random_transfer(START, START + timedelta(days=5))
+    assert upstream.sent("ORDER BY date, transfer_id") == 1
+    assert upstream.sent("ORDER BY RANDOM()") == 2
+
+    upstream.routes[-1] = ("FROM transfers", {"data": transfers(10)})
+    monkeypatch.setattr(pool, "_retry_at", 0.0)
+    found = await service.get_random_transfer(START, START + timedelta(days=5))
+    assert found["data"]["transfer"]["transfer_id"] < 5
+    assert pool.ready and upstream.sent("ORDER BY RANDOM()") == 2